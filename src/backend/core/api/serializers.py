@@ -5,7 +5,8 @@ import mimetypes
 from base64 import b64decode
 
 from django.conf import settings
-from django.db.models import Q
+from django.core.cache import cache
+from django.db.models import Manager, Q
 from django.utils.functional import lazy
 from django.utils.translation import gettext_lazy as _
 
@@ -161,6 +162,29 @@ class TemplateAccessSerializer(BaseAccessSerializer):
         read_only_fields = ["id", "abilities"]
 
 
+# pylint: disable=abstract-method
+class DocumentListSerializer(serializers.ListSerializer):
+    """
+    Serialize a list of documents, computing values that would otherwise be computed
+    document by document, like the number of accesses, for the whole list at once.
+    """
+
+    def to_representation(self, data):
+        """
+        Prefetch the number of accesses of all documents and what is needed to compute
+        their abilities before serializing them.
+        """
+        documents = list(data.all() if isinstance(data, Manager) else data)
+        models.Document.prefetch_nb_accesses(documents)
+
+        # Abilities are already optimized when ancestors links are passed in context
+        request = self.context.get("request")
+        if request and not self.context.get("paths_links_mapping"):
+            models.Document.prefetch_abilities(documents, request.user)
+
+        return super().to_representation(documents)
+
+
 class ListDocumentSerializer(serializers.ModelSerializer):
     """Serialize documents with limited fields for display in lists."""
 
@@ -192,6 +216,7 @@ class ListDocumentSerializer(serializers.ModelSerializer):
             "document_type",
             "content_preview_base64"
         ]
+        list_serializer_class = DocumentListSerializer
         read_only_fields = [
             "id",
             "abilities",
@@ -265,6 +290,7 @@ class DocumentSerializer(ListDocumentSerializer):
             "document_type",
             "content_preview_base64"
         ]
+        list_serializer_class = DocumentListSerializer
         read_only_fields = [
             "id",
             "abilities",
@@ -323,7 +349,7 @@ class DocumentSerializer(ListDocumentSerializer):
         "attachments" field for access control.
         """
         content = self.validated_data.get("content", "")
-        extracted_attachments = set(utils.extract_attachments(content))
+        extracted_attachments = set(utils.get_content_attachments(content))
 
         existing_attachments = (
             set(self.instance.attachments or []) if self.instance else set()
@@ -331,38 +357,27 @@ class DocumentSerializer(ListDocumentSerializer):
         new_attachments = extracted_attachments - existing_attachments
 
         if new_attachments:
-            attachments_documents = (
-                models.Document.objects.filter(
-                    attachments__overlap=list(new_attachments)
-                )
-                .only("path", "attachments")
-                .order_by("path")
-            )
-
             user = self.context["request"].user
-            readable_per_se_paths = (
-                models.Document.objects.readable_per_se(user)
-                .order_by("path")
-                .values_list("path", flat=True)
-            )
-            readable_attachments_paths = utils.filter_descendants(
-                [doc.path for doc in attachments_documents],
-                readable_per_se_paths,
-                skip_sorting=True,
+            readable_attachments = models.Document.objects.readable_attachments(
+                user, new_attachments
             )
 
-            readable_attachments = set()
-            for document in attachments_documents:
-                if document.path not in readable_attachments_paths:
-                    continue
-                readable_attachments.update(set(document.attachments) & new_attachments)
-
             # Update attachments with readable keys
             self.validated_data["attachments"] = list(
                 existing_attachments | readable_attachments
             )
 
-        return super().save(**kwargs)
+        document = super().save(**kwargs)
+
+        # Also memoize the attachments under the hash of the content as stored, which
+        # differs from the hash of the content in base64 for binary storage formats
+        if content and document.content_hash:
+            cache.set(
+                utils.get_attachments_cache_key(document.content_hash),
+                list(extracted_attachments),
+                settings.DOCUMENT_CONTENT_CACHE_TIMEOUT,
+            )
+        return document
 
 
 class ServerCreateDocumentSerializer(serializers.Serializer):
@@ -475,10 +490,12 @@ class LinkDocumentSerializer(serializers.ModelSerializer):
 class DocumentDuplicationSerializer(serializers.Serializer):
     """
     Serializer for duplicating a document.
-    Allows specifying whether to keep access permissions.
+    Allows specifying whether to keep access permissions and to duplicate the
+    descendants of the document.
     """
 
     with_accesses = serializers.BooleanField(default=False)
+    with_descendants = serializers.BooleanField(default=False)
 
     def create(self, validated_data):
         """
@@ -672,6 +689,21 @@ class VersionFilterSerializer(serializers.Serializer):
     )
 
 
+class DocumentIdsSerializer(serializers.Serializer):
+    """Validate the ids of the documents targeted by a bulk action."""
+
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False)
+
+    def validate_ids(self, value):
+        """Limit the number of documents targeted at once."""
+        if len(value) > settings.DOCUMENT_BULK_ACTION_MAX_SIZE:
+            raise serializers.ValidationError(
+                "Cannot target more than "
+                f"{settings.DOCUMENT_BULK_ACTION_MAX_SIZE:d} documents at once."
+            )
+        return list(set(value))
+
+
 class AITransformSerializer(serializers.Serializer):
     """Serializer for AI transform requests."""
 
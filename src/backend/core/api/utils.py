@@ -1,5 +1,6 @@
 """Util to generate S3 authorization headers for object storage access control"""
 
+import threading
 import time
 from abc import ABC, abstractmethod
 
@@ -8,6 +9,9 @@ from django.core.cache import cache
 from django.core.files.storage import default_storage
 
 import botocore
+import botocore.auth
+import botocore.awsrequest
+import botocore.utils
 from rest_framework.throttling import BaseThrottle
 
 
@@ -63,6 +67,64 @@ def filter_root_paths(paths, skip_sorting=False):
     return root_paths
 
 
+class S3AuthorizationSigner:
+    """
+    Sign requests to get objects from the object storage.
+
+    The url of the bucket and the SigV4 signer are computed once and reused for all
+    the objects. The signer is only rebuilt when the credentials of the object storage
+    client rotate.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bucket_url = None
+        self._credentials = None
+        self._auth = None
+
+    @property
+    def bucket_url(self):
+        """
+        Return the url of the bucket, as computed by the unsigned client, so that
+        object urls follow the addressing style configured for the object storage.
+        """
+        if self._bucket_url is None:
+            s3_client = default_storage.unsigned_connection.meta.client
+            url = s3_client.generate_presigned_url(
+                "get_object",
+                ExpiresIn=0,
+                Params={"Bucket": default_storage.bucket_name, "Key": "_"},
+            )
+            self._bucket_url = url.split("?", 1)[0][:-1]
+        return self._bucket_url
+
+    def get_auth(self):
+        """Return a SigV4 signer for the current credentials of the s3 client."""
+        s3_client = default_storage.connection.meta.client
+        # pylint: disable=protected-access
+        credentials = s3_client._request_signer._credentials  # noqa: SLF001
+        # Refreshable credentials are renewed here when they are about to expire
+        frozen_credentials = credentials.get_frozen_credentials()
+
+        with self._lock:
+            if frozen_credentials != self._credentials:
+                self._auth = botocore.auth.S3SigV4Auth(
+                    frozen_credentials, "s3", s3_client.meta.region_name
+                )
+                self._credentials = frozen_credentials
+            return self._auth
+
+    def sign(self, key):
+        """Return a signed request to get the object stored under the given key."""
+        url = f"{self.bucket_url:s}{botocore.utils.percent_encode(key, safe='/~'):s}"
+        request = botocore.awsrequest.AWSRequest(method="get", url=url)
+        self.get_auth().add_auth(request)
+        return request
+
+
+s3_authorization_signer = S3AuthorizationSigner()
+
+
 def generate_s3_authorization_headers(key):
     """
     Generate authorization headers for an s3 object.
@@ -73,22 +135,7 @@ def generate_s3_authorization_headers(key):
     - access control is truly realtime
     - the object storage service does not need to be exposed on internet
     """
-    url = default_storage.unsigned_connection.meta.client.generate_presigned_url(
-        "get_object",
-        ExpiresIn=0,
-        Params={"Bucket": default_storage.bucket_name, "Key": key},
-    )
-    request = botocore.awsrequest.AWSRequest(method="get", url=url)
-
-    s3_client = default_storage.connection.meta.client
-    # pylint: disable=protected-access
-    credentials = s3_client._request_signer._credentials  # noqa: SLF001
-    frozen_credentials = credentials.get_frozen_credentials()
-    region = s3_client.meta.region_name
-    auth = botocore.auth.S3SigV4Auth(frozen_credentials, "s3", region)
-    auth.add_auth(request)
-
-    return request
+    return s3_authorization_signer.sign(key)
 
 
 class AIBaseRateThrottle(BaseThrottle, ABC):
@@ -1,7 +1,11 @@
 """API endpoints"""
 # pylint: disable=too-many-lines
 
+import base64
+import functools
+import json
 import logging
+import operator
 import uuid
 from urllib.parse import unquote, urlparse
 
@@ -9,12 +13,11 @@ from django.conf import settings
 from django.contrib.postgres.aggregates import ArrayAgg
 from django.contrib.postgres.fields import ArrayField
 from django.contrib.postgres.search import TrigramSimilarity
-from django.core.exceptions import ValidationError
+from django.core.exceptions import FieldDoesNotExist, ValidationError
 from django.core.files.storage import default_storage
-from django.db import connection, transaction
+from django.db import transaction
 from django.db import models as db
 from django.db.models.expressions import RawSQL
-from django.db.models.functions import Left, Length
 from django.http import Http404, StreamingHttpResponse
 from django.utils.decorators import method_decorator
 from django.utils.text import capfirst
@@ -29,12 +32,13 @@ from rest_framework import filters, status, viewsets
 from rest_framework import response as drf_response
 from rest_framework.permissions import AllowAny
 from rest_framework.throttling import UserRateThrottle
+from rest_framework.utils.urls import replace_query_param
 
 from core import enums, models, authentication
 from core.services.ai_services import AIService
 from core.services.collaboration_services import CollaborationService
 from core.services.config_services import get_footer_json
-from core.utils import extract_attachments, filter_descendants
+from core.utils import get_attachment_status, get_content_attachments
 
 from drf_helper.auth import CookieJWTAuthentication
 from . import permissions, serializers, utils
@@ -132,6 +136,156 @@ class Pagination(drf.pagination.PageNumberPagination):
     page_size_query_param = "page_size"
 
 
+# pylint: disable=abstract-method
+class CursorPagination(drf.pagination.BasePagination):
+    """
+    Keyset pagination opted in by passing the `cursor` query parameter, empty for the
+    first page. Each page is filtered after the position of the last object of the
+    previous page in the ordering of the queryset completed by the primary key, so
+    pages cost the same at any depth and objects are not counted.
+    """
+
+    cursor_query_param = "cursor"
+    invalid_cursor_message = _("Invalid cursor")
+    page_size = Pagination.page_size
+    max_page_size = Pagination.max_page_size
+    page_size_query_param = Pagination.page_size_query_param
+
+    base_url = None
+    ordering = None
+    page = None
+    next_position = None
+
+    def get_page_size(self, request):
+        """Return the page size requested by the client up to the maximum page size."""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(page_size, self.max_page_size) if page_size > 0 else self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return the page of objects following the position of the cursor."""
+        self.base_url = request.build_absolute_uri()
+        self.ordering = [
+            *(queryset.query.order_by or queryset.model._meta.ordering),  # noqa: SLF001
+            "pk",
+        ]
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.get_following_filter(queryset, position))
+
+        # Fetch an extra object to know if there is a next page
+        results = list(queryset[: page_size + 1])
+        self.page = results[:page_size]
+        self.next_position = (
+            self.get_position(self.page[-1]) if len(results) > page_size else None
+        )
+        return self.page
+
+    def get_position(self, instance):
+        """Return the values of the ordering fields of an object."""
+        position = []
+        for order in self.ordering:
+            value = getattr(instance, order.lstrip("-"))
+            position.append(None if value is None else str(value))
+        return position
+
+    def get_following_filter(self, queryset, position):
+        """
+        Return a filter on the objects following a position in the ordering. NULL
+        values are the greatest as for the ordering in PostgreSQL.
+        """
+        clauses = []
+        previous_equal = db.Q()
+        for order, value in zip(self.ordering, position, strict=True):
+            field_name = order.lstrip("-")
+            try:
+                is_nullable = queryset.model._meta.get_field(field_name).null  # noqa: SLF001
+            except FieldDoesNotExist:
+                is_nullable = True
+
+            if order.startswith("-"):
+                following = (
+                    db.Q(**{f"{field_name}__isnull": False})
+                    if value is None
+                    else db.Q(**{f"{field_name}__lt": value})
+                )
+            elif value is None:
+                following = None
+            else:
+                following = db.Q(**{f"{field_name}__gt": value})
+                if is_nullable:
+                    following |= db.Q(**{f"{field_name}__isnull": True})
+
+            if following is not None:
+                clauses.append(previous_equal & following)
+            previous_equal &= (
+                db.Q(**{f"{field_name}__isnull": True})
+                if value is None
+                else db.Q(**{field_name: value})
+            )
+
+        return functools.reduce(operator.or_, clauses)
+
+    def decode_cursor(self, request, model):
+        """
+        Return the position encoded in the cursor of the request, if any, with the
+        values of the ordering fields converted to their python type.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+        except (TypeError, ValueError) as excpt:
+            raise drf.exceptions.NotFound(self.invalid_cursor_message) from excpt
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise drf.exceptions.NotFound(self.invalid_cursor_message)
+
+        for index, order in enumerate(self.ordering):
+            try:
+                field = model._meta.get_field(order.lstrip("-"))  # noqa: SLF001
+            except FieldDoesNotExist:
+                continue
+
+            try:
+                position[index] = field.to_python(position[index])
+            except (ValidationError, TypeError, ValueError) as excpt:
+                raise drf.exceptions.NotFound(self.invalid_cursor_message) from excpt
+        return position
+
+    def get_next_link(self):
+        """Return the url of the next page, if any."""
+        if self.next_position is None:
+            return None
+
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(self.next_position).encode("ascii")
+        ).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_paginated_response(self, data):
+        """Return the page without counting objects."""
+        return drf.response.Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        """Describe the paginated response."""
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
 class UserListThrottleBurst(UserRateThrottle):
     """Throttle for the user list endpoint."""
 
@@ -355,11 +509,17 @@ class DocumentViewSet(
        Example: DELETE /documents/{id}/
 
     ### Additional Actions:
-    1. **Trashbin**: List soft deleted documents for a document owner
-        Example: GET /documents/{id}/trashbin/
+    1. **Trashbin**: List soft deleted documents for a document owner, soft delete or
+        restore several documents at once.
+        Examples:
+        - GET /documents/{id}/trashbin/
+        - POST /documents/bulk-delete/
+        - POST /documents/bulk-restore/
 
-    2. **Children**: List or create child documents.
-        Example: GET, POST /documents/{id}/children/
+    2. **Children**: List or create child documents, or create several at once.
+        Examples:
+        - GET, POST /documents/{id}/children/
+        - POST /documents/{id}/children/batch/
 
     3. **Versions List**: Retrieve version history of a document.
         Example: GET /documents/{id}/versions/
@@ -407,6 +567,15 @@ class DocumentViewSet(
         - Ascending: GET /api/v1.0/documents/?ordering=created_at
         - Desceding: GET /api/v1.0/documents/?ordering=-title
 
+    ### Pagination:
+        List, children, descendants, favorite list and trashbin are paginated by page
+        number. Passing a `cursor` query parameter, empty for the first page, switches
+        to cursor pagination: documents are not counted and the `next` url carries the
+        cursor of the following page.
+
+        Example:
+        - GET /api/v1.0/documents/?cursor=&page_size=50
+
     ### Filtering:
         - `is_creator_me=true`: Returns documents created by the current user.
         - `is_creator_me=false`: Returns documents created by other users.
@@ -442,6 +611,24 @@ class DocumentViewSet(
     list_serializer_class = serializers.ListDocumentSerializer
     trashbin_serializer_class = serializers.ListDocumentSerializer
     tree_serializer_class = serializers.ListDocumentSerializer
+    cursor_pagination_actions = [
+        "list",
+        "children",
+        "descendants",
+        "favorite_list",
+        "trashbin",
+    ]
+
+    @property
+    def paginator(self):
+        """Use cursor pagination on list actions when requested by the client."""
+        if (
+            not hasattr(self, "_paginator")
+            and self.action in self.cursor_pagination_actions
+            and CursorPagination.cursor_query_param in self.request.query_params
+        ):
+            self._paginator = CursorPagination()
+        return super().paginator
 
     def annotate_is_favorite(self, queryset):
         """
@@ -466,9 +653,12 @@ class DocumentViewSet(
         output_field = ArrayField(base_field=db.CharField())
 
         if user.is_authenticated:
+            ancestors_paths = models.AncestorsPaths(
+                db.OuterRef("path"), steplen=models.Document.steplen, include_self=True
+            )
             user_roles_subquery = models.DocumentAccess.objects.filter(
                 db.Q(user=user) | db.Q(team__in=user.teams),
-                document__path=Left(db.OuterRef("path"), Length("document__path")),
+                models.EqualsAny(db.F("document_path"), ancestors_paths),
             ).values_list("role", flat=True)
 
             return queryset.annotate(
@@ -495,20 +685,22 @@ class DocumentViewSet(
 
         queryset = queryset.filter(ancestors_deleted_at__isnull=True)
 
-        # Filter documents to which the current user has access...
-        access_documents_ids = models.DocumentAccess.objects.filter(
-            db.Q(user=user) | db.Q(team__in=user.teams)
-        ).values_list("document_id", flat=True)
-
-        # ...or that were previously accessed and are not restricted
-        traced_documents_ids = models.LinkTrace.objects.filter(user=user).values_list(
-            "document_id", flat=True
+        # The ids of documents to which the current user has access or that were
+        # previously accessed are cached and passed to the database as arrays
+        access_documents_ids, traced_documents_ids = (
+            models.EqualsAny(
+                db.F("id"),
+                db.Value(ids, output_field=ArrayField(base_field=db.UUIDField())),
+            )
+            for ids in user.get_documents_ids()
         )
 
+        # Filter documents to which the current user has access...
+        # ...or that were previously accessed and are not restricted
         return queryset.filter(
-            db.Q(id__in=access_documents_ids)
+            db.Q(access_documents_ids)
             | (
-                db.Q(id__in=traced_documents_ids)
+                db.Q(traced_documents_ids)
                 & ~db.Q(link_reach=models.LinkReachChoices.RESTRICTED)
             )
         )
@@ -560,11 +752,7 @@ class DocumentViewSet(
 
         # Among the results, we may have documents that are ancestors/descendants
         # of each other. In this case we want to keep only the highest ancestors.
-        root_paths = utils.filter_root_paths(
-            queryset.order_by("path").values_list("path", flat=True),
-            skip_sorting=True,
-        )
-        queryset = queryset.filter(path__in=root_paths)
+        queryset = queryset.highest_ancestors()
 
         # Annotate the queryset with an attribute marking instances as highest ancestor
         # in order to save some time while computing abilities on the instance
@@ -609,14 +797,6 @@ class DocumentViewSet(
     @transaction.atomic
     def perform_create(self, serializer):
         """Set the current user as creator and owner of the newly created object."""
-
-        # locks the table to ensure safe concurrent access
-        with connection.cursor() as cursor:
-            cursor.execute(
-                f'LOCK TABLE "{models.Document._meta.db_table}" '  # noqa: SLF001
-                "IN SHARE ROW EXCLUSIVE MODE;"
-            )
-
         obj = models.Document.add_root(
             creator=self.request.user,
             **serializer.validated_data,
@@ -632,6 +812,61 @@ class DocumentViewSet(
         """Override to implement a soft delete instead of dumping the record in database."""
         instance.soft_delete()
 
+    def get_bulk_action_documents(self, ability):
+        """
+        Return the documents targeted by a bulk action after checking that the current
+        user has the given ability on each of them, computed for all at once.
+        """
+        serializer = serializers.DocumentIdsSerializer(data=self.request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data["ids"]
+
+        documents = list(
+            self.annotate_user_roles(models.Document.objects.filter(id__in=ids))
+        )
+        if len(documents) != len(ids):
+            raise Http404
+
+        user = self.request.user
+        models.Document.prefetch_abilities(documents, user)
+        if not all(document.get_abilities(user)[ability] for document in documents):
+            raise drf.exceptions.PermissionDenied()
+        return documents
+
+    @drf.decorators.action(
+        detail=False,
+        methods=["post"],
+        url_path="bulk-delete",
+        permission_classes=[permissions.IsAuthenticated],
+    )
+    def bulk_delete(self, request, *args, **kwargs):
+        """
+        Soft delete several documents at once. Documents that are already deleted are
+        ignored and documents with an ancestor among them are deleted with it, the ids
+        of the documents deleted are returned.
+        """
+        documents = self.get_bulk_action_documents("destroy")
+        ids = models.Document.soft_delete_documents(
+            [document.id for document in documents]
+        )
+        return drf_response.Response({"ids": [str(id_) for id_ in ids]})
+
+    @drf.decorators.action(
+        detail=False,
+        methods=["post"],
+        url_path="bulk-restore",
+        permission_classes=[permissions.IsAuthenticated],
+    )
+    def bulk_restore(self, request, *args, **kwargs):
+        """
+        Restore several soft deleted documents at once. Documents that are not deleted
+        or that were permanently deleted are ignored, the ids of the documents restored
+        are returned.
+        """
+        documents = self.get_bulk_action_documents("restore")
+        ids = models.Document.restore_documents([document.id for document in documents])
+        return drf_response.Response({"ids": [str(id_) for id_ in ids]})
+
     @drf.decorators.action(
         detail=False,
         methods=["get"],
@@ -680,14 +915,6 @@ class DocumentViewSet(
         """
         Create a document on behalf of a specified owner (pre-existing user or invited).
         """
-
-        # locks the table to ensure safe concurrent access
-        with connection.cursor() as cursor:
-            cursor.execute(
-                f'LOCK TABLE "{models.Document._meta.db_table}" '  # noqa: SLF001
-                "IN SHARE ROW EXCLUSIVE MODE;"
-            )
-
         # Deserialize and validate the data
         serializer = serializers.ServerCreateDocumentSerializer(data=request.data)
         if not serializer.is_valid():
@@ -827,6 +1054,81 @@ class DocumentViewSet(
 
         return self.get_response_for_queryset(queryset)
 
+    @drf.decorators.action(detail=True, methods=["post"], url_path="children/batch")
+    def children_batch(self, request, *args, **kwargs):
+        """
+        Create several children of a document at once, e.g. when importing a folder.
+        The paths of all the children are reserved under one lock on the parent and
+        the children and their owner accesses are inserted in bulk.
+        """
+        document = self.get_object()
+
+        if not isinstance(request.data, list):
+            raise drf.exceptions.ValidationError(
+                {"detail": "A list of documents is expected."}
+            )
+        if len(request.data) > settings.DOCUMENT_CHILDREN_BATCH_MAX_SIZE:
+            raise drf.exceptions.ValidationError(
+                {
+                    "detail": (
+                        "Cannot create more than "
+                        f"{settings.DOCUMENT_CHILDREN_BATCH_MAX_SIZE:d} documents at once."
+                    )
+                }
+            )
+
+        serializer = serializers.DocumentSerializer(
+            data=request.data, many=True, context=self.get_serializer_context()
+        )
+        serializer.is_valid(raise_exception=True)
+
+        # Only keep the attachments that the user can read, as for a single document
+        extracted_attachments = [
+            set(get_content_attachments(data.get("content") or ""))
+            for data in serializer.validated_data
+        ]
+        readable_attachments = models.Document.objects.readable_attachments(
+            request.user, set().union(*extracted_attachments)
+        )
+
+        children = []
+        for data, attachments in zip(
+            serializer.validated_data, extracted_attachments, strict=True
+        ):
+            content = data.pop("content", None)
+            child = models.Document(
+                creator=request.user,
+                attachments=list(attachments & readable_attachments),
+                **data,
+            )
+            if content:
+                child.content = content
+            children.append(child)
+
+        with transaction.atomic():
+            # "select_for_update" locks the parent to ensure safe concurrent access
+            locked_parent = models.Document.objects.select_for_update().get(
+                pk=document.pk
+            )
+            locked_parent.add_children(children)
+            models.DocumentAccess.objects.bulk_create(
+                [
+                    models.DocumentAccess(
+                        document=child,
+                        document_path=child.path,
+                        user=request.user,
+                        role=models.RoleChoices.OWNER,
+                    )
+                    for child in children
+                ]
+            )
+            models.User.invalidate_documents_ids_cache(user_ids=[request.user.id])
+
+        return drf.response.Response(
+            [{"id": str(child.id)} for child in children],
+            status=status.HTTP_201_CREATED,
+        )
+
     @drf.decorators.action(
         detail=True,
         methods=["get"],
@@ -941,7 +1243,8 @@ class DocumentViewSet(
         document to allow cross-access.
 
         Optionally duplicates accesses if `with_accesses` is set to true
-        in the payload.
+        in the payload and the descendants of the document if `with_descendants`
+        is set to true.
         """
         # Get document while checking permissions
         document = self.get_object()
@@ -951,45 +1254,38 @@ class DocumentViewSet(
         )
         serializer.is_valid(raise_exception=True)
         with_accesses = serializer.validated_data.get("with_accesses", False)
+        title = capfirst(_("copy of {title}").format(title=document.title))
 
-        base64_yjs_content = document.content
-
-        # Duplicate the document instance
-        link_kwargs = (
-            {"link_reach": document.link_reach, "link_role": document.link_role}
-            if with_accesses
-            else {}
-        )
-        extracted_attachments = set(extract_attachments(document.content))
-        attachments = list(extracted_attachments & set(document.attachments))
-        duplicated_document = document.add_sibling(
-            "right",
-            title=capfirst(_("copy of {title}").format(title=document.title)),
-            content=base64_yjs_content,
-            attachments=attachments,
-            duplicated_from=document,
-            creator=request.user,
-            **link_kwargs,
+        copies = document.duplicate(
+            title,
+            request.user,
+            with_descendants=serializer.validated_data.get("with_descendants", False),
+            with_links=with_accesses,
         )
+        duplicated_document = copies[0]
 
         # Always add the logged-in user as OWNER
         accesses_to_create = [
             models.DocumentAccess(
                 document=duplicated_document,
+                document_path=duplicated_document.path,
                 user=request.user,
                 role=models.RoleChoices.OWNER,
             )
         ]
 
-        # If accesses should be duplicated, add other users' accesses as per original document
+        # If accesses should be duplicated, add other users' accesses as per original
+        # documents
         if with_accesses:
+            copies_by_original_id = {copy.duplicated_from_id: copy for copy in copies}
             original_accesses = models.DocumentAccess.objects.filter(
-                document=document
+                document_id__in=copies_by_original_id
             ).exclude(user=request.user)
 
             accesses_to_create.extend(
                 models.DocumentAccess(
-                    document=duplicated_document,
+                    document=copies_by_original_id[access.document_id],
+                    document_path=copies_by_original_id[access.document_id].path,
                     user_id=access.user_id,
                     team=access.team,
                     role=access.role,
@@ -999,6 +1295,10 @@ class DocumentViewSet(
 
         # Bulk create all the duplicated accesses
         models.DocumentAccess.objects.bulk_create(accesses_to_create)
+        models.User.invalidate_documents_ids_cache(
+            user_ids=[access.user_id for access in accesses_to_create],
+            teams=[access.team for access in accesses_to_create],
+        )
 
         return drf_response.Response(
             {"id": str(duplicated_document.id)}, status=status.HTTP_201_CREATED
@@ -1022,7 +1322,7 @@ class DocumentViewSet(
         # document. Filter to get the minimum access date for the logged-in user
         access_queryset = models.DocumentAccess.objects.filter(
             db.Q(user=user) | db.Q(team__in=user.teams),
-            document__path=Left(db.Value(document.path), Length("document__path")),
+            document_path__in=document.get_ancestors_paths(document.path),
         ).aggregate(min_date=db.Min("created_at"))
 
         # Handle the case where the user has no accesses
@@ -1062,7 +1362,7 @@ class DocumentViewSet(
             access.created_at
             for access in models.DocumentAccess.objects.filter(
                 db.Q(user=user) | db.Q(team__in=user.teams),
-                document__path=Left(db.Value(document.path), Length("document__path")),
+                document_path__in=document.get_ancestors_paths(document.path),
             )
         )
 
@@ -1253,38 +1553,15 @@ class DocumentViewSet(
         key = f"{url_params['pk']:s}/{url_params['attachment']:s}"
 
         # Look for a document to which the user has access and that includes this attachment
-        # We must look into all descendants of any document to which the user has access per se
-        readable_per_se_paths = (
-            self.queryset.readable_per_se(user)
-            .order_by("path")
-            .values_list("path", flat=True)
-        )
+        # The user must have access per se to this document or to one of its ancestors
+        readable_attachments = self.queryset.readable_attachments(user, [key])
 
-        attachments_documents = (
-            self.queryset.filter(attachments__contains=[key])
-            .only("path")
-            .order_by("path")
-        )
-        readable_attachments_paths = filter_descendants(
-            [doc.path for doc in attachments_documents],
-            readable_per_se_paths,
-            skip_sorting=True,
-        )
-
-        if not readable_attachments_paths:
+        if not readable_attachments:
             logger.debug("User '%s' lacks permission for attachment", user)
             raise drf.exceptions.PermissionDenied()
 
         # Check if the attachment is ready
-        s3_client = default_storage.connection.meta.client
-        bucket_name = default_storage.bucket_name
-        head_resp = s3_client.head_object(Bucket=bucket_name, Key=key)
-        metadata = head_resp.get("Metadata", {})
-
-        if (
-            metadata.get("status", enums.DocumentAttachmentStatus.READY)
-            != enums.DocumentAttachmentStatus.READY
-        ):
+        if get_attachment_status(key) != enums.DocumentAttachmentStatus.READY:
             raise drf.exceptions.PermissionDenied()
 
         # Generate S3 authorization headers using the extracted URL parameters
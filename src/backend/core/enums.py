@@ -21,6 +21,14 @@ MEDIA_STORAGE_URL_PATTERN = re.compile(
 MEDIA_STORAGE_URL_EXTRACT = re.compile(
     f"{settings.MEDIA_URL:s}({UUID_REGEX}/{ATTACHMENTS_FOLDER}/{UUID_REGEX}{FILE_EXT_REGEX})"
 )
+# Maximum length of the media urls matched by MEDIA_STORAGE_URL_EXTRACT
+MEDIA_STORAGE_URL_EXTRACT_MAX_LENGTH = (
+    len(settings.MEDIA_URL) + 36 + len(ATTACHMENTS_FOLDER) + 36 + 2 + 11
+)
+# Same pattern to search the raw bytes of Yjs updates, where strings are UTF-8 encoded
+MEDIA_STORAGE_URL_EXTRACT_BYTES = re.compile(
+    MEDIA_STORAGE_URL_EXTRACT.pattern.encode("utf-8")
+)
 
 
 # In Django's code base, `LANGUAGES` is set by default with all supported languages.
@@ -41,6 +49,13 @@ class MoveNodePositionChoices(models.TextChoices):
     RIGHT = "right", _("Right")
 
 
+class DocumentContentFormat(StrEnum):
+    """Defines the formats in which document contents can be stored."""
+
+    BASE64 = "base64"
+    GZIP = "gzip"
+
+
 class DocumentAttachmentStatus(StrEnum):
     """Defines the possible statuses for an attachment."""
 
@@ -0,0 +1,98 @@
+"""Management command comparing the ways of extracting attachments from contents."""
+
+import base64
+import re
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+import pycrdt
+
+from core import enums
+from core.utils import base64_yjs_to_xml, extract_attachments, get_content_attachments
+
+
+def extract_attachments_from_xml(content):
+    """
+    Extract attachments the way it was done before scanning the raw Yjs update: replay
+    the update in a document, render it to xml and search the xml.
+    """
+    return re.findall(enums.MEDIA_STORAGE_URL_EXTRACT, base64_yjs_to_xml(content))
+
+
+class Command(BaseCommand):
+    """
+    Compare the time needed to extract the attachments of contents of several sizes by
+    rendering them to xml, by scanning the raw Yjs update and from the cache.
+    """
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        """Add the sizes of the contents and the number of repetitions as arguments."""
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[1, 10],
+            help="Sizes of the Yjs updates in megabytes.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Number of measures for each method, the best one is kept.",
+        )
+
+    def create_content(self, size):
+        """
+        Return a base64 Yjs content of about the given size in megabytes, made of
+        paragraphs of text with an image every ten paragraphs.
+        """
+        paragraph = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 16
+        nodes = []
+        for index in range(size * (2**20) // len(paragraph)):
+            if index % 10 == 0:
+                key = f"{uuid.uuid4()!s}/attachments/{uuid.uuid4()!s}.png"
+                nodes.append(
+                    pycrdt.XmlElement("img", {"src": f"{settings.MEDIA_URL:s}{key:s}"})
+                )
+            nodes.append(pycrdt.XmlElement("p", {}, [pycrdt.XmlText(paragraph)]))
+
+        ydoc = pycrdt.Doc()
+        ydoc["document-store"] = pycrdt.XmlFragment(nodes)
+        return base64.b64encode(ydoc.get_update()).decode("utf-8")
+
+    def measure(self, extract, content, repeat):
+        """Return the best time to extract the attachments of a content."""
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            extract(content)
+            durations.append(time.perf_counter() - start)
+        return min(durations)
+
+    def handle(self, *args, **options):
+        """Execute management command."""
+        for size in options["sizes"]:
+            content = self.create_content(size)
+            attachments = extract_attachments_from_xml(content)
+            if sorted(extract_attachments(content)) != sorted(attachments):
+                self.stderr.write(
+                    f"[ERROR] {size:d}MB: the attachments extracted differ."
+                )
+
+            # Warm the cache so that only cache hits are measured
+            get_content_attachments(content)
+            for name, extract in [
+                ("xml", extract_attachments_from_xml),
+                ("scan", extract_attachments),
+                ("cache", get_content_attachments),
+            ]:
+                duration = self.measure(extract, content, options["repeat"])
+                self.stdout.write(
+                    f"[INFO] {size:d}MB, {len(attachments):d} attachments, "
+                    f"extraction from {name:s}: {duration * 1000:.1f}ms"
+                )
@@ -0,0 +1,140 @@
+"""Management command comparing the ways of listing the highest accessible documents."""
+
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core import models
+from core.api.utils import filter_root_paths
+
+
+def get_highest_ancestors_in_python(queryset):
+    """
+    Keep the highest ancestors of a queryset the way it was done before the reduction
+    was made in the database: load all paths, reduce them and filter on the result.
+    """
+    root_paths = filter_root_paths(
+        queryset.order_by("path").values_list("path", flat=True), skip_sorting=True
+    )
+    return queryset.filter(path__in=root_paths)
+
+
+class Command(BaseCommand):
+    """
+    Compare the time needed to count and fetch the first page of the highest documents
+    accessible to a user, with the reduction made in python or in the database. The
+    documents are created in a transaction that is rolled back at the end.
+    """
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        """Add the numbers of accessible documents and of repetitions as arguments."""
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[1000, 10000, 100000],
+            help="Numbers of documents accessible to the user.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Number of measures for each method, the best one is kept.",
+        )
+        parser.add_argument(
+            "--page-size",
+            type=int,
+            default=20,
+            help="Number of documents fetched for the first page.",
+        )
+
+    def create_documents(self, user, size):
+        """
+        Create documents accessible to the user: half of them are roots, the other
+        half are children of these roots so that they are filtered out.
+        """
+        # pylint: disable=protected-access
+        last_root = models.Document.get_last_root_node()
+        start = last_root._get_lastpos_in_path() if last_root else 0  # noqa: SLF001
+
+        documents = []
+        for index in range(start + 1, start + size // 2 + 1):
+            root_path = models.Document._get_path(None, 1, index)  # noqa: SLF001
+            documents.append(
+                models.Document(path=root_path, depth=1, numchild=1, title="root")
+            )
+            documents.append(
+                models.Document(
+                    path=models.Document._get_path(root_path, 2, 1),  # noqa: SLF001
+                    depth=2,
+                    title="child",
+                    ancestors_link_definitions=[
+                        {"link_reach": "restricted", "link_role": "reader"}
+                    ],
+                )
+            )
+        models.Document.objects.bulk_create(documents, batch_size=5000)
+        models.DocumentAccess.objects.bulk_create(
+            [
+                models.DocumentAccess(
+                    document=document,
+                    document_path=document.path,
+                    user=user,
+                    role="owner",
+                )
+                for document in documents
+            ],
+            batch_size=5000,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {models.Document._meta.db_table:s}")  # noqa: SLF001
+            cursor.execute(
+                f"ANALYZE {models.DocumentAccess._meta.db_table:s}"  # noqa: SLF001
+            )
+
+    def measure(self, get_highest_ancestors, queryset, page_size, repeat):
+        """Return the best time to count and fetch the first page of documents."""
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            highest_ancestors = get_highest_ancestors(queryset)
+            highest_ancestors.count()
+            list(highest_ancestors[:page_size])
+            durations.append(time.perf_counter() - start)
+        return min(durations)
+
+    def handle(self, *args, **options):
+        """Execute management command."""
+        for size in options["sizes"]:
+            with transaction.atomic():
+                user_id = uuid.uuid4()
+                user = models.User.objects.create(
+                    id=user_id, email=f"{user_id!s}@example.com", username=str(user_id)
+                )
+                self.create_documents(user, size)
+                accessible_documents = models.Document.objects.filter(
+                    id__in=models.DocumentAccess.objects.filter(user=user).values(
+                        "document_id"
+                    )
+                ).order_by("-updated_at")
+
+                for name, get_highest_ancestors in [
+                    ("python", get_highest_ancestors_in_python),
+                    ("database", models.DocumentQuerySet.highest_ancestors),
+                ]:
+                    duration = self.measure(
+                        get_highest_ancestors,
+                        accessible_documents,
+                        options["page_size"],
+                        options["repeat"],
+                    )
+                    self.stdout.write(
+                        f"[INFO] {size:d} documents, reduction in {name:s}: "
+                        f"{duration * 1000:.1f}ms"
+                    )
+
+                transaction.set_rollback(True)
@@ -0,0 +1,70 @@
+"""Management command measuring the throughput of concurrent root documents creation."""
+
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core import models
+
+
+class Command(BaseCommand):
+    """
+    Create root documents from several threads, each in its own transaction, and report
+    the number of documents created per second for each number of workers. Throughput
+    should grow with the number of workers as long as creations don't lock the table.
+    The documents created are deleted at the end.
+    """
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        """Add the numbers of workers and of documents per worker as arguments."""
+        parser.add_argument(
+            "--workers",
+            type=int,
+            nargs="+",
+            default=[1, 2, 4, 8],
+            help="Numbers of workers creating documents concurrently.",
+        )
+        parser.add_argument(
+            "--documents",
+            type=int,
+            default=100,
+            help="Number of documents created by each worker.",
+        )
+
+    def create_documents(self, title, number):
+        """Create root documents one transaction at a time, like the API does."""
+        try:
+            for _ in range(number):
+                with transaction.atomic():
+                    models.Document.add_root(title=title)
+        finally:
+            connection.close()
+
+    def handle(self, *args, **options):
+        """Execute management command."""
+        title = f"benchmark-{uuid.uuid4()!s}"
+        try:
+            for workers in options["workers"]:
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = [
+                        executor.submit(
+                            self.create_documents, title, options["documents"]
+                        )
+                        for _ in range(workers)
+                    ]
+                    for future in futures:
+                        future.result()
+                duration = time.perf_counter() - start
+
+                throughput = workers * options["documents"] / duration
+                self.stdout.write(
+                    f"[INFO] {workers:d} workers: {throughput:.1f} documents/s"
+                )
+        finally:
+            models.Document.objects.filter(title=title).delete()
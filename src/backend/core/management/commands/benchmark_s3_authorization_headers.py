@@ -0,0 +1,70 @@
+"""Management command comparing the throughput of s3 authorization header generation."""
+
+import time
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+import botocore
+
+from core.api.utils import generate_s3_authorization_headers
+
+
+def generate_presigned_authorization_headers(key):
+    """
+    Generate authorization headers for an s3 object the way it was done before
+    the signer was reused: presign the url and build a new signer on each call.
+    """
+    url = default_storage.unsigned_connection.meta.client.generate_presigned_url(
+        "get_object",
+        ExpiresIn=0,
+        Params={"Bucket": default_storage.bucket_name, "Key": key},
+    )
+    request = botocore.awsrequest.AWSRequest(method="get", url=url)
+
+    s3_client = default_storage.connection.meta.client
+    # pylint: disable=protected-access
+    credentials = s3_client._request_signer._credentials  # noqa: SLF001
+    frozen_credentials = credentials.get_frozen_credentials()
+    region = s3_client.meta.region_name
+    auth = botocore.auth.S3SigV4Auth(frozen_credentials, "s3", region)
+    auth.add_auth(request)
+
+    return request
+
+
+class Command(BaseCommand):
+    """Compare the number of s3 authorization headers generated per second."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        """Add the number of iterations as an argument."""
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=10000,
+            help="Number of authorization headers to generate with each method.",
+        )
+
+    def handle(self, *args, **options):
+        """Execute management command."""
+        iterations = options["iterations"]
+        key = "00000000-0000-0000-0000-000000000000/attachments/image.png"
+
+        for name, generate in [
+            ("presigned url", generate_presigned_authorization_headers),
+            ("reusable signer", generate_s3_authorization_headers),
+        ]:
+            # Warm up clients and caches before measuring
+            generate(key)
+
+            start = time.perf_counter()
+            for _ in range(iterations):
+                generate(key)
+            duration = time.perf_counter() - start
+
+            self.stdout.write(
+                f"[INFO] {name:s}: {iterations / duration:.0f} headers/s "
+                f"({iterations:d} in {duration:.2f}s)"
+            )
@@ -0,0 +1,82 @@
+"""Management command checking the link definitions stored on documents."""
+
+import itertools
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Document
+
+
+class Command(BaseCommand):
+    """
+    Check the ancestors link definitions stored on each document against the
+    document tree. Documents are walked in the order of their path so that the links
+    of the ancestors of each document are known without querying them.
+    """
+
+    help = __doc__
+
+    fields = ["ancestors_link_definitions"]
+
+    def add_arguments(self, parser):
+        """Add the fix option and the batch size as arguments."""
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Write the expected values on inconsistent documents.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of documents loaded from the database at once.",
+        )
+
+    def iter_inconsistent_documents(self, batch_size):
+        """Yield documents whose stored link definitions differ from the tree."""
+        documents = (
+            Document.objects.order_by("path")
+            .only("id", "path", "link_reach", "link_role", *self.fields)
+            .iterator(chunk_size=batch_size)
+        )
+
+        ancestors = []  # Path and link of the ancestors of the current document
+        for document in documents:
+            while ancestors and not document.path.startswith(ancestors[-1][0]):
+                ancestors.pop()
+
+            link = {"link_reach": document.link_reach, "link_role": document.link_role}
+            ancestors_link_definitions = [
+                ancestor_link for _path, ancestor_link in ancestors
+            ]
+            ancestors.append((document.path, link))
+
+            if document.ancestors_link_definitions != ancestors_link_definitions:
+                document.ancestors_link_definitions = ancestors_link_definitions
+                yield document
+
+    def handle(self, *args, **options):
+        """Execute management command."""
+        batch_size = options["batch_size"]
+        inconsistent_documents = self.iter_inconsistent_documents(batch_size)
+
+        total_inconsistent = 0
+        while batch := list(itertools.islice(inconsistent_documents, batch_size)):
+            total_inconsistent += len(batch)
+            for document in batch:
+                self.stderr.write(
+                    f"[INCONSISTENT] Document {document.id!s} has outdated link "
+                    "definitions."
+                )
+            if options["fix"]:
+                Document.objects.bulk_update(batch, self.fields)
+
+        if total_inconsistent and not options["fix"]:
+            raise CommandError(
+                f"{total_inconsistent} documents have inconsistent link definitions."
+            )
+
+        self.stdout.write(
+            f"[DONE] {total_inconsistent} documents with inconsistent link "
+            f"definitions{' fixed' if options['fix'] else ''}."
+        )
@@ -0,0 +1,145 @@
+"""Management command converting the contents of documents to a storage format."""
+
+import hashlib
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from botocore.exceptions import ClientError
+
+from core import enums
+from core.models import Document
+from core.utils import decode_content, encode_content, get_content_format
+
+# pylint: disable=broad-exception-caught
+
+SKIPPED = "skipped"
+
+
+class Command(BaseCommand):
+    """
+    Rewrite the contents of all documents in the given storage format, skipping
+    contents already stored in this format. Contents edited during the conversion are
+    skipped and keep the format in which they were saved.
+    """
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        """Add the target format, batch size and number of workers as arguments."""
+        parser.add_argument(
+            "--format",
+            choices=list(enums.DocumentContentFormat),
+            default=None,
+            help="Target format, defaults to the DOCUMENT_CONTENT_STORAGE_FORMAT setting.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of documents loaded from the database at once.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=8,
+            help="Number of contents converted in parallel.",
+        )
+
+    def convert_content(self, file_key, content_hash, content_format):
+        """
+        Convert a document content in object storage if it is still the content with
+        the given hash, when the document tracks one. Return the bytes written, None if
+        the content did not need to be converted or SKIPPED if it was edited since the
+        document was loaded.
+        """
+        s3_client = default_storage.connection.meta.client
+        try:
+            response = s3_client.get_object(
+                Bucket=default_storage.bucket_name, Key=file_key
+            )
+        except ClientError as exc:
+            if exc.response["Error"]["Code"] == "NoSuchKey":
+                return None
+            raise
+
+        # The ETag is not the MD5 of contents uploaded in parts: hash the content
+        data = response["Body"].read()
+        if content_hash and hashlib.md5(data).hexdigest() != content_hash:  # noqa: S324
+            return SKIPPED
+
+        if get_content_format(data) == content_format:
+            return None
+
+        content = decode_content(data).decode("utf-8")
+        bytes_content = encode_content(content, content_format)
+        # Only overwrite the content that was read, not a content saved meanwhile
+        try:
+            s3_client.put_object(
+                Bucket=default_storage.bucket_name,
+                Key=file_key,
+                Body=bytes_content,
+                IfMatch=response["ETag"],
+            )
+        except ClientError as exc:
+            if exc.response["Error"]["Code"] in ("PreconditionFailed", "NoSuchKey"):
+                return SKIPPED
+            raise
+        return bytes_content
+
+    def handle(self, *args, **options):
+        """Execute management command."""
+        content_format = enums.DocumentContentFormat(
+            options["format"] or settings.DOCUMENT_CONTENT_STORAGE_FORMAT
+        )
+        documents = Document.objects.only("id", "content_hash").iterator(
+            chunk_size=options["batch_size"]
+        )
+
+        total_converted = total_skipped = total_failed = 0
+        # Object storage calls are made in parallel, database queries in this thread
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            while batch := list(itertools.islice(documents, options["batch_size"])):
+                futures = {
+                    document: executor.submit(
+                        self.convert_content,
+                        document.file_key,
+                        document.content_hash,
+                        content_format,
+                    )
+                    for document in batch
+                }
+                for document, future in futures.items():
+                    try:
+                        bytes_content = future.result()
+                    except Exception as exc:  # noqa: BLE001
+                        total_failed += 1
+                        self.stderr.write(
+                            f"[ERROR] Could not convert content of document "
+                            f"{document.id!s}: {exc}"
+                        )
+                        continue
+
+                    if bytes_content is None:
+                        continue
+
+                    if bytes_content is SKIPPED:
+                        total_skipped += 1
+                        continue
+
+                    # Keep tracking the hash of the content as stored in object storage
+                    Document.objects.filter(
+                        pk=document.pk, content_hash=document.content_hash
+                    ).update(
+                        content_hash=hashlib.md5(bytes_content).hexdigest(),  # noqa: S324
+                        content_size=len(bytes_content),
+                    )
+                    total_converted += 1
+
+        self.stdout.write(
+            f"[DONE] Converted {total_converted} document contents to "
+            f"{content_format!s} ({total_skipped} skipped, {total_failed} failed)."
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.8 on 2026-10-18 09:12
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_document_content_preview_base64_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['attachments'], name='document_attachments_gin_idx'),
+        ),
+    ]
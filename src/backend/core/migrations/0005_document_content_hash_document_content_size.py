@@ -0,0 +1,23 @@
+# Generated by Django 5.1.8 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_document_document_attachments_gin_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, help_text='MD5 hash of the content last written to object storage.', max_length=32, null=True, verbose_name='content hash'),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='content_size',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, help_text='Size in bytes of the content last written to object storage.', null=True, verbose_name='content size'),
+        ),
+    ]
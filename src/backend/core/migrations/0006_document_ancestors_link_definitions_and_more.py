@@ -0,0 +1,66 @@
+# Generated by Django 5.1.8 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_document_content_hash_document_content_size'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='ancestors_link_definitions',
+            field=models.JSONField(blank=True, default=list, editable=False, help_text='Link reach and role of the ancestors of the document, from the root.', verbose_name='ancestors link definitions'),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='computed_link_reach',
+            field=models.CharField(choices=[('restricted', 'Restricted'), ('authenticated', 'Authenticated'), ('public', 'Public')], default='restricted', editable=False, help_text='Widest link reach of the document and its ancestors.', max_length=20, verbose_name='computed link reach'),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='computed_link_role',
+            field=models.CharField(choices=[('reader', 'Reader'), ('editor', 'Editor')], default='reader', editable=False, help_text='Highest link role offered with the computed link reach.', max_length=20, verbose_name='computed link role'),
+        ),
+        migrations.RunSQL(
+            sql="""
+            UPDATE impress_document AS document SET
+                ancestors_link_definitions = COALESCE(
+                    (
+                        SELECT jsonb_agg(
+                            jsonb_build_object(
+                                'link_reach', ancestor.link_reach,
+                                'link_role', ancestor.link_role
+                            )
+                            ORDER BY ancestor.path
+                        )
+                        FROM impress_document AS ancestor
+                        WHERE ancestor.path = ANY(ARRAY(
+                            SELECT left(document.path, 7 * i)
+                            FROM generate_series(1, document.depth - 1) AS i
+                        ))
+                    ),
+                    '[]'::jsonb
+                ),
+                (computed_link_reach, computed_link_role) = (
+                    SELECT link.link_reach, link.link_role
+                    FROM impress_document AS link
+                    WHERE link.path = ANY(ARRAY(
+                        SELECT left(document.path, 7 * i)
+                        FROM generate_series(1, document.depth) AS i
+                    ))
+                    ORDER BY
+                        array_position(
+                            ARRAY['restricted', 'authenticated', 'public'],
+                            link.link_reach::text
+                        ) DESC,
+                        array_position(ARRAY['reader', 'editor'], link.link_role::text) DESC
+                    LIMIT 1
+                );
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
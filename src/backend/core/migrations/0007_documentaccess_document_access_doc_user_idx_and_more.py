@@ -0,0 +1,21 @@
+# Generated by Django 5.1.8 on 2026-10-18 10:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_document_ancestors_link_definitions_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='documentaccess',
+            index=models.Index(fields=['document', 'user'], include=('role',), name='document_access_doc_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documentaccess',
+            index=models.Index(fields=['document', 'team'], include=('role',), name='document_access_doc_team_idx'),
+        ),
+    ]
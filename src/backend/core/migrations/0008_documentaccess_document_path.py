@@ -0,0 +1,44 @@
+# Generated by Django 5.1.8 on 2026-10-18 11:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_documentaccess_document_access_doc_user_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='documentaccess',
+            name='document_access_doc_user_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='documentaccess',
+            name='document_access_doc_team_idx',
+        ),
+        migrations.AddField(
+            model_name='documentaccess',
+            name='document_path',
+            field=models.CharField(db_collation='C', default='', editable=False, max_length=252),
+            preserve_default=False,
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE impress_document_access AS access
+                SET document_path = document.path
+                FROM impress_document AS document
+                WHERE document.id = access.document_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='documentaccess',
+            index=models.Index(fields=['user', 'document_path'], include=('role',), name='document_access_user_path_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documentaccess',
+            index=models.Index(fields=['team', 'document_path'], include=('role',), name='document_access_team_path_idx'),
+        ),
+    ]
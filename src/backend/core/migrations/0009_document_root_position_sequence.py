@@ -0,0 +1,35 @@
+# Generated by Django 5.1.8 on 2026-10-18 12:04
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_documentaccess_document_path'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+            CREATE SEQUENCE IF NOT EXISTS impress_document_root_position_seq;
+
+            -- Start after the position of the last root, decoded from its path
+            SELECT setval('impress_document_root_position_seq', last_root.position)
+            FROM (
+                SELECT sum(
+                    (strpos(
+                        '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz',
+                        substr(root.path, i, 1)
+                    ) - 1) * power(62::numeric, 7 - i)
+                )::bigint AS position
+                FROM (
+                    SELECT path FROM impress_document
+                    WHERE depth = 1 ORDER BY path DESC LIMIT 1
+                ) AS root, generate_series(1, 7) AS i
+            ) AS last_root
+            WHERE last_root.position IS NOT NULL;
+            """,
+            reverse_sql="DROP SEQUENCE IF EXISTS impress_document_root_position_seq;",
+        ),
+    ]
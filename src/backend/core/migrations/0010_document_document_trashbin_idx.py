@@ -0,0 +1,17 @@
+# Generated by Django 5.1.8 on 2026-10-18 14:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_document_root_position_sequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(condition=models.Q(('ancestors_deleted_at__isnull', False)), fields=['ancestors_deleted_at'], name='document_trashbin_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.8 on 2026-10-18 11:11
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_document_document_trashbin_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='document',
+            name='computed_link_reach',
+        ),
+        migrations.RemoveField(
+            model_name='document',
+            name='computed_link_role',
+        ),
+    ]
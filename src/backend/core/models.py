@@ -3,22 +3,28 @@ Declare and configure the models for the impress core application
 """
 # pylint: disable=too-many-lines
 
+import functools
 import hashlib
+import io
 import smtplib
+import uuid
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 from logging import getLogger
 
 from django.conf import settings
+from django.contrib.postgres.aggregates import ArrayAgg
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.contrib.sites.models import Site
 from django.core import mail
 from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 from django.core.mail import send_mail
-from django.db import models, transaction
-from django.db.models.functions import Left, Length
+from django.db import IntegrityError, connection, models, transaction
 from django.template.loader import render_to_string
 from django.utils import timezone
 from django.utils.functional import cached_property
@@ -28,8 +34,18 @@ from django.utils.translation import gettext_lazy as _
 from botocore.exceptions import ClientError
 from rest_framework.exceptions import ValidationError
 from timezone_field import TimeZoneField
+from treebeard.exceptions import NodeAlreadySaved
 from treebeard.mp_tree import MP_Node, MP_NodeManager, MP_NodeQuerySet
 
+from core.utils import (
+    decode_content,
+    document_content_cache,
+    encode_content,
+    extract_attachments,
+    get_attachment_status_cache_key,
+    get_attachments_cache_key,
+)
+
 from django.contrib.auth.models import AbstractUser, UserManager
 from drf_helper.mixins import CreatedByModelMixin
 from drf_helper.models import BaseModel
@@ -204,11 +220,28 @@ class User(DirtyFieldsMixin, AbstractUser, BaseModel, CreatedByModelMixin):
         If it's a new user, give its user access to the documents to which s.he was invited.
         """
         is_adding = self._state.adding
+        previous_username = self.get_dirty_fields().get("username")
         super().save(*args, **kwargs)
+        cache.delete_many(
+            [
+                self.get_auth_cache_key(username)
+                for username in {self.username, previous_username}
+                if username
+            ]
+        )
 
         if is_adding:
             self._convert_valid_invitations()
 
+    @staticmethod
+    def get_auth_cache_key(username):
+        """
+        Generate the cache key of a user authenticated from a token. The key is built
+        from the username, on which the id claim of the token is synchronized, and not
+        from the primary key which may differ for users matched by their email.
+        """
+        return f"user_{username!s}_auth"
+
     def _convert_valid_invitations(self):
         """
         Convert valid invitations to document accesses.
@@ -228,11 +261,15 @@ class User(DirtyFieldsMixin, AbstractUser, BaseModel, CreatedByModelMixin):
         DocumentAccess.objects.bulk_create(
             [
                 DocumentAccess(
-                    user=self, document=invitation.document, role=invitation.role
+                    user=self,
+                    document=invitation.document,
+                    document_path=invitation.document.path,
+                    role=invitation.role,
                 )
                 for invitation in valid_invitations
             ]
         )
+        self.invalidate_documents_ids_cache(user_ids=[self.id])
 
         # Set creator of documents if not yet set (e.g. documents created via server-to-server API)
         document_ids = [invitation.document_id for invitation in valid_invitations]
@@ -256,6 +293,83 @@ class User(DirtyFieldsMixin, AbstractUser, BaseModel, CreatedByModelMixin):
         """
         return []
 
+    @staticmethod
+    def get_documents_ids_generation_cache_key(owner):
+        """
+        Generate the cache key of the generation of the documents ids of a user or a
+        team, e.g. "user_<id>" or "team_<name>".
+        """
+        return f"{owner:s}_documents_ids_generation"
+
+    def get_documents_ids_cache_key(self):
+        """
+        Generate the cache key of the documents ids of the user. The key changes when
+        the generation of the user or of one of its teams is renewed.
+        """
+        generations_keys = [
+            self.get_documents_ids_generation_cache_key(owner)
+            for owner in [
+                f"user_{self.id!s}",
+                *(f"team_{team:s}" for team in self.teams),
+            ]
+        ]
+        generations = cache.get_many(generations_keys)
+        missing_generations = {
+            key: uuid.uuid4().hex for key in generations_keys if key not in generations
+        }
+        if missing_generations:
+            cache.set_many(missing_generations, timeout=None)
+            generations.update(missing_generations)
+
+        token = hashlib.md5(  # noqa: S324
+            ":".join(generations[key] for key in generations_keys).encode()
+        ).hexdigest()
+        return f"user_{self.id!s}_documents_ids_{token:s}"
+
+    def get_documents_ids(self):
+        """
+        Return the ids of the documents on which the user or its teams have an access
+        and the ids of the documents the user accessed through a link. They are cached
+        until an access or a link trace of the user or its teams changes. Accesses and
+        link traces that were soft deleted are ignored.
+        """
+        cache_key = self.get_documents_ids_cache_key()
+        documents_ids = cache.get(cache_key)
+        if documents_ids is None:
+            documents_ids = (
+                list(
+                    DocumentAccess.objects.filter(
+                        models.Q(user=self) | models.Q(team__in=self.teams),
+                        deleted__isnull=True,
+                    ).values_list("document_id", flat=True)
+                ),
+                list(
+                    LinkTrace.objects.filter(
+                        user=self, deleted__isnull=True
+                    ).values_list("document_id", flat=True)
+                ),
+            )
+            cache.set(
+                cache_key, documents_ids, settings.USER_DOCUMENTS_IDS_CACHE_TIMEOUT
+            )
+        return documents_ids
+
+    @classmethod
+    def invalidate_documents_ids_cache(cls, user_ids=(), teams=()):
+        """Renew the generation of the documents ids of the given users and teams."""
+        owners = [
+            *(f"user_{user_id!s}" for user_id in user_ids if user_id),
+            *(f"team_{team:s}" for team in teams if team),
+        ]
+        if owners:
+            cache.set_many(
+                {
+                    cls.get_documents_ids_generation_cache_key(owner): uuid.uuid4().hex
+                    for owner in owners
+                },
+                timeout=None,
+            )
+
 
 class BaseAccess(BaseModel):
     """Base model for accesses to handle resources."""
@@ -338,6 +452,48 @@ class BaseAccess(BaseModel):
         }
 
 
+# pylint: disable=abstract-method
+class AncestorsPaths(models.Func):
+    """
+    Array of the paths of the strict ancestors of a node, computed from its path in
+    the database in order to look them up on the path index with `= ANY(...)`. The
+    path of the node itself is added at the end of the array with `include_self`.
+    """
+
+    template = (
+        "ARRAY(SELECT left(node.path, i) FROM (SELECT %(expressions)s AS path) AS node, "
+        "generate_series(%(steplen)s, length(node.path) - %(end_offset)s, %(steplen)s) "
+        "AS i)"
+    )
+    output_field = ArrayField(models.CharField())
+
+    def __init__(self, expression, steplen, include_self=False, **extra):
+        super().__init__(
+            expression,
+            steplen=steplen,
+            end_offset=0 if include_self else steplen,
+            **extra,
+        )
+
+
+class EqualsAny(models.Lookup):
+    """
+    Compare a value to the items of an array expression with `= ANY(...)`, so that
+    the value can be looked up on an index. It is meant to be passed to `filter`
+    as an expression, e.g. `filter(EqualsAny(F("path"), AncestorsPaths(...)))`.
+
+    `ANY` is not a function: wrapping it in a `Func` on the right hand side of an
+    exact lookup would be parenthesized by Django and rejected by PostgreSQL.
+    """
+
+    lookup_name = "any"
+
+    def as_sql(self, compiler, connection):
+        lhs_sql, lhs_params = self.process_lhs(compiler, connection)
+        rhs_sql, rhs_params = compiler.compile(self.rhs)
+        return f"{lhs_sql} = ANY({rhs_sql})", (*lhs_params, *rhs_params)
+
+
 class DocumentQuerySet(MP_NodeQuerySet):
     """
     Custom queryset for the Document model, providing additional methods
@@ -362,6 +518,62 @@ class DocumentQuerySet(MP_NodeQuerySet):
 
         return self.filter(link_reach=LinkReachChoices.PUBLIC)
 
+    def readable_attachments(self, user, keys):
+        """
+        Return the subset of the given attachment keys that the user can read, i.e.
+        keys declared on a document to which the user has access per se or via one
+        of its ancestors.
+
+        Instead of comparing all the documents readable by the user with the documents
+        declaring the attachments, we only look at the ancestors of the latter. The cost
+        of this lookup thus depends on the depth of the tree and not on the number of
+        documents the user can read.
+        :param user: The user for whom readable attachments are to be fetched.
+        :param keys: An iterable of attachment keys.
+        :return: A set of attachment keys.
+        """
+        keys = set(keys)
+        if not keys:
+            return set()
+
+        attachments_documents = list(
+            self.filter(attachments__overlap=list(keys)).values_list(
+                "path", "attachments"
+            )
+        )
+        if not attachments_documents:
+            return set()
+
+        ancestors_paths = {
+            ancestor_path
+            for path, _attachments in attachments_documents
+            for ancestor_path in self.model.get_ancestors_paths(path)
+        }
+        readable_paths = set(
+            self.model.objects.filter(path__in=ancestors_paths)
+            .readable_per_se(user)
+            .values_list("path", flat=True)
+        )
+
+        readable_keys = set()
+        for path, attachments in attachments_documents:
+            if readable_paths.intersection(self.model.get_ancestors_paths(path)):
+                readable_keys.update(keys.intersection(attachments))
+        return readable_keys
+
+    def highest_ancestors(self):
+        """
+        Filters the queryset to keep only the documents of which no ancestor is part of
+        the queryset. The ancestors are looked up in the database from the path of each
+        document so that the reduction is made in the same query.
+        """
+        ancestors_paths = AncestorsPaths(
+            models.OuterRef("path"), steplen=self.model.steplen
+        )
+        return self.filter(
+            ~models.Exists(self.filter(EqualsAny(models.F("path"), ancestors_paths)))
+        )
+
 
 class DocumentManager(MP_NodeManager.from_queryset(DocumentQuerySet)):
     """
@@ -374,9 +586,11 @@ class DocumentManager(MP_NodeManager.from_queryset(DocumentQuerySet)):
         return self._queryset_class(self.model).order_by("path")
 
 
-class Document(MP_Node, BaseModel):
+class Document(DirtyFieldsMixin, MP_Node, BaseModel):
     """Pad document carrying the content."""
 
+    # pylint: disable=too-many-public-methods,too-many-instance-attributes
+
     title = models.CharField(_("title"), max_length=255, null=True, blank=True)
     excerpt = models.TextField(_("excerpt"), max_length=300, null=True, blank=True)
     document_type = models.CharField(
@@ -427,13 +641,41 @@ class Document(MP_Node, BaseModel):
         blank=True,
         null=True,
     )
+    content_hash = models.CharField(
+        _("content hash"),
+        max_length=32,
+        editable=False,
+        blank=True,
+        null=True,
+        help_text=_("MD5 hash of the content last written to object storage."),
+    )
+    content_size = models.PositiveBigIntegerField(
+        _("content size"),
+        editable=False,
+        blank=True,
+        null=True,
+        help_text=_("Size in bytes of the content last written to object storage."),
+    )
+    ancestors_link_definitions = models.JSONField(
+        _("ancestors link definitions"),
+        default=list,
+        editable=False,
+        blank=True,
+        help_text=_("Link reach and role of the ancestors of the document, from the root."),
+    )
 
     _content = None
+    _nb_accesses = None
+    _ancestors_links = None
+
+    # Changes on these fields must be reflected on the descendants
+    FIELDS_TO_CHECK = ["link_reach", "link_role"]
 
     # Tree structure
     alphabet = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
     steplen = 7  # nb siblings max: 3,521,614,606,208
     node_order_by = []  # Manual ordering
+    root_position_sequence = "impress_document_root_position_seq"
 
     path = models.CharField(max_length=7 * 36, unique=True, db_collation="C")
 
@@ -444,6 +686,14 @@ class Document(MP_Node, BaseModel):
         ordering = ("path",)
         verbose_name = _("Document")
         verbose_name_plural = _("Documents")
+        indexes = [
+            GinIndex(fields=["attachments"], name="document_attachments_gin_idx"),
+            models.Index(
+                fields=["ancestors_deleted_at"],
+                condition=models.Q(ancestors_deleted_at__isnull=False),
+                name="document_trashbin_idx",
+            ),
+        ]
         constraints = [
             models.CheckConstraint(
                 check=(
@@ -458,34 +708,102 @@ class Document(MP_Node, BaseModel):
         return str(self.title) if self.title else str(_("Untitled Document"))
 
     def save(self, *args, **kwargs):
-        """Write content to object storage only if _content has changed."""
+        """
+        Write content to object storage only if _content has changed and keep the
+        link definitions of the descendants up to date if the link has changed.
+        """
+        has_link_changed = not self._state.adding and self.is_dirty()
+
+        previous_content_hash = self.content_hash
+        bytes_content = self._encode_content()
+        if bytes_content is not None and kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {
+                *kwargs["update_fields"],
+                "content_hash",
+                "content_size",
+            }
+
         super().save(*args, **kwargs)
 
-        if self._content:
-            file_key = self.file_key
-            bytes_content = self._content.encode("utf-8")
+        if has_link_changed and self.numchild:
+            self.update_subtree_link_definitions()
 
-            # Attempt to directly check if the object exists using the storage client.
-            try:
-                response = default_storage.connection.meta.client.head_object(
-                    Bucket=default_storage.bucket_name, Key=file_key
-                )
-            except ClientError as excpt:
-                # If the error is a 404, the object doesn't exist, so we should create it.
-                if excpt.response["Error"]["Code"] == "404":
-                    has_changed = True
-                else:
-                    raise
-            else:
-                # Compare the existing ETag with the MD5 hash of the new content.
-                has_changed = (
-                    response["ETag"].strip('"')
-                    != hashlib.md5(bytes_content).hexdigest()  # noqa: S324
-                )
+        if bytes_content is not None:
+            self._write_content_on_commit(bytes_content, previous_content_hash)
+
+    def _encode_content(self):
+        """
+        Encode the content and update its hash and size if it differs from the last
+        content written to object storage, which is tracked on the document itself.
+        Return the encoded content to write or None if there is nothing to write.
+        """
+        if not self._content:
+            return None
+
+        bytes_content = encode_content(self._content)
+        content_hash = hashlib.md5(bytes_content).hexdigest()  # noqa: S324
+        if content_hash == self.content_hash:
+            return None
+
+        self.content_hash = content_hash
+        self.content_size = len(bytes_content)
+        return bytes_content
+
+    def _write_content_on_commit(self, bytes_content, previous_content_hash):
+        """Write the encoded content to object storage once the transaction commits."""
+        # Don't hold database locks while uploading to object storage
+        transaction.on_commit(
+            functools.partial(
+                self._write_content,
+                self._content,
+                bytes_content,
+                self.content_hash,
+                previous_content_hash,
+            )
+        )
+
+    def _write_content(
+        self, content, bytes_content, content_hash, previous_content_hash
+    ):
+        """
+        Write content to object storage and cache it in place of the previous content.
+
+        Writes to the same document are serialized and only made if the document still
+        references the content, so that object storage always ends with the content of
+        the last save even if the callbacks of concurrent saves run out of order.
+        If the upload fails, forget the content hash so that the content is written
+        again on next save.
+        """
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    # The lock is released when the transaction ends
+                    cursor.execute(
+                        "SELECT pg_advisory_xact_lock(hashtextextended(%s, 0))",
+                        [self.file_key],
+                    )
+                if not Document.objects.filter(
+                    pk=self.pk, content_hash=content_hash
+                ).exists():
+                    return
+                default_storage.save(self.file_key, ContentFile(bytes_content))
+        except Exception:
+            Document.objects.filter(pk=self.pk, content_hash=content_hash).update(
+                content_hash=None, content_size=None
+            )
+            raise
+
+        if previous_content_hash:
+            document_content_cache.delete(self.pk, previous_content_hash)
+        document_content_cache.set(self.pk, content_hash, content)
 
-            if has_changed:
-                content_file = ContentFile(bytes_content)
-                default_storage.save(file_key, content_file)
+    @classmethod
+    def get_ancestors_paths(cls, path):
+        """
+        Return the paths of all the ancestors of the document at the given path,
+        including the path itself, from the root down.
+        """
+        return [path[:i] for i in range(cls.steplen, len(path) + 1, cls.steplen)]
 
     @property
     def key_base(self):
@@ -504,13 +822,27 @@ class Document(MP_Node, BaseModel):
     @property
     def content(self):
         """Return the json content from object storage if available"""
+        if self._content is None and self.id:
+            if self.content_hash:
+                self._content = document_content_cache.get(self.pk, self.content_hash)
+
         if self._content is None and self.id:
             try:
-                response = self.get_content_response()
+                response = self.get_stored_content_response()
             except (FileNotFoundError, ClientError):
                 pass
             else:
-                self._content = response["Body"].read().decode("utf-8")
+                data = response["Body"].read()
+                self._content = decode_content(data).decode("utf-8")
+                # Only cache the content if it is the one the document references. The
+                # ETag can't tell: it is not the MD5 of contents uploaded in parts.
+                if (
+                    self.content_hash
+                    and hashlib.md5(data).hexdigest() == self.content_hash  # noqa: S324
+                ):
+                    document_content_cache.set(
+                        self.pk, self.content_hash, self._content
+                    )
         return self._content
 
     @content.setter
@@ -521,8 +853,24 @@ class Document(MP_Node, BaseModel):
 
         self._content = content
 
-    def get_content_response(self, version_id=""):
-        """Get the content in a specific version of the document"""
+    def get_content_attachments(self):
+        """
+        Return the keys of the attachments referenced in the content of the document.
+        Extracting them requires reading and parsing the content so they are cached
+        under the hash of the content, which is shared by the duplicates.
+        """
+        if not self.content_hash:
+            return extract_attachments(self.content)
+
+        cache_key = get_attachments_cache_key(self.content_hash)
+        attachments = cache.get(cache_key)
+        if attachments is None:
+            attachments = extract_attachments(self.content)
+            cache.set(cache_key, attachments, settings.DOCUMENT_CONTENT_CACHE_TIMEOUT)
+        return attachments
+
+    def get_stored_content_response(self, version_id=""):
+        """Get the content in a specific version of the document, as stored"""
         params = {
             "Bucket": default_storage.bucket_name,
             "Key": self.file_key,
@@ -531,6 +879,14 @@ class Document(MP_Node, BaseModel):
             params["VersionId"] = version_id
         return default_storage.connection.meta.client.get_object(**params)
 
+    def get_content_response(self, version_id=""):
+        """Get the content in a specific version of the document"""
+        response = self.get_stored_content_response(version_id=version_id)
+
+        # Contents may be stored in a binary format: always expose them in base64
+        response["Body"] = io.BytesIO(decode_content(response["Body"].read()))
+        return response
+
     def get_versions_slice(self, from_version_id="", min_datetime=None, page_size=None):
         """Get document versions from object storage with pagination and starting conditions"""
         # /!\ Trick here /!\
@@ -595,9 +951,50 @@ class Document(MP_Node, BaseModel):
             Bucket=default_storage.bucket_name, Key=self.file_key, VersionId=version_id
         )
 
-    def get_nb_accesses_cache_key(self):
-        """Generate a unique cache key for each document."""
-        return f"document_{self.id!s}_nb_accesses"
+    @staticmethod
+    def get_nb_accesses_generation_cache_key(path):
+        """Generate the cache key of the generation of the subtree under a path."""
+        return f"document_{path:s}_nb_accesses_generation"
+
+    @classmethod
+    def get_nb_accesses_generations(cls, paths):
+        """
+        Return the current generation of the subtrees under the given paths. A new
+        generation is issued for subtrees that don't have one yet.
+        """
+        cache_keys = {
+            cls.get_nb_accesses_generation_cache_key(path): path for path in paths
+        }
+        generations = cache.get_many(cache_keys)
+
+        missing_generations = {
+            cache_key: uuid.uuid4().hex
+            for cache_key in cache_keys
+            if cache_key not in generations
+        }
+        if missing_generations:
+            cache.set_many(missing_generations, timeout=None)
+            generations.update(missing_generations)
+
+        return {
+            cache_keys[cache_key]: generation
+            for cache_key, generation in generations.items()
+        }
+
+    def get_nb_accesses_cache_key(self, generations=None):
+        """
+        Generate a unique cache key for each document, versioned by the generations of
+        the subtrees rooted at the document and at each of its ancestors, so that
+        renewing the generation of a subtree invalidates the keys of all its documents.
+        """
+        ancestors_paths = self.get_ancestors_paths(self.path)
+        if generations is None:
+            generations = self.get_nb_accesses_generations(ancestors_paths)
+
+        version = hashlib.md5(  # noqa: S324
+            "_".join(generations[path] for path in ancestors_paths).encode("ascii")
+        ).hexdigest()
+        return f"document_{self.id!s}_nb_accesses_{version:s}"
 
     def get_nb_accesses(self):
         """
@@ -605,6 +1002,9 @@ class Document(MP_Node, BaseModel):
         - directly attached to the document
         - attached to any of the document's ancestors
         """
+        if self._nb_accesses is not None:
+            return self._nb_accesses
+
         cache_key = self.get_nb_accesses_cache_key()
         nb_accesses = cache.get(cache_key)
 
@@ -612,9 +1012,7 @@ class Document(MP_Node, BaseModel):
             nb_accesses = (
                 DocumentAccess.objects.filter(document=self).count(),
                 DocumentAccess.objects.filter(
-                    document__path=Left(
-                        models.Value(self.path), Length("document__path")
-                    ),
+                    document_path__in=self.get_ancestors_paths(self.path),
                     document__ancestors_deleted_at__isnull=True,
                 ).count(),
             )
@@ -622,6 +1020,77 @@ class Document(MP_Node, BaseModel):
 
         return nb_accesses
 
+    @classmethod
+    def prefetch_nb_accesses(cls, documents):
+        """
+        Compute the number of accesses of a list of documents at once, instead of
+        running 2 queries per document: cached values are fetched in one call and
+        missing values are computed with one grouped query for direct accesses and
+        one for accesses on ancestors.
+        """
+        # pylint: disable=protected-access
+        documents = [document for document in documents if document.path]
+        generations = cls.get_nb_accesses_generations(
+            {
+                path
+                for document in documents
+                for path in cls.get_ancestors_paths(document.path)
+            }
+        )
+        cache_keys = {
+            document.get_nb_accesses_cache_key(generations): document
+            for document in documents
+        }
+        cached_nb_accesses = cache.get_many(cache_keys)
+
+        missing_documents = []
+        for cache_key, document in cache_keys.items():
+            if cache_key in cached_nb_accesses:
+                document._nb_accesses = cached_nb_accesses[cache_key]  # noqa: SLF001
+            else:
+                missing_documents.append(document)
+
+        if not missing_documents:
+            return
+
+        nb_accesses_per_document = dict(
+            DocumentAccess.objects.filter(document__in=missing_documents)
+            .values("document_id")
+            .annotate(count=models.Count("id"))
+            .values_list("document_id", "count")
+        )
+        ancestors_paths = {
+            path
+            for document in missing_documents
+            for path in cls.get_ancestors_paths(document.path)
+        }
+        nb_accesses_per_path = dict(
+            DocumentAccess.objects.filter(
+                document_path__in=ancestors_paths,
+                document__ancestors_deleted_at__isnull=True,
+            )
+            .values("document_path")
+            .annotate(count=models.Count("id"))
+            .values_list("document_path", "count")
+        )
+
+        computed_nb_accesses = {}
+        cache_keys_per_document = {
+            document: cache_key for cache_key, document in cache_keys.items()
+        }
+        for document in missing_documents:
+            document._nb_accesses = (  # noqa: SLF001
+                nb_accesses_per_document.get(document.id, 0),
+                sum(
+                    nb_accesses_per_path.get(path, 0)
+                    for path in cls.get_ancestors_paths(document.path)
+                ),
+            )
+            computed_nb_accesses[cache_keys_per_document[document]] = (
+                document._nb_accesses  # noqa: SLF001
+            )
+        cache.set_many(computed_nb_accesses)
+
     @property
     def nb_accesses_direct(self):
         """Returns the number of accesses related to the document or one of its ancestors."""
@@ -634,15 +1103,15 @@ class Document(MP_Node, BaseModel):
 
     def invalidate_nb_accesses_cache(self):
         """
-        Invalidate the cache for number of accesses, including on affected descendants.
-        Args:
-            path: can optionally be passed as argument (useful when invalidating cache for a
-                document we just deleted)
+        Invalidate the cache for number of accesses, including on all descendants, by
+        renewing the generation of the subtree rooted at the document.
         """
-
-        for document in Document.objects.filter(path__startswith=self.path).only("id"):
-            cache_key = document.get_nb_accesses_cache_key()
-            cache.delete(cache_key)
+        self._nb_accesses = None
+        cache.set(
+            self.get_nb_accesses_generation_cache_key(self.path),
+            uuid.uuid4().hex,
+            timeout=None,
+        )
 
     def get_roles(self, user):
         """Return the roles a user has on a document."""
@@ -655,9 +1124,7 @@ class Document(MP_Node, BaseModel):
             try:
                 roles = DocumentAccess.objects.filter(
                     models.Q(user=user) | models.Q(team__in=user.teams),
-                    document__path=Left(
-                        models.Value(self.path), Length("document__path")
-                    ),
+                    document_path__in=self.get_ancestors_paths(self.path),
                 ).values_list("role", flat=True)
             except (models.ObjectDoesNotExist, IndexError):
                 roles = []
@@ -701,6 +1168,140 @@ class Document(MP_Node, BaseModel):
 
         return ancestors_links
 
+    def get_ancestors_links(self, user):
+        """
+        Get the ancestors links for the current document up to the highest readable
+        ancestor from the link definitions stored on the document, without querying
+        its ancestors as long as the accesses of the user are not needed to find this
+        highest readable ancestor.
+        """
+        links = [
+            *self.ancestors_link_definitions,
+            {"link_reach": self.link_reach, "link_role": self.link_role},
+        ]
+        # Deleted ancestors are ignored and the definitions may not be up to date
+        if self.ancestors_deleted_at is not None or len(links) != self.depth:
+            return self.compute_ancestors_links(user=user)
+
+        readable_reaches = (
+            {LinkReachChoices.AUTHENTICATED, LinkReachChoices.PUBLIC}
+            if user.is_authenticated
+            else {LinkReachChoices.PUBLIC}
+        )
+        highest_readable_index = next(
+            (
+                index
+                for index, link in enumerate(links)
+                if link["link_reach"] in readable_reaches
+            ),
+            len(links),
+        )
+
+        # An access of the user may make a higher ancestor readable. Ancestors above
+        # the highest readable one are restricted: they only matter for the select
+        # options of the restricted reach if they offer the editor role.
+        if user.is_authenticated and any(
+            link["link_role"] == LinkRoleChoices.EDITOR
+            for link in links[: min(highest_readable_index, self.depth - 1)]
+        ):
+            return self.compute_ancestors_links(user=user)
+
+        return links[highest_readable_index:-1]
+
+    @classmethod
+    def prefetch_abilities(cls, documents, user):
+        """
+        Prepare the computation of abilities of a list of documents for a user: the
+        ancestors of all documents are loaded in one query, from which the ancestors
+        links and the roles of the user are computed in memory and attached to each
+        document, so that `get_abilities` doesn't query the database for each document.
+        """
+        # pylint: disable=protected-access
+        documents = [
+            document
+            for document in documents
+            if document.depth > 1
+            and not getattr(document, "is_highest_ancestor_for_user", False)
+        ]
+        if not documents:
+            return
+
+        ancestors = cls.objects.filter(
+            path__in={
+                path
+                for document in documents
+                for path in cls.get_ancestors_paths(document.path)
+            }
+        ).order_by()
+        fields = ["path", "depth", "link_reach", "link_role", "ancestors_deleted_at"]
+        if user.is_authenticated:
+            ancestors = ancestors.annotate(
+                roles=ArrayAgg(
+                    "accesses__role",
+                    filter=models.Q(accesses__user=user)
+                    | models.Q(accesses__team__in=user.teams),
+                    distinct=True,
+                    default=models.Value([]),
+                )
+            )
+            fields.append("roles")
+            readable_reaches = {LinkReachChoices.AUTHENTICATED, LinkReachChoices.PUBLIC}
+        else:
+            readable_reaches = {LinkReachChoices.PUBLIC}
+        ancestors_per_path = {
+            ancestor["path"]: ancestor for ancestor in ancestors.values(*fields)
+        }
+
+        for document in documents:
+            document_ancestors = [
+                ancestors_per_path[path]
+                for path in cls.get_ancestors_paths(document.path)
+                if path in ancestors_per_path
+            ]
+
+            if not hasattr(document, "user_roles"):
+                document.user_roles = list(
+                    {
+                        role
+                        for ancestor in document_ancestors
+                        for role in ancestor.get("roles", [])
+                    }
+                )
+
+            # Same as `compute_ancestors_links` but in memory
+            alive_ancestors = [
+                ancestor
+                for ancestor in document_ancestors
+                if ancestor["ancestors_deleted_at"] is None
+            ]
+            highest_readable = next(
+                (
+                    ancestor
+                    for ancestor in alive_ancestors
+                    if ancestor.get("roles")
+                    or ancestor["link_reach"] in readable_reaches
+                ),
+                None,
+            )
+
+            ancestors_links = []
+            paths_links_mapping = {}
+            if highest_readable is not None:
+                for ancestor in alive_ancestors:
+                    if ancestor["depth"] < highest_readable["depth"]:
+                        continue
+                    ancestors_links.append(
+                        {
+                            "link_reach": ancestor["link_reach"],
+                            "link_role": ancestor["link_role"],
+                        }
+                    )
+                    paths_links_mapping[ancestor["path"]] = ancestors_links.copy()
+
+            document._ancestors_links = paths_links_mapping.get(  # noqa: SLF001
+                document.path[: -cls.steplen], []
+            )
+
     def get_abilities(self, user, ancestors_links=None):
         """
         Compute and return abilities for a given user on the document.
@@ -708,7 +1309,11 @@ class Document(MP_Node, BaseModel):
         if self.depth <= 1 or getattr(self, "is_highest_ancestor_for_user", False):
             ancestors_links = []
         elif ancestors_links is None:
-            ancestors_links = self.compute_ancestors_links(user=user)
+            ancestors_links = (
+                self._ancestors_links
+                if self._ancestors_links is not None
+                else self.get_ancestors_links(user=user)
+            )
 
         roles = set(
             self.get_roles(user)
@@ -847,79 +1452,546 @@ class Document(MP_Node, BaseModel):
 
         self.send_email(subject, [email], context, language)
 
+    @classmethod
+    def add_root(cls, **kwargs):
+        """
+        Add a root document at a position taken from a database sequence. Treebeard adds
+        it after the last root, which requires locking the table for concurrent
+        transactions not to compute the same path. Positions taken by roots that
+        treebeard moved or shifted to make room for a sibling are skipped, including
+        when they are taken concurrently between the uniqueness check and the insert.
+        """
+        # pylint: disable=protected-access
+        if len(kwargs) == 1 and "instance" in kwargs:
+            document = kwargs["instance"]
+            if not document._state.adding:  # noqa: SLF001
+                raise NodeAlreadySaved(
+                    "Attempted to add a tree node that is already in the database"
+                )
+        else:
+            document = cls(**kwargs)
+
+        document.depth = 1
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT nextval(%s)", [cls.root_position_sequence])
+                [position] = cursor.fetchone()
+            document.path = cls._get_path(None, 1, position)
+
+            try:
+                # Use a savepoint not to abort the transaction if the insert fails
+                with transaction.atomic():
+                    document.save()
+            except DjangoValidationError as error:
+                if "path" not in getattr(error, "error_dict", {}):
+                    raise
+            except IntegrityError as error:
+                diag = getattr(error.__cause__, "diag", None)
+                if "path" not in (getattr(diag, "constraint_name", None) or ""):
+                    raise
+            else:
+                return document
+
+    def add_child(self, **kwargs):
+        """Add a child inheriting the link definitions of the document and its ancestors."""
+        self._set_ancestors_link_definitions(
+            kwargs,
+            [
+                *self.ancestors_link_definitions,
+                {"link_reach": self.link_reach, "link_role": self.link_role},
+            ],
+        )
+        return super().add_child(**kwargs)
+
     @transaction.atomic
-    def soft_delete(self):
+    def add_sibling(self, pos=None, **kwargs):
         """
-        Soft delete the document, marking the deletion on descendants.
-        We still keep the .delete() method untouched for programmatic purposes.
+        Add a sibling sharing the link definitions of the ancestors of the document
+        and update the path of the accesses of the siblings shifted to make room.
         """
-        if (
+        self._set_ancestors_link_definitions(kwargs, self.ancestors_link_definitions)
+        sibling = super().add_sibling(pos, **kwargs)
+        sibling.update_accesses_paths()
+        return sibling
+
+    def add_children(self, children):
+        """
+        Add unsaved documents as the last children of the document with one query for
+        the documents and one for the number of children. The document must be locked
+        by the caller so that concurrent transactions don't reserve the same paths.
+        """
+        # pylint: disable=protected-access
+        last_child_path = (
             self._meta.model.objects.filter(
-                models.Q(deleted_at__isnull=False)
-                | models.Q(ancestors_deleted_at__isnull=False),
-                pk=self.pk,
-            ).exists()
-            or self.get_ancestors().filter(deleted_at__isnull=False).exists()
-        ):
-            raise RuntimeError(
-                "This document is already deleted or has deleted ancestors."
+                path__range=self._get_children_path_interval(self.path)
             )
+            .order_by("-path")
+            .values_list("path", flat=True)
+            .first()
+        )
+        last_position = (
+            self._str2int(last_child_path[-self.steplen :]) if last_child_path else 0
+        )
+
+        ancestors_link_definitions = [
+            *self.ancestors_link_definitions,
+            {"link_reach": self.link_reach, "link_role": self.link_role},
+        ]
+        bytes_contents = []
+        for position, child in enumerate(children, start=last_position + 1):
+            child.depth = self.depth + 1
+            child.path = self._get_path(self.path, child.depth, position)
+            child.ancestors_link_definitions = ancestors_link_definitions
+            bytes_contents.append(child._encode_content())  # noqa: SLF001
+
+        self._meta.model.objects.bulk_create(children)
+        self._meta.model.objects.filter(pk=self.pk).update(
+            numchild=models.F("numchild") + len(children)
+        )
+        self.numchild += len(children)
 
-        self.ancestors_deleted_at = self.deleted_at = timezone.now()
-        self.save()
-        self.invalidate_nb_accesses_cache()
+        for child, bytes_content in zip(children, bytes_contents, strict=True):
+            if bytes_content is not None:
+                child._write_content_on_commit(bytes_content, None)  # noqa: SLF001
+        return children
 
-        if self.depth > 1:
-            self._meta.model.objects.filter(pk=self.get_parent().pk).update(
-                numchild=models.F("numchild") - 1
+    @transaction.atomic
+    def duplicate(self, title, creator, with_descendants=False, with_links=False):
+        """
+        Duplicate the document as its right sibling, optionally with its descendants
+        that are not deleted, and return the copies in the order of their paths.
+
+        The copies of the descendants are inserted in bulk under paths computed from
+        the paths of the originals. Contents are copied within object storage once the
+        transaction commits, without being downloaded, and the copies reference the
+        attachments of the originals instead of duplicating them.
+        """
+        originals = [self]
+        if with_descendants:
+            originals.extend(
+                self.get_descendants().filter(ancestors_deleted_at__isnull=True)
             )
 
-        # Mark all descendants as soft deleted
-        self.get_descendants().filter(ancestors_deleted_at__isnull=True).update(
-            ancestors_deleted_at=self.ancestors_deleted_at
+        kwargs = self._get_duplicate_kwargs(self, creator, with_links)
+        # Only keep the attachments still referenced in the content of the document.
+        # Descendants keep theirs as is so that their contents are not read.
+        if self.attachments:
+            kwargs["attachments"] = list(
+                set(self.get_content_attachments()).intersection(self.attachments)
+            )
+        duplicate = self.add_sibling(
+            "right",
+            title=title,
+            numchild=self.numchild if with_descendants else 0,
+            **kwargs,
         )
 
+        copies_by_path = {self.path: duplicate}
+        for original in originals[1:]:
+            parent = copies_by_path[original.path[: -self.steplen]]
+            copy = self._meta.model(
+                path=f"{duplicate.path:s}{original.path[len(self.path) :]:s}",
+                depth=original.depth,
+                numchild=original.numchild,
+                title=original.title,
+                ancestors_link_definitions=[
+                    *parent.ancestors_link_definitions,
+                    {"link_reach": parent.link_reach, "link_role": parent.link_role},
+                ],
+                **self._get_duplicate_kwargs(original, creator, with_links),
+            )
+            copies_by_path[original.path] = copy
+
+        copies = [copies_by_path[original.path] for original in originals]
+        self._meta.model.objects.bulk_create(copies[1:])
+
+        contents = [
+            (original.file_key, copy)
+            for original, copy in zip(originals, copies, strict=True)
+            if original.content_hash
+        ]
+        if contents:
+            transaction.on_commit(functools.partial(self._copy_contents, contents))
+        return copies
+
+    @staticmethod
+    def _get_duplicate_kwargs(original, creator, with_links):
+        """Return the fields of the copy of a document, except its position and title."""
+        kwargs = {
+            "excerpt": original.excerpt,
+            "document_type": original.document_type,
+            "content_preview_base64": original.content_preview_base64,
+            "content_hash": original.content_hash,
+            "content_size": original.content_size,
+            "attachments": original.attachments,
+            "duplicated_from": original,
+            "creator": creator,
+        }
+        if with_links:
+            kwargs.update(
+                {"link_reach": original.link_reach, "link_role": original.link_role}
+            )
+        return kwargs
+
+    @classmethod
+    def _copy_contents(cls, contents):
+        """
+        Copy the contents of documents to their copies within object storage, from a
+        pool of threads. If a copy fails, forget the content hash of the copies that
+        failed so that they are considered as empty instead of pointing to nothing.
+        """
+        client = default_storage.connection.meta.client
+        bucket = default_storage.bucket_name
+
+        def copy_content(source_key, copy):
+            client.copy_object(
+                Bucket=bucket,
+                Key=copy.file_key,
+                CopySource={"Bucket": bucket, "Key": source_key},
+            )
+
+        with ThreadPoolExecutor(
+            max_workers=settings.DOCUMENT_DUPLICATION_MAX_WORKERS
+        ) as executor:
+            futures = [
+                (copy, executor.submit(copy_content, source_key, copy))
+                for source_key, copy in contents
+            ]
+
+        failed = [
+            (copy, future.exception()) for copy, future in futures if future.exception()
+        ]
+        if failed:
+            cls.objects.filter(pk__in=[copy.pk for copy, _error in failed]).update(
+                content_hash=None, content_size=None
+            )
+            raise failed[0][1]
+
+    @staticmethod
+    def _set_ancestors_link_definitions(kwargs, ancestors_link_definitions):
+        """Set the ancestors link definitions of a node about to be added to the tree."""
+        if "instance" in kwargs:
+            kwargs["instance"].ancestors_link_definitions = ancestors_link_definitions
+        else:
+            kwargs["ancestors_link_definitions"] = ancestors_link_definitions
+
     @transaction.atomic
+    def move(self, target, pos=None):
+        """
+        Move the document and update the link definitions of the moved subtree and the
+        path of the accesses of all the documents whose path changed.
+        """
+        parent_path = self.path[: -self.steplen]
+        super().move(target, pos=pos)
+
+        # The path of the instance is not updated by treebeard
+        self.refresh_from_db(fields=["path", "depth"])
+        if self.path[: -self.steplen] != parent_path:
+            self.update_subtree_link_definitions()
+        self.update_accesses_paths()
+
+    def update_accesses_paths(self):
+        """
+        Copy the path of documents onto their accesses after the document was added or
+        moved, in one query. Treebeard only changes the path of the document, of its
+        following siblings shifted to make room and of their descendants.
+        """
+        accesses_table = DocumentAccess._meta.db_table  # noqa: SLF001
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {accesses_table:s} AS access
+                SET document_path = document.path
+                FROM {self._meta.db_table} AS document
+                WHERE document.id = access.document_id
+                    AND document.path >= %(path)s
+                    AND document.path LIKE %(parent_path)s
+                    AND access.document_path <> document.path
+                """,  # noqa: S608
+                {"path": self.path, "parent_path": f"{self.path[: -self.steplen]:s}%"},
+            )
+
+    def update_subtree_link_definitions(self):
+        """
+        Recompute the ancestors link definitions of the document and all its
+        descendants from the tree, in one query.
+        """
+        table = self._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {table} AS document SET
+                    ancestors_link_definitions = COALESCE(
+                        (
+                            SELECT jsonb_agg(
+                                jsonb_build_object(
+                                    'link_reach', ancestor.link_reach,
+                                    'link_role', ancestor.link_role
+                                )
+                                ORDER BY ancestor.path
+                            )
+                            FROM {table} AS ancestor
+                            WHERE ancestor.path = ANY(ARRAY(
+                                SELECT left(document.path, %(steplen)s * i)
+                                FROM generate_series(1, document.depth - 1) AS i
+                            ))
+                        ),
+                        '[]'::jsonb
+                    )
+                WHERE document.path LIKE %(path)s
+                """,  # noqa: S608
+                {"path": f"{self.path:s}%", "steplen": self.steplen},
+            )
+
+    def soft_delete(self):
+        """
+        Soft delete the document, marking the deletion on descendants.
+        We still keep the .delete() method untouched for programmatic purposes.
+        """
+        deleted_at = timezone.now()
+        if self.pk not in self.soft_delete_documents([self.pk], deleted_at=deleted_at):
+            raise RuntimeError(
+                "This document is already deleted or has deleted ancestors."
+            )
+
+        self.ancestors_deleted_at = self.deleted_at = deleted_at
+        self._nb_accesses = None
+
     def restore(self):
         """Cancelling a soft delete with checks."""
-        # This should not happen
-        if self._meta.model.objects.filter(
-            pk=self.pk, deleted_at__isnull=True
-        ).exists():
-            raise RuntimeError("This document is not deleted.")
-
-        if self.deleted_at < get_trashbin_cutoff():
+        if self.pk not in self.restore_documents([self.pk]):
+            deleted_at = (
+                self._meta.model.objects.filter(pk=self.pk)
+                .values_list("deleted_at", flat=True)
+                .first()
+            )
+            # This should not happen
+            if deleted_at is None:
+                raise RuntimeError("This document is not deleted.")
             raise RuntimeError(
                 "This document was permanently deleted and cannot be restored."
             )
 
-        # save the current deleted_at value to exclude it from the descendants update
-        current_deleted_at = self.deleted_at
+        self.refresh_from_db(fields=["deleted_at", "ancestors_deleted_at"])
+        self._nb_accesses = None
+
+    @classmethod
+    def soft_delete_documents(cls, ids, deleted_at=None):
+        """
+        Soft delete the documents of the given ids and mark the deletion on their
+        descendants, in one query. Documents already deleted or with deleted ancestors
+        are left untouched, as are documents with an ancestor among the given ids: they
+        are deleted with this ancestor and restored with it. Return the paths of the
+        documents deleted per id.
+        """
+        deleted_at = deleted_at or timezone.now()
+        return cls._update_subtrees(
+            ids,
+            target_condition="""
+                document.deleted_at IS NULL
+                AND document.ancestors_deleted_at IS NULL
+                AND NOT EXISTS (
+                    SELECT 1 FROM {table} AS ancestor
+                    WHERE ancestor.id = ANY(%(ids)s)
+                        AND ancestor.path = ANY(ARRAY(
+                            SELECT left(document.path, i) FROM generate_series(
+                                %(steplen)s,
+                                length(document.path) - %(steplen)s,
+                                %(steplen)s
+                            ) AS i
+                        ))
+                )
+            """,
+            assignments="""
+                deleted_at = CASE WHEN document.id IN (SELECT id FROM target)
+                    THEN %(deleted_at)s ELSE document.deleted_at END,
+                updated_at = CASE WHEN document.id IN (SELECT id FROM target)
+                    THEN %(deleted_at)s ELSE document.updated_at END,
+                ancestors_deleted_at = CASE WHEN affected.in_subtree
+                    THEN COALESCE(document.ancestors_deleted_at, %(deleted_at)s)
+                    ELSE document.ancestors_deleted_at END,
+                numchild = document.numchild - affected.nb_children
+            """,
+            params={"deleted_at": deleted_at},
+        )
 
-        # Restore the current document
-        self.deleted_at = None
+    @classmethod
+    def restore_documents(cls, ids):
+        """
+        Restore the soft deleted documents of the given ids and their descendants, in
+        one query. Documents that are not deleted or were deleted before the trashbin
+        cutoff are left untouched. Return the paths of the documents restored per id.
 
-        # Calculate the minimum `deleted_at` among all ancestors
-        ancestors_deleted_at = (
-            self.get_ancestors()
-            .filter(deleted_at__isnull=False)
-            .order_by("deleted_at")
-            .values_list("deleted_at", flat=True)
-            .first()
+        The deletion date marked on each document of the restored subtrees is the
+        earliest deletion date among itself and its ancestors that remain deleted.
+        """
+        return cls._update_subtrees(
+            ids,
+            target_condition="document.deleted_at >= %(cutoff)s",
+            assignments="""
+                deleted_at = CASE WHEN document.id IN (SELECT id FROM target)
+                    THEN NULL ELSE document.deleted_at END,
+                ancestors_deleted_at = CASE WHEN affected.in_subtree THEN (
+                    SELECT min(ancestor.deleted_at)
+                    FROM {table} AS ancestor
+                    WHERE ancestor.path = ANY(ARRAY(
+                        SELECT left(document.path, i) FROM generate_series(
+                            %(steplen)s, length(document.path), %(steplen)s
+                        ) AS i
+                    ))
+                    AND ancestor.id NOT IN (SELECT id FROM target)
+                ) ELSE document.ancestors_deleted_at END,
+                numchild = document.numchild + affected.nb_children
+            """,
+            params={"cutoff": get_trashbin_cutoff()},
         )
-        self.ancestors_deleted_at = ancestors_deleted_at
-        self.save(update_fields=["deleted_at", "ancestors_deleted_at"])
-        self.invalidate_nb_accesses_cache()
-
-        self.get_descendants().exclude(
-            models.Q(deleted_at__isnull=False)
-            | models.Q(ancestors_deleted_at__lt=current_deleted_at)
-        ).update(ancestors_deleted_at=self.ancestors_deleted_at)
-
-        if self.depth > 1:
-            self._meta.model.objects.filter(pk=self.get_parent().pk).update(
-                numchild=models.F("numchild") + 1
+
+    @classmethod
+    def _update_subtrees(cls, ids, target_condition, assignments, params):
+        """
+        Update in one query the documents of the given ids matching a condition, called
+        targets, together with their descendants and their parents. The assignments can
+        use `affected.in_subtree`, false for the parents of targets, and
+        `affected.nb_children`, the number of targets of which a document is the parent.
+        The cache for number of accesses is invalidated on the subtrees of the targets.
+        Return the paths of the targets per id.
+        """
+        table = cls._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH target AS (
+                    SELECT document.id, document.path FROM {table} AS document
+                    WHERE document.id = ANY(%(ids)s)
+                        AND {target_condition.format(table=table):s}
+                    FOR UPDATE OF document
+                ),
+                affected AS (
+                    SELECT
+                        id,
+                        bool_or(in_subtree) AS in_subtree,
+                        sum(nb_children) AS nb_children
+                    FROM (
+                        -- "~" sorts after all the characters of the path alphabet
+                        SELECT document.id, true AS in_subtree, 0 AS nb_children
+                        FROM target JOIN {table} AS document
+                            ON document.path >= target.path
+                            AND document.path < target.path || '~'
+                        UNION ALL
+                        SELECT parent.id, false AS in_subtree, 1 AS nb_children
+                        FROM target JOIN {table} AS parent
+                            ON parent.path = left(target.path, -%(steplen)s)
+                    ) AS affected_document
+                    GROUP BY id
+                ),
+                updated AS (
+                    UPDATE {table} AS document
+                    SET {assignments.format(table=table):s}
+                    FROM affected
+                    WHERE document.id = affected.id
+                )
+                SELECT id, path FROM target
+                """,  # noqa: S608
+                {"ids": list(ids), "steplen": cls.steplen, **params},
             )
+            paths = dict(cursor.fetchall())
+
+        cache.set_many(
+            {
+                cls.get_nb_accesses_generation_cache_key(path): uuid.uuid4().hex
+                for path in paths.values()
+            },
+            timeout=None,
+        )
+        return paths
+
+    @classmethod
+    def purge_trashbin(cls, cutoff, batch_size):
+        """
+        Permanently delete a batch of documents that were in the trashbin before the
+        cutoff, with their related objects and their files in object storage.
+
+        Descendants are purged before their ancestors so that an interrupted purge
+        leaves no orphan and can be resumed by calling this method again. Attachments
+        still referenced by documents that are not purged are kept.
+        Return the number of documents and of object versions deleted.
+        """
+        documents = list(
+            cls.objects.filter(ancestors_deleted_at__lt=cutoff)
+            .order_by("-path")
+            .values_list("id", "attachments")[:batch_size]
+        )
+        if not documents:
+            return 0, 0
+
+        ids = [document_id for document_id, _attachments in documents]
+        attachments = {key for _id, keys in documents for key in keys}
+        kept_keys = set()
+        if attachments:
+            for keys in (
+                cls.objects.filter(attachments__overlap=list(attachments))
+                .exclude(ancestors_deleted_at__lt=cutoff)
+                .values_list("attachments", flat=True)
+            ):
+                kept_keys.update(attachments.intersection(keys))
+
+        nb_objects = cls._delete_storage_objects(ids, kept_keys)
+
+        owners = list(
+            DocumentAccess.objects.filter(document_id__in=ids).values_list(
+                "user_id", "team"
+            )
+        )
+        user_ids = [user_id for user_id, _team in owners]
+        teams = [team for _user_id, team in owners]
+        with transaction.atomic():
+            # Bypass the queryset of treebeard: the number of children of the parents
+            # was already decremented when the documents were soft deleted.
+            models.QuerySet.delete(cls.objects.filter(id__in=ids))
+        User.invalidate_documents_ids_cache(user_ids=user_ids, teams=teams)
+
+        return len(ids), nb_objects
+
+    @staticmethod
+    def _delete_storage_objects(ids, kept_keys):
+        """
+        Delete all the versions of the objects stored under the key base of the given
+        documents, except the ones with a kept key, using batch deletes, and evict the
+        cached status of the deleted attachments.
+        Return the number of object versions deleted.
+        """
+        client = default_storage.connection.meta.client
+        paginator = client.get_paginator("list_object_versions")
+        objects = []
+        for document_id in ids:
+            for page in paginator.paginate(
+                Bucket=default_storage.bucket_name, Prefix=f"{document_id!s}/"
+            ):
+                objects.extend(
+                    {"Key": version["Key"], "VersionId": version["VersionId"]}
+                    for version in [
+                        *page.get("Versions", []),
+                        *page.get("DeleteMarkers", []),
+                    ]
+                    if version["Key"] not in kept_keys
+                )
+
+        # Object storage accepts at most 1000 objects per batch delete
+        for start in range(0, len(objects), 1000):
+            response = client.delete_objects(
+                Bucket=default_storage.bucket_name,
+                Delete={"Objects": objects[start : start + 1000], "Quiet": True},
+            )
+            if errors := response.get("Errors"):
+                raise RuntimeError(
+                    f"Failed to delete {len(errors):d} objects from object storage, "
+                    f"first error: {errors[0].get('Message', '')!s}"
+                )
+
+        cache.delete_many(
+            list({get_attachment_status_cache_key(obj["Key"]) for obj in objects})
+        )
+        return len(objects)
 
 
 class LinkTrace(BaseModel):
@@ -953,6 +2025,16 @@ class LinkTrace(BaseModel):
     def __str__(self):
         return f"{self.user!s} trace on document {self.document!s}"
 
+    def save(self, *args, **kwargs):
+        """Override save to clear the cache of documents ids of the user."""
+        super().save(*args, **kwargs)
+        User.invalidate_documents_ids_cache(user_ids=[self.user_id])
+
+    def delete(self, *args, **kwargs):
+        """Override delete to clear the cache of documents ids of the user."""
+        super().delete(*args, **kwargs)
+        User.invalidate_documents_ids_cache(user_ids=[self.user_id])
+
 
 class DocumentFavorite(BaseModel):
     """Relation model to store a user's favorite documents."""
@@ -993,12 +2075,29 @@ class DocumentAccess(BaseAccess):
         on_delete=models.CASCADE,
         related_name="accesses",
     )
+    # Copy of the path of the document, kept in sync when documents are moved, to look
+    # up the roles of a user on the ancestors of a document without joining documents
+    document_path = models.CharField(
+        max_length=7 * 36, db_collation="C", editable=False
+    )
 
     class Meta:
         db_table = "impress_document_access"
         ordering = ("-created_at",)
         verbose_name = _("Document/user relation")
         verbose_name_plural = _("Document/user relations")
+        indexes = [
+            models.Index(
+                fields=["user", "document_path"],
+                include=["role"],
+                name="document_access_user_path_idx",
+            ),
+            models.Index(
+                fields=["team", "document_path"],
+                include=["role"],
+                name="document_access_team_path_idx",
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=["user", "document"],
@@ -1024,14 +2123,25 @@ class DocumentAccess(BaseAccess):
         return f"{self.user!s} is {self.role:s} in document {self.document!s}"
 
     def save(self, *args, **kwargs):
-        """Override save to clear the document's cache for number of accesses."""
+        """
+        Override save to copy the path of the document on creation and to clear the
+        document's cache for number of accesses and the cache of documents ids of the
+        user or team.
+        """
+        if self._state.adding:
+            self.document_path = self.document.path
         super().save(*args, **kwargs)
         self.document.invalidate_nb_accesses_cache()
+        User.invalidate_documents_ids_cache(user_ids=[self.user_id], teams=[self.team])
 
     def delete(self, *args, **kwargs):
-        """Override delete to clear the document's cache for number of accesses."""
+        """
+        Override delete to clear the document's cache for number of accesses and the
+        cache of documents ids of the user or team.
+        """
         super().delete(*args, **kwargs)
         self.document.invalidate_nb_accesses_cache()
+        User.invalidate_documents_ids_cache(user_ids=[self.user_id], teams=[self.team])
 
     def get_abilities(self, user):
         """
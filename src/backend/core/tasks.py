@@ -0,0 +1,68 @@
+"""Celery tasks of the core app."""
+
+from datetime import timedelta
+from logging import getLogger
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from core.models import Document, get_trashbin_cutoff
+
+from impress.celery_app import app
+
+logger = getLogger(__name__)
+
+TRASHBIN_PURGE_PROGRESS_CACHE_KEY = "trashbin_purge_progress"
+
+
+@app.task
+def purge_trashbin():
+    """
+    Start purging the documents that expired from the trashbin, unless a purge is
+    already running. A purge that stopped without finishing, for example because its
+    worker was killed, is resumed with its cutoff and its counters.
+    """
+    progress = cache.get(TRASHBIN_PURGE_PROGRESS_CACHE_KEY)
+    if progress and progress["heartbeat"] > timezone.now() - timedelta(
+        seconds=settings.TRASHBIN_PURGE_INTERVAL
+    ):
+        logger.info("A purge of the trashbin is already running.")
+        return
+
+    if progress is None:
+        progress = {"cutoff": get_trashbin_cutoff(), "documents": 0, "objects": 0}
+    progress["heartbeat"] = timezone.now()
+    cache.set(TRASHBIN_PURGE_PROGRESS_CACHE_KEY, progress, timeout=None)
+    purge_trashbin_batch.delay()
+
+
+@app.task(rate_limit=settings.TRASHBIN_PURGE_RATE_LIMIT)
+def purge_trashbin_batch():
+    """
+    Purge a batch of expired documents and schedule the next batch until there is no
+    expired document left. The progress is saved after each batch so that the purge
+    can be resumed.
+    """
+    progress = cache.get(TRASHBIN_PURGE_PROGRESS_CACHE_KEY)
+    if progress is None:
+        return
+
+    nb_documents, nb_objects = Document.purge_trashbin(
+        progress["cutoff"], settings.TRASHBIN_PURGE_BATCH_SIZE
+    )
+    progress["documents"] += nb_documents
+    progress["objects"] += nb_objects
+
+    if nb_documents < settings.TRASHBIN_PURGE_BATCH_SIZE:
+        cache.delete(TRASHBIN_PURGE_PROGRESS_CACHE_KEY)
+        logger.info(
+            "Purged %d documents and %d object versions from the trashbin.",
+            progress["documents"],
+            progress["objects"],
+        )
+        return
+
+    progress["heartbeat"] = timezone.now()
+    cache.set(TRASHBIN_PURGE_PROGRESS_CACHE_KEY, progress, timeout=None)
+    purge_trashbin_batch.delay()
@@ -0,0 +1,124 @@
+"""Unit tests for the process-wide JWKS signing key cache."""
+
+import json
+import threading
+from unittest import mock
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from drf_helper import auth
+
+JWK_URL = "https://auth.example.com/auth/.well-known/jwks.json"
+
+
+def generate_jwk(kid):
+    """Generate a public JWK for a new RSA key with the given key id."""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({"kid": kid, "use": "sig"})
+    return private_key, jwk
+
+
+@pytest.fixture(name="clock")
+def fixture_clock(monkeypatch):
+    """Control the monotonic clock used by the cache."""
+    clock = mock.Mock(return_value=1000.0)
+    monkeypatch.setattr(auth.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture(name="issuer")
+def fixture_issuer(monkeypatch):
+    """Mock the JWKS endpoint of the issuer and count the calls made to it."""
+    issuer = mock.Mock(return_value={"keys": [generate_jwk("key1")[1]]})
+    monkeypatch.setattr(jwt.PyJWKClient, "fetch_data", lambda self: issuer())
+    return issuer
+
+
+def test_jwks_key_cache_fetches_once(issuer, clock):
+    """Keys should be fetched once and then served from memory until the TTL."""
+    cache = auth.JWKSKeyCache(JWK_URL, ttl=300, refresh_margin=30)
+
+    for _ in range(10):
+        assert cache.get_signing_key("key1").key_id == "key1"
+
+    assert issuer.call_count == 1
+
+
+def test_jwks_key_cache_from_jwt(issuer, clock):
+    """The signing key should be looked up from the "kid" found in the token header."""
+    private_key, jwk = generate_jwk("key2")
+    issuer.return_value = {"keys": [jwk]}
+    token = jwt.encode(
+        {"sub": "1"}, private_key, algorithm="RS256", headers={"kid": "key2"}
+    )
+
+    cache = auth.JWKSKeyCache(JWK_URL)
+    signing_key = cache.get_signing_key_from_jwt(token)
+
+    assert jwt.decode(token, signing_key.key, algorithms=["RS256"]) == {"sub": "1"}
+
+
+def test_jwks_key_cache_unknown_kid_refetches_once(issuer, clock):
+    """An unknown kid should trigger a single refetch to pick up rotated keys."""
+    cache = auth.JWKSKeyCache(JWK_URL, unknown_kid_interval=10)
+    cache.get_signing_key("key1")
+    assert issuer.call_count == 1
+
+    # The issuer rotated its keys
+    issuer.return_value = {"keys": [generate_jwk("key1")[1], generate_jwk("key2")[1]]}
+    clock.return_value += 10
+
+    assert cache.get_signing_key("key2").key_id == "key2"
+    assert issuer.call_count == 2
+
+
+def test_jwks_key_cache_unknown_kid_rate_limited(issuer, clock):
+    """Unknown kids should not allow hammering the issuer with refetches."""
+    cache = auth.JWKSKeyCache(JWK_URL, unknown_kid_interval=10)
+    cache.get_signing_key("key1")
+
+    for _ in range(5):
+        with pytest.raises(jwt.PyJWKClientError):
+            cache.get_signing_key("unknown")
+
+    assert issuer.call_count == 1
+
+
+def test_jwks_key_cache_background_refresh(issuer, clock):
+    """Keys close to expiry should be refreshed in the background."""
+    cache = auth.JWKSKeyCache(JWK_URL, ttl=300, refresh_margin=30)
+    cache.get_signing_key("key1")
+
+    issuer.return_value = {"keys": [generate_jwk("key1")[1], generate_jwk("key3")[1]]}
+    clock.return_value += 280
+
+    # The current key is served right away while the refresh happens
+    assert cache.get_signing_key("key1").key_id == "key1"
+    for thread in threading.enumerate():
+        if thread.name == "jwks-refresh":
+            thread.join()
+
+    assert issuer.call_count == 2
+    assert "key3" in cache._keys
+
+
+def test_jwks_key_cache_issuer_unreachable(issuer, clock):
+    """The last good keys should be served if the issuer is briefly unreachable."""
+    cache = auth.JWKSKeyCache(JWK_URL, ttl=300, refresh_margin=30)
+    good_key = cache.get_signing_key("key1")
+
+    issuer.side_effect = jwt.PyJWKClientError("Connection refused")
+    clock.return_value += 1000
+    cache.refresh()
+
+    assert cache.get_signing_key("key1") is good_key
+
+
+def test_jwks_key_cache_shared_by_tokens():
+    """All tokens of the process should share the same key cache."""
+    with mock.patch.object(auth.api_settings, "JWK_URL", JWK_URL):
+        assert auth.JWKSAuthToken().get_jwks_client() is auth.get_jwks_key_cache()
+        assert auth.get_jwks_key_cache().uri == JWK_URL
@@ -0,0 +1,152 @@
+"""Unit tests for the user resolution of the JWT authentication class."""
+
+import uuid
+
+from django.core.cache import cache
+from django.test.utils import override_settings
+
+import pytest
+
+from core import factories, models
+
+from drf_helper.auth import CustomJWTAuthentication
+
+pytestmark = pytest.mark.django_db
+
+
+def get_claims(user, **kwargs):
+    """Build the claims of a validated token issued for the given user."""
+    claims = {
+        "id": str(user.id),
+        "email": user.email,
+        "timeZone": "Europe/Paris",
+        "organizationId": str(user.organization_id),
+    }
+    claims.update(kwargs)
+    return claims
+
+
+@pytest.fixture(name="user")
+def fixture_user():
+    """A user already synchronized with the claims of its tokens."""
+    user_id = uuid.uuid4()
+    return factories.UserFactory(
+        id=user_id,
+        username=str(user_id),
+        timezone="Europe/Paris",
+        organization_id=uuid.uuid4(),
+    )
+
+
+def test_jwt_authentication_get_user_create():
+    """Unknown users should be created from the claims of their token."""
+    user_id = uuid.uuid4()
+    organization_id = uuid.uuid4()
+
+    user = CustomJWTAuthentication().get_user(
+        {
+            "id": str(user_id),
+            "email": "john.doe@example.com",
+            "timeZone": "Europe/Paris",
+            "organizationId": str(organization_id),
+        }
+    )
+
+    db_user = models.User.objects.get()
+    assert user == db_user
+    assert db_user.id == user_id
+    assert db_user.email == "john.doe@example.com"
+    assert str(db_user.timezone) == "Europe/Paris"
+    assert db_user.organization_id == organization_id
+
+
+def test_jwt_authentication_get_user_unchanged_claims(user, django_assert_num_queries):
+    """Known users with unchanged claims should be fetched without being written."""
+    with django_assert_num_queries(1):
+        assert CustomJWTAuthentication().get_user(get_claims(user)) == user
+
+
+def test_jwt_authentication_get_user_cached(user, django_assert_num_queries):
+    """Users should be served from the cache while their claims don't change."""
+    CustomJWTAuthentication().get_user(get_claims(user))
+
+    with django_assert_num_queries(0):
+        assert CustomJWTAuthentication().get_user(get_claims(user)) == user
+
+
+@override_settings(JWT_USER_CACHE_TIMEOUT=0)
+def test_jwt_authentication_get_user_cache_disabled(user, django_assert_num_queries):
+    """Users should be fetched from the database on each call if caching is disabled."""
+    CustomJWTAuthentication().get_user(get_claims(user))
+
+    with django_assert_num_queries(1):
+        CustomJWTAuthentication().get_user(get_claims(user))
+
+
+@pytest.mark.parametrize(
+    "claim,value,field,expected",
+    [
+        ("timeZone", "America/New_York", "timezone", "America/New_York"),
+        (
+            "organizationId",
+            "9ad5d7b7-8c7d-4d39-b2b3-7d9c37f5b8a4",
+            "organization_id",
+            "9ad5d7b7-8c7d-4d39-b2b3-7d9c37f5b8a4",
+        ),
+    ],
+)
+def test_jwt_authentication_get_user_changed_claims(
+    user, claim, value, field, expected
+):
+    """Changed claims should be written to the database and bypass the cache."""
+    CustomJWTAuthentication().get_user(get_claims(user))
+
+    authenticated_user = CustomJWTAuthentication().get_user(
+        get_claims(user, **{claim: value})
+    )
+
+    user.refresh_from_db()
+    assert str(getattr(user, field)) == expected
+    assert str(getattr(authenticated_user, field)) == expected
+
+
+def test_jwt_authentication_get_user_saved_invalidates_cache(user):
+    """Saving a user should evict it from the authentication cache."""
+    CustomJWTAuthentication().get_user(get_claims(user))
+    assert cache.get(models.User.get_auth_cache_key(user.username)) is not None
+
+    user.language = "fr-fr"
+    user.save()
+
+    assert cache.get(models.User.get_auth_cache_key(user.username)) is None
+
+
+def test_jwt_authentication_get_user_inactive(user):
+    """Inactive users should not be authenticated, even from the cache."""
+    CustomJWTAuthentication().get_user(get_claims(user))
+
+    user.is_active = False
+    user.save()
+
+    assert CustomJWTAuthentication().get_user(get_claims(user)) is None
+    assert CustomJWTAuthentication().get_user(get_claims(user)) is None
+
+
+def test_jwt_authentication_get_user_matched_by_email():
+    """
+    Users matched by their email, whose primary key differs from the id claim of
+    their token, should also be evicted from the cache when they are saved.
+    """
+    user = factories.UserFactory(timezone="Europe/Paris", organization_id=uuid.uuid4())
+    claims = get_claims(user, id=str(uuid.uuid4()))
+
+    assert CustomJWTAuthentication().get_user(claims) == user
+    user.refresh_from_db()
+    assert user.username == claims["id"]
+    assert cache.get(models.User.get_auth_cache_key(claims["id"])) is not None
+
+    user.is_active = False
+    user.save()
+
+    assert cache.get(models.User.get_auth_cache_key(claims["id"])) is None
+    assert CustomJWTAuthentication().get_user(claims) is None
@@ -0,0 +1,87 @@
+"""Unit tests for the per-process cache of validated tokens."""
+
+import time
+from unittest import mock
+
+import pytest
+
+from drf_helper import auth
+
+
+def get_token(exp):
+    """Build a validated token stand-in expiring at the given timestamp."""
+    return {"id": "1", "exp": exp}
+
+
+def test_validated_token_cache_hit_and_miss():
+    """A validated token should be served from the cache until it expires."""
+    cache = auth.ValidatedTokenCache(maxsize=10)
+    token = get_token(time.time() + 60)
+
+    assert cache.get(b"raw") is None
+    cache.set(b"raw", token)
+
+    assert cache.get(b"raw") is token
+    assert cache.get(b"raw") is token
+    assert cache.get_stats() == {"hits": 2, "misses": 1, "size": 1, "maxsize": 10}
+
+
+def test_validated_token_cache_expired():
+    """Expired tokens should be evicted from the cache."""
+    cache = auth.ValidatedTokenCache(maxsize=10)
+    cache.set(b"raw", get_token(time.time() - 1))
+
+    assert cache.get(b"raw") is None
+    assert cache.get_stats()["size"] == 0
+
+
+def test_validated_token_cache_no_exp():
+    """Tokens without expiration should never be cached."""
+    cache = auth.ValidatedTokenCache(maxsize=10)
+    cache.set(b"raw", {"id": "1"})
+
+    assert cache.get(b"raw") is None
+
+
+def test_validated_token_cache_lru_eviction():
+    """The least recently used token should be evicted when the cache is full."""
+    cache = auth.ValidatedTokenCache(maxsize=2)
+    exp = time.time() + 60
+    for raw_token in [b"a", b"b"]:
+        cache.set(raw_token, get_token(exp))
+
+    cache.get(b"a")
+    cache.set(b"c", get_token(exp))
+
+    assert cache.get(b"a") is not None
+    assert cache.get(b"b") is None
+    assert cache.get(b"c") is not None
+
+
+def test_validated_token_cache_disabled():
+    """A cache with a size of 0 should not cache anything."""
+    cache = auth.ValidatedTokenCache(maxsize=0)
+    cache.set(b"raw", get_token(time.time() + 60))
+
+    assert cache.get(b"raw") is None
+
+
+@pytest.mark.parametrize(
+    "authentication_class",
+    [auth.CustomJWTAuthentication, auth.CookieJWTAuthentication],
+)
+def test_validated_token_cache_authentication_classes(authentication_class):
+    """
+    Header and cookie authentication should only verify the same token once.
+    """
+    auth.validated_token_cache.clear()
+    token = get_token(time.time() + 60)
+
+    with mock.patch.object(
+        authentication_class, "validate_token", return_value=token
+    ) as mock_validate:
+        for _ in range(60):
+            assert authentication_class().get_validated_token(b"raw") is token
+
+    assert mock_validate.call_count == 1
+    assert auth.validated_token_cache.get_stats()["hits"] == 59
@@ -0,0 +1,47 @@
+"""
+Unit test for `check_documents_link_definitions` command.
+"""
+
+from django.core.management import CommandError, call_command
+
+import pytest
+
+from core import factories, models
+
+pytestmark = pytest.mark.django_db
+
+
+def test_check_documents_link_definitions_consistent():
+    """Documents maintained by the models should be consistent with the tree."""
+    root = factories.DocumentFactory(link_reach="authenticated")
+    parent = factories.DocumentFactory(parent=root, link_reach="public")
+    factories.DocumentFactory.create_batch(2, parent=parent)
+    factories.DocumentFactory(parent=root)
+
+    call_command("check_documents_link_definitions", batch_size=2)
+
+
+def test_check_documents_link_definitions_inconsistent():
+    """Inconsistent documents should be reported and fixed if requested."""
+    root = factories.DocumentFactory(link_reach="restricted")
+    document = factories.DocumentFactory(parent=root, link_reach="restricted")
+    factories.DocumentFactory(link_reach="restricted")
+
+    # Bypass the model to change the link of the root
+    models.Document.objects.filter(pk=root.pk).update(
+        link_reach="public", link_role="editor"
+    )
+
+    with pytest.raises(
+        CommandError, match="1 documents have inconsistent link definitions."
+    ):
+        call_command("check_documents_link_definitions")
+
+    call_command("check_documents_link_definitions", fix=True, batch_size=1)
+
+    document.refresh_from_db()
+    assert document.ancestors_link_definitions == [
+        {"link_reach": "public", "link_role": "editor"}
+    ]
+
+    call_command("check_documents_link_definitions")
@@ -0,0 +1,142 @@
+"""
+Unit test for `convert_documents_content_format` command.
+"""
+
+import hashlib
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+
+import pytest
+
+from core import factories, models, utils
+
+pytestmark = pytest.mark.django_db
+
+
+def get_stored_content(document):
+    """Return the bytes of a document content as stored in object storage."""
+    return default_storage.connection.meta.client.get_object(
+        Bucket=default_storage.bucket_name, Key=document.file_key
+    )["Body"].read()
+
+
+def upload_in_parts(key, data):
+    """Upload data to object storage in parts, so that its ETag is not its MD5."""
+    s3_client = default_storage.connection.meta.client
+    bucket = default_storage.bucket_name
+    upload_id = s3_client.create_multipart_upload(Bucket=bucket, Key=key)["UploadId"]
+    part = s3_client.upload_part(
+        Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=1, Body=data
+    )
+    s3_client.complete_multipart_upload(
+        Bucket=bucket,
+        Key=key,
+        UploadId=upload_id,
+        MultipartUpload={"Parts": [{"ETag": part["ETag"], "PartNumber": 1}]},
+    )
+
+
+def test_convert_documents_content_format(django_capture_on_commit_callbacks):
+    """Contents should be rewritten in the target format and stay readable."""
+    with django_capture_on_commit_callbacks(execute=True):
+        documents = factories.DocumentFactory.create_batch(3)
+        document_without_content = factories.DocumentFactory(content="")
+
+    call_command("convert_documents_content_format", format="gzip", batch_size=2)
+
+    for document in documents:
+        data = get_stored_content(document)
+        assert utils.get_content_format(data) == "gzip"
+        assert (
+            utils.decode_content(data).decode("utf-8")
+            == factories.YDOC_HELLO_WORLD_BASE64
+        )
+
+        document.refresh_from_db()
+        assert document.content_hash == hashlib.md5(data).hexdigest()
+        assert document.content_size == len(data)
+
+    document_without_content.refresh_from_db()
+    assert document_without_content.content_hash is None
+
+
+def test_convert_documents_content_format_skip_converted(
+    django_capture_on_commit_callbacks,
+):
+    """Contents already in the target format should not be rewritten."""
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory()
+    call_command("convert_documents_content_format", format="gzip")
+    document.refresh_from_db()
+    content_hash = document.content_hash
+
+    call_command("convert_documents_content_format", format="gzip")
+
+    assert models.Document.objects.get(pk=document.pk).content_hash == content_hash
+
+    call_command("convert_documents_content_format", format="base64")
+
+    data = get_stored_content(document)
+    assert data.decode("utf-8") == factories.YDOC_HELLO_WORLD_BASE64
+
+
+def test_convert_documents_content_format_skip_edited(
+    django_capture_on_commit_callbacks,
+):
+    """Contents that no longer match the hash tracked on the document should be skipped."""
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory()
+    models.Document.objects.filter(pk=document.pk).update(content_hash="0" * 32)
+
+    call_command("convert_documents_content_format", format="gzip")
+
+    data = get_stored_content(document)
+    assert data.decode("utf-8") == factories.YDOC_HELLO_WORLD_BASE64
+    document.refresh_from_db()
+    assert document.content_hash == "0" * 32
+
+
+def test_convert_documents_content_format_edited_during_conversion(
+    django_capture_on_commit_callbacks,
+):
+    """A content saved while it is converted should not be overwritten."""
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory()
+    s3_client = default_storage.connection.meta.client
+    get_object = s3_client.get_object
+
+    def get_object_and_edit(**kwargs):
+        response = get_object(**kwargs)
+        s3_client.put_object(
+            Bucket=default_storage.bucket_name, Key=document.file_key, Body=b"edited"
+        )
+        return response
+
+    with mock.patch.object(s3_client, "get_object", side_effect=get_object_and_edit):
+        call_command("convert_documents_content_format", format="gzip")
+
+    assert get_stored_content(document) == b"edited"
+    content_hash = document.content_hash
+    document.refresh_from_db()
+    assert document.content_hash == content_hash
+
+
+def test_convert_documents_content_format_uploaded_in_parts(
+    django_capture_on_commit_callbacks,
+):
+    """
+    Contents uploaded in parts should be converted: their hash is compared to the
+    hash of the content read instead of the ETag, which is not an MD5 for them.
+    """
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory()
+    upload_in_parts(document.file_key, get_stored_content(document))
+
+    call_command("convert_documents_content_format", format="gzip")
+
+    data = get_stored_content(document)
+    assert utils.get_content_format(data) == "gzip"
+    document.refresh_from_db()
+    assert document.content_hash == hashlib.md5(data).hexdigest()
@@ -6,6 +6,8 @@ from django.core.cache import cache
 
 import pytest
 
+from core.utils import document_content_cache
+
 USER = "user"
 TEAM = "team"
 VIA = [USER, TEAM]
@@ -15,6 +17,7 @@ VIA = [USER, TEAM]
 def clear_cache():
     """Fixture to clear the cache before each test."""
     cache.clear()
+    document_content_cache.clear()
 
 
 @pytest.fixture
@@ -60,7 +60,9 @@ def test_api_document_versions_list_authenticated_unrelated(reach):
 
 
 @pytest.mark.parametrize("via", VIA)
-def test_api_document_versions_list_authenticated_related_success(via, mock_user_teams):
+def test_api_document_versions_list_authenticated_related_success(
+    via, mock_user_teams, django_capture_on_commit_callbacks
+):
     """
     Authenticated users should be able to list document versions for a document
     to which they are directly related, whatever their role in the document.
@@ -100,7 +102,8 @@ def test_api_document_versions_list_authenticated_related_success(via, mock_user
     # Add a new version to the document
     for i in range(3):
         document.content = f"new content {i:d}"
-        document.save()
+        with django_capture_on_commit_callbacks(execute=True):
+            document.save()
 
     response = client.get(
         f"/api/v1.0/documents/{document.id!s}/versions/",
@@ -114,7 +117,9 @@ def test_api_document_versions_list_authenticated_related_success(via, mock_user
 
 @pytest.mark.parametrize("via", VIA)
 def test_api_document_versions_list_authenticated_related_pagination(
-    via, mock_user_teams
+    via,
+    mock_user_teams,
+    django_capture_on_commit_callbacks,
 ):
     """
     The list of versions should be paginated and exclude versions that were created prior to the
@@ -128,7 +133,8 @@ def test_api_document_versions_list_authenticated_related_pagination(
     document = factories.DocumentFactory()
     for i in range(3):
         document.content = f"before {i:d}"
-        document.save()
+        with django_capture_on_commit_callbacks(execute=True):
+            document.save()
 
     if via == USER:
         models.DocumentAccess.objects.create(
@@ -146,7 +152,8 @@ def test_api_document_versions_list_authenticated_related_pagination(
 
     for i in range(4):
         document.content = f"after {i:d}"
-        document.save()
+        with django_capture_on_commit_callbacks(execute=True):
+            document.save()
 
     response = client.get(
         f"/api/v1.0/documents/{document.id!s}/versions/",
@@ -187,7 +194,9 @@ def test_api_document_versions_list_authenticated_related_pagination(
 
 @pytest.mark.parametrize("via", VIA)
 def test_api_document_versions_list_authenticated_related_pagination_parent(
-    via, mock_user_teams
+    via,
+    mock_user_teams,
+    django_capture_on_commit_callbacks,
 ):
     """
     When a user gains access to a document's versions via an ancestor, the date of access
@@ -204,7 +213,8 @@ def test_api_document_versions_list_authenticated_related_pagination_parent(
     document = factories.DocumentFactory(parent=parent)
     for i in range(3):
         document.content = f"before {i:d}"
-        document.save()
+        with django_capture_on_commit_callbacks(execute=True):
+            document.save()
 
     if via == USER:
         models.DocumentAccess.objects.create(
@@ -222,7 +232,8 @@ def test_api_document_versions_list_authenticated_related_pagination_parent(
 
     for i in range(4):
         document.content = f"after {i:d}"
-        document.save()
+        with django_capture_on_commit_callbacks(execute=True):
+            document.save()
 
     response = client.get(
         f"/api/v1.0/documents/{document.id!s}/versions/",
@@ -263,7 +274,9 @@ def test_api_document_versions_list_authenticated_related_pagination_parent(
     assert content["versions"][0]["version_id"] == all_version_ids[2]
 
 
-def test_api_document_versions_list_exceeds_max_page_size():
+def test_api_document_versions_list_exceeds_max_page_size(
+    django_capture_on_commit_callbacks,
+):
     """Page size should not exceed the limit set on the serializer"""
     user = factories.UserFactory()
 
@@ -272,7 +285,8 @@ def test_api_document_versions_list_exceeds_max_page_size():
 
     document = factories.DocumentFactory(users=[user])
     document.content = "version 2"
-    document.save()
+    with django_capture_on_commit_callbacks(execute=True):
+        document.save()
 
     response = client.get(f"/api/v1.0/documents/{document.id!s}/versions/?page_size=51")
 
@@ -283,14 +297,18 @@ def test_api_document_versions_list_exceeds_max_page_size():
 
 
 @pytest.mark.parametrize("reach", models.LinkReachChoices.values)
-def test_api_document_versions_retrieve_anonymous(reach):
+def test_api_document_versions_retrieve_anonymous(
+    reach, django_capture_on_commit_callbacks
+):
     """
     Anonymous users should not be allowed to find specific versions for a document with
     restricted or authenticated link reach.
     """
-    document = factories.DocumentFactory(link_reach=reach)
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory(link_reach=reach)
     document.content = "new content"
-    document.save()
+    with django_capture_on_commit_callbacks(execute=True):
+        document.save()
 
     version_id = document.get_versions_slice()["versions"][0]["version_id"]
 
@@ -304,7 +322,9 @@ def test_api_document_versions_retrieve_anonymous(reach):
 
 
 @pytest.mark.parametrize("reach", models.LinkReachChoices.values)
-def test_api_document_versions_retrieve_authenticated_unrelated(reach):
+def test_api_document_versions_retrieve_authenticated_unrelated(
+    reach, django_capture_on_commit_callbacks
+):
     """
     Authenticated users should not be allowed to retrieve specific versions for a
     document to which they are not related.
@@ -314,9 +334,11 @@ def test_api_document_versions_retrieve_authenticated_unrelated(reach):
     client = APIClient()
     client.force_login(user)
 
-    document = factories.DocumentFactory(link_reach=reach)
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory(link_reach=reach)
     document.content = "new content"
-    document.save()
+    with django_capture_on_commit_callbacks(execute=True):
+        document.save()
 
     version_id = document.get_versions_slice()["versions"][0]["version_id"]
 
@@ -330,7 +352,9 @@ def test_api_document_versions_retrieve_authenticated_unrelated(reach):
 
 
 @pytest.mark.parametrize("via", VIA)
-def test_api_document_versions_retrieve_authenticated_related(via, mock_user_teams):
+def test_api_document_versions_retrieve_authenticated_related(
+    via, mock_user_teams, django_capture_on_commit_callbacks
+):
     """
     A user who is related to a document should be allowed to retrieve the
     associated document versions.
@@ -340,9 +364,11 @@ def test_api_document_versions_retrieve_authenticated_related(via, mock_user_tea
     client = APIClient()
     client.force_login(user)
 
-    document = factories.DocumentFactory()
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory()
     document.content = "new content"
-    document.save()
+    with django_capture_on_commit_callbacks(execute=True):
+        document.save()
 
     assert len(document.get_versions_slice()["versions"]) == 1
     version_id = document.get_versions_slice()["versions"][0]["version_id"]
@@ -366,7 +392,8 @@ def test_api_document_versions_retrieve_authenticated_related(via, mock_user_tea
     # only the current version is available to the user but it is excluded
     # from the list
     document.content = "new content 1"
-    document.save()
+    with django_capture_on_commit_callbacks(execute=True):
+        document.save()
 
     assert len(document.get_versions_slice()["versions"]) == 2
     version_id = document.get_versions_slice()["versions"][0]["version_id"]
@@ -379,7 +406,8 @@ def test_api_document_versions_retrieve_authenticated_related(via, mock_user_tea
 
     # Adding one more version should make the previous version available to the user
     document.content = "new content 2"
-    document.save()
+    with django_capture_on_commit_callbacks(execute=True):
+        document.save()
 
     assert len(document.get_versions_slice()["versions"]) == 3
     version_id = document.get_versions_slice()["versions"][0]["version_id"]
@@ -394,7 +422,9 @@ def test_api_document_versions_retrieve_authenticated_related(via, mock_user_tea
 
 @pytest.mark.parametrize("via", VIA)
 def test_api_document_versions_retrieve_authenticated_related_parent(
-    via, mock_user_teams
+    via,
+    mock_user_teams,
+    django_capture_on_commit_callbacks,
 ):
     """
     A user who gains access to a document's versions via one of its ancestors, should be able to
@@ -406,11 +436,13 @@ def test_api_document_versions_retrieve_authenticated_related_parent(
     client = APIClient()
     client.force_login(user)
 
-    grand_parent = factories.DocumentFactory()
-    parent = factories.DocumentFactory(parent=grand_parent)
-    document = factories.DocumentFactory(parent=parent)
+    with django_capture_on_commit_callbacks(execute=True):
+        grand_parent = factories.DocumentFactory()
+        parent = factories.DocumentFactory(parent=grand_parent)
+        document = factories.DocumentFactory(parent=parent)
     document.content = "new content"
-    document.save()
+    with django_capture_on_commit_callbacks(execute=True):
+        document.save()
 
     assert len(document.get_versions_slice()["versions"]) == 1
     version_id = document.get_versions_slice()["versions"][0]["version_id"]
@@ -434,7 +466,8 @@ def test_api_document_versions_retrieve_authenticated_related_parent(
     # only the current version is available to the user but it is excluded
     # from the list
     document.content = "new content 1"
-    document.save()
+    with django_capture_on_commit_callbacks(execute=True):
+        document.save()
 
     assert len(document.get_versions_slice()["versions"]) == 2
     version_id = document.get_versions_slice()["versions"][0]["version_id"]
@@ -447,7 +480,8 @@ def test_api_document_versions_retrieve_authenticated_related_parent(
 
     # Adding one more version should make the previous version available to the user
     document.content = "new content 2"
-    document.save()
+    with django_capture_on_commit_callbacks(execute=True):
+        document.save()
 
     assert len(document.get_versions_slice()["versions"]) == 3
     version_id = document.get_versions_slice()["versions"][0]["version_id"]
@@ -522,12 +556,14 @@ def test_api_document_versions_create_authenticated_related(via, mock_user_teams
     assert response.status_code == 405
 
 
-def test_api_document_versions_update_anonymous():
+def test_api_document_versions_update_anonymous(django_capture_on_commit_callbacks):
     """Anonymous users should not be allowed to update a document version."""
-    access = factories.UserDocumentAccessFactory()
+    with django_capture_on_commit_callbacks(execute=True):
+        access = factories.UserDocumentAccessFactory()
     document = access.document
     document.content = "new content"
-    document.save()
+    with django_capture_on_commit_callbacks(execute=True):
+        document.save()
 
     assert len(document.get_versions_slice()["versions"]) == 1
     version_id = document.get_versions_slice()["versions"][0]["version_id"]
@@ -540,7 +576,9 @@ def test_api_document_versions_update_anonymous():
     assert response.status_code == 405
 
 
-def test_api_document_versions_update_authenticated_unrelated():
+def test_api_document_versions_update_authenticated_unrelated(
+    django_capture_on_commit_callbacks,
+):
     """
     Authenticated users should not be allowed to update a document version for a document to which
     they are not related.
@@ -550,10 +588,12 @@ def test_api_document_versions_update_authenticated_unrelated():
     client = APIClient()
     client.force_login(user)
 
-    access = factories.UserDocumentAccessFactory()
+    with django_capture_on_commit_callbacks(execute=True):
+        access = factories.UserDocumentAccessFactory()
     document = access.document
     document.content = "new content"
-    document.save()
+    with django_capture_on_commit_callbacks(execute=True):
+        document.save()
 
     assert len(document.get_versions_slice()["versions"]) == 1
     version_id = document.get_versions_slice()["versions"][0]["version_id"]
@@ -567,7 +607,9 @@ def test_api_document_versions_update_authenticated_unrelated():
 
 
 @pytest.mark.parametrize("via", VIA)
-def test_api_document_versions_update_authenticated_related(via, mock_user_teams):
+def test_api_document_versions_update_authenticated_related(
+    via, mock_user_teams, django_capture_on_commit_callbacks
+):
     """
     Authenticated users with access to a document should not be able to update its versions
     whatever their role.
@@ -577,7 +619,8 @@ def test_api_document_versions_update_authenticated_related(via, mock_user_teams
     client = APIClient()
     client.force_login(user)
 
-    document = factories.DocumentFactory()
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory()
 
     if via == USER:
         factories.UserDocumentAccessFactory(document=document, user=user)
@@ -588,7 +631,8 @@ def test_api_document_versions_update_authenticated_related(via, mock_user_teams
     time.sleep(1)  # minio stores datetimes with the precision of a second
 
     document.content = "new content"
-    document.save()
+    with django_capture_on_commit_callbacks(execute=True):
+        document.save()
 
     assert len(document.get_versions_slice()["versions"]) == 1
     version_id = document.get_versions_slice()["versions"][0]["version_id"]
@@ -620,7 +664,9 @@ def test_api_document_versions_delete_anonymous(reach):
 
 
 @pytest.mark.parametrize("reach", models.LinkReachChoices.values)
-def test_api_document_versions_delete_authenticated(reach):
+def test_api_document_versions_delete_authenticated(
+    reach, django_capture_on_commit_callbacks
+):
     """
     Authenticated users should not be allowed to delete a document version for a
     public document to which they are not related.
@@ -630,9 +676,11 @@ def test_api_document_versions_delete_authenticated(reach):
     client = APIClient()
     client.force_login(user)
 
-    document = factories.DocumentFactory(link_reach=reach)
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory(link_reach=reach)
     document.content = "new content"
-    document.save()
+    with django_capture_on_commit_callbacks(execute=True):
+        document.save()
 
     version_id = document.get_versions_slice()["versions"][0]["version_id"]
 
@@ -645,7 +693,9 @@ def test_api_document_versions_delete_authenticated(reach):
 
 @pytest.mark.parametrize("role", ["reader", "editor"])
 @pytest.mark.parametrize("via", VIA)
-def test_api_document_versions_delete_reader_or_editor(via, role, mock_user_teams):
+def test_api_document_versions_delete_reader_or_editor(
+    via, role, mock_user_teams, django_capture_on_commit_callbacks
+):
     """
     Authenticated users should not be allowed to delete a document version for a
     document in which they are a simple reader or editor.
@@ -655,7 +705,8 @@ def test_api_document_versions_delete_reader_or_editor(via, role, mock_user_team
     client = APIClient()
     client.force_login(user)
 
-    document = factories.DocumentFactory()
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory()
     if via == USER:
         factories.UserDocumentAccessFactory(document=document, user=user, role=role)
     elif via == TEAM:
@@ -667,7 +718,8 @@ def test_api_document_versions_delete_reader_or_editor(via, role, mock_user_team
     # Create a new version should make it available to the user
     time.sleep(1)  # minio stores datetimes with the precision of a second
     document.content = "new content"
-    document.save()
+    with django_capture_on_commit_callbacks(execute=True):
+        document.save()
 
     versions = document.get_versions_slice()["versions"]
     assert len(versions) == 1
@@ -683,7 +735,9 @@ def test_api_document_versions_delete_reader_or_editor(via, role, mock_user_team
 
 
 @pytest.mark.parametrize("via", VIA)
-def test_api_document_versions_delete_administrator_or_owner(via, mock_user_teams):
+def test_api_document_versions_delete_administrator_or_owner(
+    via, mock_user_teams, django_capture_on_commit_callbacks
+):
     """
     Users who are administrator or owner of a document should be allowed to delete a version.
     """
@@ -692,7 +746,8 @@ def test_api_document_versions_delete_administrator_or_owner(via, mock_user_team
     client = APIClient()
     client.force_login(user)
 
-    document = factories.DocumentFactory()
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory()
     role = random.choice(["administrator", "owner"])
     if via == USER:
         factories.UserDocumentAccessFactory(document=document, user=user, role=role)
@@ -705,7 +760,8 @@ def test_api_document_versions_delete_administrator_or_owner(via, mock_user_team
     # Create a new version should make it available to the user
     time.sleep(1)  # minio stores datetimes with the precision of a second
     document.content = "new content 1"
-    document.save()
+    with django_capture_on_commit_callbacks(execute=True):
+        document.save()
 
     versions = document.get_versions_slice()["versions"]
     assert len(versions) == 1
@@ -718,7 +774,8 @@ def test_api_document_versions_delete_administrator_or_owner(via, mock_user_team
     assert response.status_code == 404
 
     document.content = "new content 2"
-    document.save()
+    with django_capture_on_commit_callbacks(execute=True):
+        document.save()
 
     versions = document.get_versions_slice()["versions"]
     assert len(versions) == 2
@@ -0,0 +1,242 @@
+"""
+Tests for Documents API endpoint in impress's core app: children create in batch
+"""
+
+import base64
+from uuid import uuid4
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+import pycrdt
+import pytest
+from rest_framework.test import APIClient
+
+from core import factories
+from core.models import Document
+
+pytestmark = pytest.mark.django_db
+
+
+def get_ydoc_with_images(image_keys):
+    """Return a ydoc with images for testing purposes."""
+    ydoc = pycrdt.Doc()
+    ydoc["document-store"] = pycrdt.XmlFragment(
+        [
+            pycrdt.XmlElement("img", {"src": f"http://localhost/media/{key:s}"})
+            for key in image_keys
+        ]
+    )
+    return base64.b64encode(ydoc.get_update()).decode("utf-8")
+
+
+def test_api_documents_children_create_batch_anonymous():
+    """Anonymous users should not be allowed to create children documents."""
+    document = factories.DocumentFactory(link_reach="public", link_role="editor")
+
+    response = APIClient().post(
+        f"/api/v1.0/documents/{document.id!s}/children/batch/",
+        [{"title": "my document"}],
+        format="json",
+    )
+
+    assert response.status_code == 401
+    assert Document.objects.count() == 1
+
+
+@pytest.mark.parametrize("role", ["reader", None])
+def test_api_documents_children_create_batch_authenticated_forbidden(role):
+    """
+    Authenticated users with no write access on a document should not be allowed
+    to create children documents.
+    """
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    document = factories.DocumentFactory(
+        link_reach="authenticated", users=[(user, role)] if role else []
+    )
+
+    response = client.post(
+        f"/api/v1.0/documents/{document.id!s}/children/batch/",
+        [{"title": "my document"}],
+        format="json",
+    )
+
+    assert response.status_code == 403
+    assert Document.objects.count() == 1
+
+
+def test_api_documents_children_create_batch_success():
+    """
+    Users with write access on a document should be able to create several children
+    at once, after the existing children and with an owner access on each of them.
+    """
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    parent = factories.DocumentFactory(
+        link_reach="public", link_role="reader", users=[(user, "editor")]
+    )
+    first_child = factories.DocumentFactory(parent=parent)
+    parent.refresh_from_db()
+
+    response = client.post(
+        f"/api/v1.0/documents/{parent.id!s}/children/batch/",
+        [{"title": f"child {i:d}"} for i in range(3)],
+        format="json",
+    )
+
+    # pylint: disable=protected-access
+    assert response.status_code == 201
+    children = list(Document.objects.filter(id__in=[c["id"] for c in response.json()]))
+    assert [child.title for child in children] == ["child 0", "child 1", "child 2"]
+    assert [child.path for child in children] == [
+        Document._get_path(parent.path, 2, position) for position in range(2, 5)
+    ]
+    assert first_child.get_next_sibling() == children[0]
+
+    for child in children:
+        assert child.depth == 2
+        assert child.creator == user
+        assert child.link_reach == "restricted"
+        assert child.ancestors_link_definitions == [
+            {"link_reach": "public", "link_role": "reader"}
+        ]
+        access = child.accesses.get()
+        assert (access.user, access.role, access.document_path) == (
+            user,
+            "owner",
+            child.path,
+        )
+
+    parent.refresh_from_db()
+    assert parent.numchild == 4
+    assert list(parent.get_children()) == [first_child, *children]
+
+
+def test_api_documents_children_create_batch_attachments(
+    django_capture_on_commit_callbacks,
+):
+    """
+    The content of each child should be written and only the attachments readable by
+    the user should be kept on the child.
+    """
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    parent = factories.DocumentFactory(users=[(user, "owner")])
+    image_keys = [f"{uuid4()!s}/attachments/{uuid4()!s}.png" for _ in range(2)]
+    factories.DocumentFactory(attachments=[image_keys[0]], link_reach="public")
+    factories.DocumentFactory(attachments=[image_keys[1]], link_reach="restricted")
+    content = get_ydoc_with_images(image_keys)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(
+            f"/api/v1.0/documents/{parent.id!s}/children/batch/",
+            [
+                {"title": "with images", "content": content},
+                {"title": "without content"},
+            ],
+            format="json",
+        )
+
+    assert response.status_code == 201
+    with_images, without_content = [
+        Document.objects.get(id=child["id"]) for child in response.json()
+    ]
+    assert with_images.attachments == [image_keys[0]]
+    assert with_images.content_hash is not None
+    assert with_images.content == content
+    assert without_content.attachments == []
+    assert without_content.content_hash is None
+
+
+def test_api_documents_children_create_batch_not_a_list():
+    """The children to create should be sent as a list."""
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    document = factories.DocumentFactory(users=[(user, "owner")])
+
+    response = client.post(
+        f"/api/v1.0/documents/{document.id!s}/children/batch/",
+        {"title": "my document"},
+        format="json",
+    )
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "A list of documents is expected."}
+
+
+@override_settings(DOCUMENT_CHILDREN_BATCH_MAX_SIZE=2)
+def test_api_documents_children_create_batch_too_many():
+    """The number of children created at once should be limited."""
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    document = factories.DocumentFactory(users=[(user, "owner")])
+
+    response = client.post(
+        f"/api/v1.0/documents/{document.id!s}/children/batch/",
+        [{"title": f"child {i:d}"} for i in range(3)],
+        format="json",
+    )
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Cannot create more than 2 documents at once."}
+    assert Document.objects.count() == 1
+
+
+def test_api_documents_children_create_batch_invalid():
+    """No child should be created if one of them is invalid."""
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    document = factories.DocumentFactory(users=[(user, "owner")])
+
+    response = client.post(
+        f"/api/v1.0/documents/{document.id!s}/children/batch/",
+        [{"title": "valid"}, {"title": "invalid", "content": "not base64!"}],
+        format="json",
+    )
+
+    assert response.status_code == 400
+    assert response.json() == [{}, {"content": ["Invalid base64 content."]}]
+    assert Document.objects.count() == 1
+
+
+def test_api_documents_children_create_batch_queries_independent_of_size():
+    """The number of queries should not depend on the number of children created."""
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    def count_queries(nb_children):
+        document = factories.DocumentFactory(users=[(user, "owner")])
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(
+                f"/api/v1.0/documents/{document.id!s}/children/batch/",
+                [{"title": f"child {i:d}"} for i in range(nb_children)],
+                format="json",
+            )
+
+        assert response.status_code == 201
+        assert len(response.json()) == nb_children
+        return len(context.captured_queries)
+
+    assert count_queries(2) == count_queries(20)
@@ -5,6 +5,8 @@ Tests for Documents API endpoint in impress's core app: children list
 import random
 
 from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 import pytest
 from rest_framework.test import APIClient
@@ -553,3 +555,86 @@ def test_api_documents_children_list_authenticated_related_team_members(
             },
         ],
     }
+
+
+def test_api_documents_children_list_queries_independent_of_page_size():
+    """
+    Abilities and number of accesses should be computed for the whole page at once:
+    the number of queries should not depend on the number of children listed.
+    """
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    def count_queries(nb_children):
+        grand_parent = factories.DocumentFactory(users=[user])
+        parent = factories.DocumentFactory(parent=grand_parent, link_reach="public")
+        factories.DocumentFactory.create_batch(nb_children, parent=parent)
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(f"/api/v1.0/documents/{parent.id!s}/children/")
+
+        assert response.status_code == 200
+        assert response.json()["count"] == nb_children
+        return len(context.captured_queries)
+
+    assert count_queries(2) == count_queries(10)
+
+
+def test_api_documents_children_list_cursor_pagination():
+    """Cursor pagination should walk through the children in the order of the tree."""
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    document = factories.DocumentFactory(users=[user])
+    children = factories.DocumentFactory.create_batch(5, parent=document)
+
+    ids = []
+    url = f"/api/v1.0/documents/{document.id!s}/children/?page_size=2&cursor="
+    while url:
+        response = client.get(url)
+
+        assert response.status_code == 200
+        content = response.json()
+        ids.extend(item["id"] for item in content["results"])
+        url = content["next"]
+
+    assert ids == [str(child.id) for child in children]
+
+
+def test_api_documents_children_list_user_roles_index_scan():
+    """
+    The roles of the user on the ancestors of each child should be looked up on the
+    indexes of the document path and of the document accesses.
+    """
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    grand_parent = factories.DocumentFactory(users=[(user, "editor")])
+    parent = factories.DocumentFactory(parent=grand_parent, users=[(user, "reader")])
+    factories.DocumentFactory.create_batch(3, parent=parent)
+    factories.UserDocumentAccessFactory.create_batch(5)
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(f"/api/v1.0/documents/{parent.id!s}/children/")
+
+    assert response.status_code == 200
+    for child in response.json()["results"]:
+        assert sorted(child["user_roles"]) == ["editor", "reader"]
+
+    # The last query annotating user roles is the one fetching the children
+    *_, query = [
+        query["sql"]
+        for query in context.captured_queries
+        if "generate_series" in query["sql"] and '"user_roles"' in query["sql"]
+    ]
+    with connection.cursor() as cursor:
+        # Tables are too small for the planner to prefer indexes on its own
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute(f"EXPLAIN {query:s}")
+        plan = "\n".join(row[0] for row in cursor.fetchall())
+
+    assert "Seq Scan on impress_document_access" not in plan
+    assert "Seq Scan on impress_document " not in plan
@@ -82,6 +82,39 @@ def test_api_documents_create_document_race_condition():
         assert response2.status_code == 201
 
 
+@pytest.mark.django_db(transaction=True)
+def test_api_documents_create_document_concurrent_workers():
+    """
+    Root documents created concurrently by many workers should all be created at
+    distinct positions in the tree.
+    """
+    user = factories.UserFactory()
+
+    def create_documents(worker):
+        client = APIClient()
+        client.force_login(user)
+        return [
+            client.post(
+                "/api/v1.0/documents/",
+                {"title": f"document {worker:d}-{index:d}"},
+                format="json",
+            ).status_code
+            for index in range(5)
+        ]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        status_codes = [
+            status_code
+            for worker_status_codes in executor.map(create_documents, range(8))
+            for status_code in worker_status_codes
+        ]
+
+    assert status_codes == [201] * 40
+    paths = Document.objects.values_list("path", flat=True)
+    assert len(set(paths)) == 40
+    assert Document.objects.filter(depth=1).count() == 40
+
+
 def test_api_documents_create_authenticated_title_null():
     """It should be possible to create several documents with a null title."""
     user = factories.UserFactory()
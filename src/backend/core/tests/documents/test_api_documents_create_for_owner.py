@@ -171,7 +171,9 @@ def test_api_documents_create_for_owner_invalid_sub():
 
 
 @override_settings(SERVER_TO_SERVER_API_TOKENS=["DummyToken"])
-def test_api_documents_create_for_owner_existing(mock_convert_md):
+def test_api_documents_create_for_owner_existing(
+    mock_convert_md, django_capture_on_commit_callbacks
+):
     """
     It should be possible to create a document on behalf of a pre-existing user
     by passing their sub and email.
@@ -185,12 +187,13 @@ def test_api_documents_create_for_owner_existing(mock_convert_md):
         "email": "irrelevant@example.com",  # Should be ignored since the user already exists
     }
 
-    response = APIClient().post(
-        "/api/v1.0/documents/create-for-owner/",
-        data,
-        format="json",
-        HTTP_AUTHORIZATION="Bearer DummyToken",
-    )
+    with django_capture_on_commit_callbacks(execute=True):
+        response = APIClient().post(
+            "/api/v1.0/documents/create-for-owner/",
+            data,
+            format="json",
+            HTTP_AUTHORIZATION="Bearer DummyToken",
+        )
 
     assert response.status_code == 201
 
@@ -218,7 +221,9 @@ def test_api_documents_create_for_owner_existing(mock_convert_md):
 
 
 @override_settings(SERVER_TO_SERVER_API_TOKENS=["DummyToken"])
-def test_api_documents_create_for_owner_new_user(mock_convert_md):
+def test_api_documents_create_for_owner_new_user(
+    mock_convert_md, django_capture_on_commit_callbacks
+):
     """
     It should be possible to create a document on behalf of new users by
     passing their unknown sub and email address.
@@ -230,12 +235,13 @@ def test_api_documents_create_for_owner_new_user(mock_convert_md):
         "email": "john.doe@example.com",  # Should be used to create a new user
     }
 
-    response = APIClient().post(
-        "/api/v1.0/documents/create-for-owner/",
-        data,
-        format="json",
-        HTTP_AUTHORIZATION="Bearer DummyToken",
-    )
+    with django_capture_on_commit_callbacks(execute=True):
+        response = APIClient().post(
+            "/api/v1.0/documents/create-for-owner/",
+            data,
+            format="json",
+            HTTP_AUTHORIZATION="Bearer DummyToken",
+        )
 
     assert response.status_code == 201
 
@@ -275,6 +281,7 @@ def test_api_documents_create_for_owner_new_user(mock_convert_md):
 )
 def test_api_documents_create_for_owner_existing_user_email_no_sub_with_fallback(
     mock_convert_md,
+    django_capture_on_commit_callbacks,
 ):
     """
     It should be possible to create a document on behalf of a pre-existing user for
@@ -291,12 +298,13 @@ def test_api_documents_create_for_owner_existing_user_email_no_sub_with_fallback
         "email": user.email,
     }
 
-    response = APIClient().post(
-        "/api/v1.0/documents/create-for-owner/",
-        data,
-        format="json",
-        HTTP_AUTHORIZATION="Bearer DummyToken",
-    )
+    with django_capture_on_commit_callbacks(execute=True):
+        response = APIClient().post(
+            "/api/v1.0/documents/create-for-owner/",
+            data,
+            format="json",
+            HTTP_AUTHORIZATION="Bearer DummyToken",
+        )
 
     assert response.status_code == 201
 
@@ -373,6 +381,7 @@ def test_api_documents_create_for_owner_existing_user_email_no_sub_no_fallback(
 )
 def test_api_documents_create_for_owner_new_user_no_sub_no_fallback_allow_duplicate(
     mock_convert_md,
+    django_capture_on_commit_callbacks,
 ):
     """
     When a user does not match an existing sub and fallback to matching on email is
@@ -389,12 +398,13 @@ def test_api_documents_create_for_owner_new_user_no_sub_no_fallback_allow_duplic
         "email": user.email,
     }
 
-    response = APIClient().post(
-        "/api/v1.0/documents/create-for-owner/",
-        data,
-        format="json",
-        HTTP_AUTHORIZATION="Bearer DummyToken",
-    )
+    with django_capture_on_commit_callbacks(execute=True):
+        response = APIClient().post(
+            "/api/v1.0/documents/create-for-owner/",
+            data,
+            format="json",
+            HTTP_AUTHORIZATION="Bearer DummyToken",
+        )
     assert response.status_code == 201
     mock_convert_md.assert_called_once_with("Document content")
 
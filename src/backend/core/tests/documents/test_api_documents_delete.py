@@ -2,6 +2,10 @@
 Tests for Documents API endpoint in impress's core app: delete
 """
 
+from uuid import uuid4
+
+from django.test.utils import override_settings
+
 import pytest
 from rest_framework.test import APIClient
 
@@ -137,3 +141,142 @@ def test_api_documents_delete_authenticated_owner(via, mock_user_teams):
     assert models.Document.objects.count() == 1
     assert models.Document.objects.filter(deleted_at__isnull=True).exists() is False
     assert models.Document.objects.filter(deleted_at__isnull=False).count() == 1
+
+
+def test_api_documents_bulk_delete_anonymous():
+    """Anonymous users should not be allowed to delete documents in bulk."""
+    document = factories.DocumentFactory(link_reach="public", link_role="editor")
+
+    response = APIClient().post(
+        "/api/v1.0/documents/bulk-delete/", {"ids": [str(document.id)]}, format="json"
+    )
+
+    assert response.status_code == 401
+    assert models.Document.objects.filter(deleted_at__isnull=True).count() == 1
+
+
+def test_api_documents_bulk_delete_authenticated_owner():
+    """
+    Authenticated users should be able to delete several documents they own at once,
+    with their descendants marked as deleted.
+    """
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    documents = factories.DocumentFactory.create_batch(2, users=[(user, "owner")])
+    child = factories.DocumentFactory(parent=documents[0])
+
+    response = client.post(
+        "/api/v1.0/documents/bulk-delete/",
+        {"ids": [str(document.id) for document in documents]},
+        format="json",
+    )
+
+    assert response.status_code == 200
+    assert sorted(response.json()["ids"]) == sorted(str(d.id) for d in documents)
+    for document in documents:
+        document.refresh_from_db()
+        assert document.deleted_at is not None
+    child.refresh_from_db()
+    assert child.deleted_at is None
+    assert child.ancestors_deleted_at == documents[0].deleted_at
+
+
+def test_api_documents_bulk_delete_nested():
+    """
+    Documents with an ancestor among the documents deleted should be deleted with it,
+    so that restoring the ancestor restores them too.
+    """
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    parent = factories.DocumentFactory(users=[(user, "owner")])
+    child = factories.DocumentFactory(parent=parent, users=[(user, "owner")])
+    grand_child = factories.DocumentFactory(parent=child, users=[(user, "owner")])
+
+    response = client.post(
+        "/api/v1.0/documents/bulk-delete/",
+        {"ids": [str(grand_child.id), str(parent.id), str(child.id)]},
+        format="json",
+    )
+
+    assert response.status_code == 200
+    assert response.json()["ids"] == [str(parent.id)]
+    parent.refresh_from_db()
+    for document in [child, grand_child]:
+        document.refresh_from_db()
+        assert document.deleted_at is None
+        assert document.ancestors_deleted_at == parent.deleted_at
+
+    models.Document.restore_documents([parent.id])
+
+    assert (
+        models.Document.objects.filter(ancestors_deleted_at__isnull=False).exists()
+        is False
+    )
+
+
+def test_api_documents_bulk_delete_authenticated_not_owner():
+    """
+    No document should be deleted if the user is not allowed to delete one of them.
+    """
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    owned = factories.DocumentFactory(users=[(user, "owner")])
+    not_owned = factories.DocumentFactory(users=[(user, "administrator")])
+
+    response = client.post(
+        "/api/v1.0/documents/bulk-delete/",
+        {"ids": [str(owned.id), str(not_owned.id)]},
+        format="json",
+    )
+
+    assert response.status_code == 403
+    assert models.Document.objects.filter(deleted_at__isnull=True).count() == 2
+
+
+def test_api_documents_bulk_delete_unknown():
+    """Deleting documents in bulk should fail if one of them does not exist."""
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    document = factories.DocumentFactory(users=[(user, "owner")])
+
+    response = client.post(
+        "/api/v1.0/documents/bulk-delete/",
+        {"ids": [str(document.id), str(uuid4())]},
+        format="json",
+    )
+
+    assert response.status_code == 404
+    assert models.Document.objects.filter(deleted_at__isnull=True).count() == 1
+
+
+@override_settings(DOCUMENT_BULK_ACTION_MAX_SIZE=1)
+def test_api_documents_bulk_delete_too_many():
+    """The number of documents deleted at once should be limited."""
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    documents = factories.DocumentFactory.create_batch(2, users=[(user, "owner")])
+
+    response = client.post(
+        "/api/v1.0/documents/bulk-delete/",
+        {"ids": [str(document.id) for document in documents]},
+        format="json",
+    )
+
+    assert response.status_code == 400
+    assert response.json() == {"ids": ["Cannot target more than 1 documents at once."]}
+    assert models.Document.objects.filter(deleted_at__isnull=True).count() == 2
@@ -5,10 +5,13 @@ Test file uploads API endpoint for users in impress's core app.
 import base64
 import uuid
 from io import BytesIO
+from unittest import mock
 from urllib.parse import urlparse
 
 from django.conf import settings
 from django.core.files.storage import default_storage
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 import pycrdt
@@ -69,7 +72,7 @@ def test_api_documents_duplicate_anonymous():
 
 
 @pytest.mark.parametrize("index", range(3))
-def test_api_documents_duplicate_success(index):
+def test_api_documents_duplicate_success(index, django_capture_on_commit_callbacks):
     """
     Anonymous users should be able to retrieve attachments linked to a public document.
     Accesses should not be duplicated if the user does not request it specifically.
@@ -95,19 +98,21 @@ def test_api_documents_duplicate_success(index):
     base64_content = base64.b64encode(update).decode("utf-8")
 
     # Create documents
-    document = factories.DocumentFactory(
-        id=document_ids[index],
-        content=base64_content,
-        link_reach="restricted",
-        users=[user, factories.UserFactory()],
-        title="document with an image",
-        attachments=[key for key, _ in image_refs],
-    )
-    factories.DocumentFactory(id=document_ids[(index + 1) % 3])
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory(
+            id=document_ids[index],
+            content=base64_content,
+            link_reach="restricted",
+            users=[user, factories.UserFactory()],
+            title="document with an image",
+            attachments=[key for key, _ in image_refs],
+        )
+        factories.DocumentFactory(id=document_ids[(index + 1) % 3])
     # Don't create document for third ID to check that it doesn't impact access to attachments
 
     # Duplicate the document via the API endpoint
-    response = client.post(f"/api/v1.0/documents/{document.id}/duplicate/")
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(f"/api/v1.0/documents/{document.id}/duplicate/")
 
     assert response.status_code == 201
 
@@ -168,25 +173,27 @@ def test_api_documents_duplicate_success(index):
         assert response.status_code == 403
 
 
-def test_api_documents_duplicate_with_accesses():
+def test_api_documents_duplicate_with_accesses(django_capture_on_commit_callbacks):
     """Accesses should be duplicated if the user requests it specifically."""
     user = factories.UserFactory()
     client = APIClient()
     client.force_login(user)
 
-    document = factories.DocumentFactory(
-        users=[user],
-        title="document with accesses",
-    )
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory(
+            users=[user],
+            title="document with accesses",
+        )
     user_access = factories.UserDocumentAccessFactory(document=document)
     team_access = factories.TeamDocumentAccessFactory(document=document)
 
     # Duplicate the document via the API endpoint requesting to duplicate accesses
-    response = client.post(
-        f"/api/v1.0/documents/{document.id!s}/duplicate/",
-        {"with_accesses": True},
-        format="json",
-    )
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(
+            f"/api/v1.0/documents/{document.id!s}/duplicate/",
+            {"with_accesses": True},
+            format="json",
+        )
 
     assert response.status_code == 201
 
@@ -205,3 +212,176 @@ def test_api_documents_duplicate_with_accesses():
     assert duplicated_accesses.get(user=user).role == "owner"
     assert duplicated_accesses.get(user=user_access.user).role == user_access.role
     assert duplicated_accesses.get(team=team_access.team).role == team_access.role
+
+
+def test_api_documents_duplicate_content_not_transferred(
+    django_capture_on_commit_callbacks,
+):
+    """
+    The content should be copied within object storage instead of being downloaded and
+    uploaded again, and the attachments it references should be read from the cache.
+    """
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    image_key, image_url = get_image_refs(uuid.uuid4())
+    ydoc = pycrdt.Doc()
+    ydoc["document-store"] = pycrdt.XmlFragment(
+        [pycrdt.XmlElement("img", {"src": image_url})]
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory(
+            users=[user],
+            content=base64.b64encode(ydoc.get_update()).decode("utf-8"),
+            attachments=[image_key, "removed.png"],
+        )
+    assert document.get_content_attachments() == [image_key]
+
+    s3_client = default_storage.connection.meta.client
+    with (
+        mock.patch.object(s3_client, "get_object") as mock_get_object,
+        mock.patch.object(default_storage, "save") as mock_save,
+        django_capture_on_commit_callbacks(execute=True),
+    ):
+        response = client.post(f"/api/v1.0/documents/{document.id!s}/duplicate/")
+
+    assert response.status_code == 201
+    mock_get_object.assert_not_called()
+    mock_save.assert_not_called()
+
+    duplicated_document = models.Document.objects.get(id=response.json()["id"])
+    assert duplicated_document.attachments == [image_key]
+    assert duplicated_document.content_hash == document.content_hash
+    assert duplicated_document.content == document.content
+
+
+def test_api_documents_duplicate_with_descendants(django_capture_on_commit_callbacks):
+    """
+    The descendants of a document should be duplicated with their content, except the
+    ones that are deleted, if the user requests it specifically.
+    """
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory(
+            users=[(user, "reader")], title="template", link_reach="public"
+        )
+        next_sibling = factories.DocumentFactory()
+        document.refresh_from_db()
+        first_child = factories.DocumentFactory(
+            parent=document, title="first page", link_reach="authenticated"
+        )
+        second_child = factories.DocumentFactory(
+            parent=document, title="second page", content="", attachments=["a.png"]
+        )
+        grand_child = factories.DocumentFactory(parent=first_child, title="sub page")
+        deleted_child = factories.DocumentFactory(parent=document)
+        factories.DocumentFactory(parent=deleted_child)
+    deleted_child.soft_delete()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(
+            f"/api/v1.0/documents/{document.id!s}/duplicate/",
+            {"with_descendants": True},
+            format="json",
+        )
+
+    assert response.status_code == 201
+    assert models.Document.objects.count() == 11
+
+    duplicate = models.Document.objects.get(id=response.json()["id"])
+    assert duplicate.title == "Copy of template"
+    assert duplicate.link_reach == "restricted"
+    assert duplicate.get_next_sibling() == next_sibling
+    assert duplicate.accesses.get().user == user
+
+    copies = list(duplicate.get_descendants())
+    assert [copy.duplicated_from for copy in copies] == [
+        first_child,
+        grand_child,
+        second_child,
+    ]
+    for copy in [duplicate, *copies]:
+        original = copy.duplicated_from
+        assert copy.path[len(duplicate.path) :] == original.path[len(document.path) :]
+        assert copy.depth == original.depth
+        assert copy.numchild == original.numchild
+        assert copy.creator == user
+        assert copy.content == original.content
+        assert copy.content_hash == original.content_hash
+        assert copy.attachments == original.attachments
+        assert copy.ancestors_link_definitions == [
+            {"link_reach": ancestor.link_reach, "link_role": ancestor.link_role}
+            for ancestor in copy.get_ancestors()
+        ]
+    assert [copy.title for copy in copies] == ["first page", "sub page", "second page"]
+    assert copies[2].content_hash is None
+    assert copies[0].link_reach == "restricted"
+
+
+def test_api_documents_duplicate_with_descendants_and_accesses():
+    """
+    The accesses and links of the descendants should be duplicated along with them if
+    the user requests it specifically.
+    """
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    document = factories.DocumentFactory(
+        users=[(user, "owner")], link_reach="restricted"
+    )
+    child = factories.DocumentFactory(parent=document, link_reach="authenticated")
+    child_access = factories.UserDocumentAccessFactory(document=child)
+
+    response = client.post(
+        f"/api/v1.0/documents/{document.id!s}/duplicate/",
+        {"with_accesses": True, "with_descendants": True},
+        format="json",
+    )
+
+    assert response.status_code == 201
+    duplicate = models.Document.objects.get(id=response.json()["id"])
+    child_copy = duplicate.get_children().get()
+    assert child_copy.link_reach == "authenticated"
+    assert child_copy.ancestors_link_definitions == [
+        {"link_reach": duplicate.link_reach, "link_role": duplicate.link_role}
+    ]
+
+    access = child_copy.accesses.get()
+    assert (access.user, access.role, access.document_path) == (
+        child_access.user,
+        child_access.role,
+        child_copy.path,
+    )
+
+
+def test_api_documents_duplicate_with_descendants_queries_independent_of_size():
+    """The number of queries should not depend on the number of descendants."""
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    def count_queries(nb_children):
+        document = factories.DocumentFactory(users=[(user, "owner")])
+        for child in factories.DocumentFactory.create_batch(
+            nb_children, parent=document
+        ):
+            factories.DocumentFactory(parent=child)
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(
+                f"/api/v1.0/documents/{document.id!s}/duplicate/",
+                {"with_descendants": True},
+                format="json",
+            )
+
+        assert response.status_code == 201
+        duplicate = models.Document.objects.get(id=response.json()["id"])
+        assert duplicate.get_descendant_count() == nb_children * 2
+        return len(context.captured_queries)
+
+    assert count_queries(2) == count_queries(10)
@@ -34,7 +34,9 @@ def test_api_document_favorite_list_authenticated_no_favorite():
     }
 
 
-def test_api_document_favorite_list_authenticated_with_favorite():
+def test_api_document_favorite_list_authenticated_with_favorite(
+    django_capture_on_commit_callbacks,
+):
     """Authenticated users with a favorite should receive the favorite."""
 
     user = factories.UserFactory()
@@ -45,9 +47,10 @@ def test_api_document_favorite_list_authenticated_with_favorite():
     # removed. It should not be in the favorite list anymore.
     factories.DocumentFactory(favorited_by=[user])
 
-    document = factories.UserDocumentAccessFactory(
-        user=user, role=models.RoleChoices.READER, document__favorited_by=[user]
-    ).document
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.UserDocumentAccessFactory(
+            user=user, role=models.RoleChoices.READER, document__favorited_by=[user]
+        ).document
 
     response = client.get("/api/v1.0/documents/favorite_list/")
 
@@ -2,10 +2,16 @@
 Tests for Documents API endpoint in impress's core app: list
 """
 
+import base64
+import json
 import random
 from datetime import timedelta
 from unittest import mock
+from uuid import uuid4
 
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 import pytest
@@ -148,11 +154,11 @@ def test_api_documents_list_authenticated_direct(django_assert_num_queries):
         str(child4_with_access.id),
     }
 
-    with django_assert_num_queries(12):
+    with django_assert_num_queries(7):
         response = client.get("/api/v1.0/documents/")
 
     # nb_accesses should now be cached
-    with django_assert_num_queries(4):
+    with django_assert_num_queries(3):
         response = client.get("/api/v1.0/documents/")
 
     assert response.status_code == 200
@@ -186,11 +192,11 @@ def test_api_documents_list_authenticated_via_team(
 
     expected_ids = {str(document.id) for document in documents_team1 + documents_team2}
 
-    with django_assert_num_queries(14):
+    with django_assert_num_queries(7):
         response = client.get("/api/v1.0/documents/")
 
     # nb_accesses should now be cached
-    with django_assert_num_queries(4):
+    with django_assert_num_queries(3):
         response = client.get("/api/v1.0/documents/")
 
     assert response.status_code == 200
@@ -219,11 +225,11 @@ def test_api_documents_list_authenticated_link_reach_restricted(
     other_document = factories.DocumentFactory(link_reach="public")
     models.LinkTrace.objects.create(document=other_document, user=user)
 
-    with django_assert_num_queries(6):
+    with django_assert_num_queries(7):
         response = client.get("/api/v1.0/documents/")
 
     # nb_accesses should now be cached
-    with django_assert_num_queries(4):
+    with django_assert_num_queries(3):
         response = client.get("/api/v1.0/documents/")
 
     assert response.status_code == 200
@@ -268,11 +274,11 @@ def test_api_documents_list_authenticated_link_reach_public_or_authenticated(
 
     expected_ids = {str(document1.id), str(document2.id), str(visible_child.id)}
 
-    with django_assert_num_queries(10):
+    with django_assert_num_queries(7):
         response = client.get("/api/v1.0/documents/")
 
     # nb_accesses should now be cached
-    with django_assert_num_queries(4):
+    with django_assert_num_queries(3):
         response = client.get("/api/v1.0/documents/")
 
     assert response.status_code == 200
@@ -392,11 +398,11 @@ def test_api_documents_list_favorites_no_extra_queries(django_assert_num_queries
     factories.DocumentFactory.create_batch(2, users=[user])
 
     url = "/api/v1.0/documents/"
-    with django_assert_num_queries(14):
+    with django_assert_num_queries(7):
         response = client.get(url)
 
     # nb_accesses should now be cached
-    with django_assert_num_queries(4):
+    with django_assert_num_queries(3):
         response = client.get(url)
 
     assert response.status_code == 200
@@ -409,7 +415,7 @@ def test_api_documents_list_favorites_no_extra_queries(django_assert_num_queries
     for document in special_documents:
         models.DocumentFavorite.objects.create(document=document, user=user)
 
-    with django_assert_num_queries(4):
+    with django_assert_num_queries(3):
         response = client.get(url)
 
     assert response.status_code == 200
@@ -423,3 +429,161 @@ def test_api_documents_list_favorites_no_extra_queries(django_assert_num_queries
             assert result["is_favorite"] is True
         else:
             assert result["is_favorite"] is False
+
+
+def test_api_documents_list_nb_accesses_batched(django_assert_num_queries):
+    """
+    The number of accesses should be computed for the whole page at once: the number
+    of queries should not depend on the number of documents in the page.
+    """
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    factories.DocumentFactory(users=[user])
+    with django_assert_num_queries(7):
+        client.get("/api/v1.0/documents/")
+
+    cache.clear()
+    documents = factories.DocumentFactory.create_batch(19, users=[user])
+    for document in documents[:5]:
+        factories.UserDocumentAccessFactory(document=document)
+
+    with django_assert_num_queries(7):
+        response = client.get("/api/v1.0/documents/")
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert len(results) == 20
+    nb_accesses = {result["id"]: result["nb_accesses_direct"] for result in results}
+    for document in documents:
+        assert nb_accesses[str(document.id)] == (2 if document in documents[:5] else 1)
+        assert nb_accesses[str(document.id)] == document.get_nb_accesses()[1]
+
+
+@pytest.mark.parametrize("ordering", ["-updated_at", "created_at", "title", "-title"])
+def test_api_documents_list_cursor_pagination(ordering):
+    """
+    Cursor pagination should walk through all documents in the requested ordering,
+    including documents with the same or no value for the ordering field, without
+    counting them.
+    """
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    for title in ["b", "a", None, "a", None]:
+        factories.UserDocumentAccessFactory(
+            document=factories.DocumentFactory(title=title), user=user
+        )
+    expected_ids = [
+        str(document_id)
+        for document_id in models.Document.objects.order_by(ordering, "pk").values_list(
+            "id", flat=True
+        )
+    ]
+
+    ids = []
+    url = f"/api/v1.0/documents/?ordering={ordering:s}&page_size=2&cursor="
+    while url:
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+
+        assert response.status_code == 200
+        assert not any("COUNT(" in query["sql"] for query in context.captured_queries)
+        content = response.json()
+        assert list(content) == ["next", "results"]
+        assert len(content["results"]) <= 2
+        ids.extend(item["id"] for item in content["results"])
+        url = content["next"]
+
+    assert ids == expected_ids
+
+
+def test_api_documents_list_cursor_pagination_invalid_cursor():
+    """An invalid cursor should return a 404."""
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    response = client.get("/api/v1.0/documents/?cursor=invalid")
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+@pytest.mark.parametrize(
+    "position",
+    [
+        ["2024-01-01T00:00:00+00:00", "not-a-uuid"],
+        ["not-a-datetime", str(uuid4())],
+        [{"updated_at": None}, str(uuid4())],
+    ],
+)
+def test_api_documents_list_cursor_pagination_wrongly_typed_cursor(position):
+    """A well-formed cursor with values of the wrong type should return a 404."""
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    cursor = base64.urlsafe_b64encode(json.dumps(position).encode("ascii")).decode()
+    response = client.get(
+        f"/api/v1.0/documents/?ordering=-updated_at&cursor={cursor:s}"
+    )
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+def test_api_documents_list_cached_documents_ids(django_assert_num_queries):
+    """
+    The ids of documents accessible to the user should be cached between list calls
+    and renewed as soon as an access is created.
+    """
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    factories.DocumentFactory(users=[user])
+    response = client.get("/api/v1.0/documents/")
+    assert response.json()["count"] == 1
+
+    document = factories.DocumentFactory()
+    factories.UserDocumentAccessFactory(document=document, user=user)
+
+    with django_assert_num_queries(7):
+        response = client.get("/api/v1.0/documents/")
+
+    assert response.json()["count"] == 2
+
+
+def test_api_documents_list_highest_ancestors():
+    """
+    Documents listed via an access of the user should be reduced to their highest
+    ancestors among the documents accessible to the user, at any depth.
+    """
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    root = factories.DocumentFactory(users=[user])
+    child = factories.DocumentFactory(parent=root, users=[user])
+    factories.DocumentFactory(parent=child, users=[user])
+
+    hidden_root = factories.DocumentFactory(link_reach="restricted")
+    hidden_child = factories.DocumentFactory(
+        parent=hidden_root, link_reach="restricted"
+    )
+    grand_child = factories.DocumentFactory(parent=hidden_child, users=[user])
+    factories.DocumentFactory(parent=grand_child, users=[user])
+
+    response = client.get("/api/v1.0/documents/")
+
+    assert response.status_code == 200
+    assert {result["id"] for result in response.json()["results"]} == {
+        str(root.id),
+        str(grand_child.id),
+    }
@@ -14,7 +14,7 @@ import pytest
 import requests
 from rest_framework.test import APIClient
 
-from core import factories, models
+from core import factories, models, utils
 from core.tests.conftest import TEAM, USER, VIA
 
 pytestmark = pytest.mark.django_db
@@ -321,3 +321,33 @@ def test_api_documents_media_auth_related(via, mock_user_teams):
         timeout=1,
     )
     assert response.content.decode("utf-8") == "my prose"
+
+
+def test_api_documents_media_auth_processing():
+    """
+    Attachments still being processed should not be served until they are ready,
+    even if their status was cached.
+    """
+    document_id = uuid4()
+    key = f"{document_id!s}/attachments/{uuid4()!s}.jpg"
+    default_storage.connection.meta.client.put_object(
+        Bucket=default_storage.bucket_name,
+        Key=key,
+        Body=BytesIO(b"my prose"),
+        ContentType="text/plain",
+        Metadata={"status": "processing"},
+    )
+    factories.DocumentFactory(id=document_id, link_reach="public", attachments=[key])
+
+    original_url = f"http://localhost/media/{key:s}"
+    response = APIClient().get(
+        "/api/v1.0/documents/media-auth/", HTTP_X_ORIGINAL_URL=original_url
+    )
+    assert response.status_code == 403
+
+    utils.update_attachment_status(key, "ready")
+
+    response = APIClient().get(
+        "/api/v1.0/documents/media-auth/", HTTP_X_ORIGINAL_URL=original_url
+    )
+    assert response.status_code == 200
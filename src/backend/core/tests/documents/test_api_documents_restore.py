@@ -124,3 +124,60 @@ def test_api_documents_restore_authenticated_owner_expired():
 
     assert response.status_code == 404
     assert response.json() == {"detail": "Not found."}
+
+
+def test_api_documents_bulk_restore_authenticated_owner():
+    """
+    Authenticated users should be able to restore several documents they own at once.
+    Documents that were not deleted are ignored.
+    """
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    now = timezone.now() - timedelta(days=15)
+    deleted = factories.DocumentFactory.create_batch(
+        2, deleted_at=now, users=[(user, "owner")]
+    )
+    not_deleted = factories.DocumentFactory(users=[(user, "owner")])
+
+    response = client.post(
+        "/api/v1.0/documents/bulk-restore/",
+        {"ids": [str(document.id) for document in [*deleted, not_deleted]]},
+        format="json",
+    )
+
+    assert response.status_code == 200
+    assert sorted(response.json()["ids"]) == sorted(str(d.id) for d in deleted)
+    for document in deleted:
+        document.refresh_from_db()
+        assert document.deleted_at is None
+        assert document.ancestors_deleted_at is None
+
+
+def test_api_documents_bulk_restore_authenticated_not_owner():
+    """
+    No document should be restored if the user is not allowed to restore one of them.
+    """
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    now = timezone.now() - timedelta(days=15)
+    owned = factories.DocumentFactory(deleted_at=now, users=[(user, "owner")])
+    not_owned = factories.DocumentFactory(
+        deleted_at=now, users=[(user, "administrator")]
+    )
+
+    response = client.post(
+        "/api/v1.0/documents/bulk-restore/",
+        {"ids": [str(owned.id), str(not_owned.id)]},
+        format="json",
+    )
+
+    assert response.status_code == 403
+    for document in [owned, not_owned]:
+        document.refresh_from_db()
+        assert document.deleted_at == now
@@ -16,9 +16,12 @@ from core import factories, models
 pytestmark = pytest.mark.django_db
 
 
-def test_api_documents_retrieve_anonymous_public_standalone():
+def test_api_documents_retrieve_anonymous_public_standalone(
+    django_capture_on_commit_callbacks,
+):
     """Anonymous users should be allowed to retrieve public documents."""
-    document = factories.DocumentFactory(link_reach="public")
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory(link_reach="public")
 
     response = APIClient().get(f"/api/v1.0/documents/{document.id!s}/")
 
@@ -76,15 +79,19 @@ def test_api_documents_retrieve_anonymous_public_standalone():
     }
 
 
-def test_api_documents_retrieve_anonymous_public_parent():
+def test_api_documents_retrieve_anonymous_public_parent(
+    django_capture_on_commit_callbacks,
+):
     """Anonymous users should be allowed to retrieve a document who has a public ancestor."""
-    grand_parent = factories.DocumentFactory(link_reach="public")
-    parent = factories.DocumentFactory(
-        parent=grand_parent, link_reach=random.choice(["authenticated", "restricted"])
-    )
-    document = factories.DocumentFactory(
-        link_reach=random.choice(["authenticated", "restricted"]), parent=parent
-    )
+    with django_capture_on_commit_callbacks(execute=True):
+        grand_parent = factories.DocumentFactory(link_reach="public")
+        parent = factories.DocumentFactory(
+            parent=grand_parent,
+            link_reach=random.choice(["authenticated", "restricted"]),
+        )
+        document = factories.DocumentFactory(
+            link_reach=random.choice(["authenticated", "restricted"]), parent=parent
+        )
 
     response = APIClient().get(f"/api/v1.0/documents/{document.id!s}/")
 
@@ -170,7 +177,9 @@ def test_api_documents_retrieve_anonymous_restricted_or_authenticated(reach):
 
 
 @pytest.mark.parametrize("reach", ["public", "authenticated"])
-def test_api_documents_retrieve_authenticated_unrelated_public_or_authenticated(reach):
+def test_api_documents_retrieve_authenticated_unrelated_public_or_authenticated(
+    reach, django_capture_on_commit_callbacks
+):
     """
     Authenticated users should be able to retrieve a public/authenticated document to
     which they are not related.
@@ -180,7 +189,8 @@ def test_api_documents_retrieve_authenticated_unrelated_public_or_authenticated(
     client = APIClient()
     client.force_login(user)
 
-    document = factories.DocumentFactory(link_reach=reach)
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory(link_reach=reach)
 
     response = client.get(
         f"/api/v1.0/documents/{document.id!s}/",
@@ -242,7 +252,9 @@ def test_api_documents_retrieve_authenticated_unrelated_public_or_authenticated(
 
 
 @pytest.mark.parametrize("reach", ["public", "authenticated"])
-def test_api_documents_retrieve_authenticated_public_or_authenticated_parent(reach):
+def test_api_documents_retrieve_authenticated_public_or_authenticated_parent(
+    reach, django_capture_on_commit_callbacks
+):
     """
     Authenticated users should be allowed to retrieve a document who has a public or
     authenticated ancestor.
@@ -252,9 +264,10 @@ def test_api_documents_retrieve_authenticated_public_or_authenticated_parent(rea
     client = APIClient()
     client.force_login(user)
 
-    grand_parent = factories.DocumentFactory(link_reach=reach)
-    parent = factories.DocumentFactory(parent=grand_parent, link_reach="restricted")
-    document = factories.DocumentFactory(link_reach="restricted", parent=parent)
+    with django_capture_on_commit_callbacks(execute=True):
+        grand_parent = factories.DocumentFactory(link_reach=reach)
+        parent = factories.DocumentFactory(parent=grand_parent, link_reach="restricted")
+        document = factories.DocumentFactory(link_reach="restricted", parent=parent)
 
     response = client.get(f"/api/v1.0/documents/{document.id!s}/")
 
@@ -379,7 +392,9 @@ def test_api_documents_retrieve_authenticated_unrelated_restricted():
     }
 
 
-def test_api_documents_retrieve_authenticated_related_direct():
+def test_api_documents_retrieve_authenticated_related_direct(
+    django_capture_on_commit_callbacks,
+):
     """
     Authenticated users should be allowed to retrieve a document to which they
     are directly related whatever the role.
@@ -389,7 +404,8 @@ def test_api_documents_retrieve_authenticated_related_direct():
     client = APIClient()
     client.force_login(user)
 
-    document = factories.DocumentFactory()
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory()
     access = factories.UserDocumentAccessFactory(document=document, user=user)
     factories.UserDocumentAccessFactory(document=document)
 
@@ -418,7 +434,9 @@ def test_api_documents_retrieve_authenticated_related_direct():
     }
 
 
-def test_api_documents_retrieve_authenticated_related_parent():
+def test_api_documents_retrieve_authenticated_related_parent(
+    django_capture_on_commit_callbacks,
+):
     """
     Authenticated users should be allowed to retrieve a document if they are related
     to one of its ancestors whatever the role.
@@ -428,9 +446,10 @@ def test_api_documents_retrieve_authenticated_related_parent():
     client = APIClient()
     client.force_login(user)
 
-    grand_parent = factories.DocumentFactory(link_reach="restricted")
-    parent = factories.DocumentFactory(parent=grand_parent, link_reach="restricted")
-    document = factories.DocumentFactory(parent=parent, link_reach="restricted")
+    with django_capture_on_commit_callbacks(execute=True):
+        grand_parent = factories.DocumentFactory(link_reach="restricted")
+        parent = factories.DocumentFactory(parent=grand_parent, link_reach="restricted")
+        document = factories.DocumentFactory(parent=parent, link_reach="restricted")
 
     access = factories.UserDocumentAccessFactory(document=grand_parent, user=user)
     factories.UserDocumentAccessFactory(document=grand_parent)
@@ -589,7 +608,7 @@ def test_api_documents_retrieve_authenticated_related_team_none(mock_user_teams)
     ],
 )
 def test_api_documents_retrieve_authenticated_related_team_members(
-    teams, roles, mock_user_teams
+    teams, roles, mock_user_teams, django_capture_on_commit_callbacks
 ):
     """
     Authenticated users should be allowed to retrieve a document to which they
@@ -601,7 +620,8 @@ def test_api_documents_retrieve_authenticated_related_team_members(
     client = APIClient()
     client.force_login(user)
 
-    document = factories.DocumentFactory(link_reach="restricted")
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory(link_reach="restricted")
     factories.TeamDocumentAccessFactory(
         document=document, team="readers", role="reader"
     )
@@ -649,7 +669,7 @@ def test_api_documents_retrieve_authenticated_related_team_members(
     ],
 )
 def test_api_documents_retrieve_authenticated_related_team_administrators(
-    teams, roles, mock_user_teams
+    teams, roles, mock_user_teams, django_capture_on_commit_callbacks
 ):
     """
     Authenticated users should be allowed to retrieve a document to which they
@@ -662,7 +682,8 @@ def test_api_documents_retrieve_authenticated_related_team_administrators(
     client = APIClient()
     client.force_login(user)
 
-    document = factories.DocumentFactory(link_reach="restricted")
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory(link_reach="restricted")
 
     factories.TeamDocumentAccessFactory(
         document=document, team="readers", role="reader"
@@ -712,7 +733,7 @@ def test_api_documents_retrieve_authenticated_related_team_administrators(
     ],
 )
 def test_api_documents_retrieve_authenticated_related_team_owners(
-    teams, roles, mock_user_teams
+    teams, roles, mock_user_teams, django_capture_on_commit_callbacks
 ):
     """
     Authenticated users should be allowed to retrieve a restricted document to which
@@ -724,7 +745,8 @@ def test_api_documents_retrieve_authenticated_related_team_owners(
     client = APIClient()
     client.force_login(user)
 
-    document = factories.DocumentFactory(link_reach="restricted")
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory(link_reach="restricted")
 
     factories.TeamDocumentAccessFactory(
         document=document, team="readers", role="reader"
@@ -3,13 +3,17 @@ Test extract-attachments on document update in docs core app.
 """
 
 import base64
+from unittest import mock
 from uuid import uuid4
 
+from django.core.cache import cache
+from django.test.utils import override_settings
+
 import pycrdt
 import pytest
 from rest_framework.test import APIClient
 
-from core import factories
+from core import factories, utils
 
 pytestmark = pytest.mark.django_db
 
@@ -152,3 +156,38 @@ def test_api_documents_update_new_attachment_keys_duplicate():
     document.refresh_from_db()
     assert len(document.attachments) == 2
     assert set(document.attachments) == {image_key1, image_key2}
+
+
+@override_settings(DOCUMENT_CONTENT_STORAGE_FORMAT="gzip")
+def test_api_documents_update_attachment_keys_cached():
+    """
+    The attachment keys extracted from the content should be cached under the hash of
+    the content and under the hash of the content as stored, so that they are neither
+    extracted again for the same content nor when the document is duplicated.
+    """
+    cache.clear()
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    image_key = f"{uuid4()!s}/attachments/{uuid4()!s}.png"
+    document = factories.DocumentFactory(users=[(user, "editor")])
+    content = get_ydoc_with_mages([image_key])
+
+    with mock.patch.object(
+        utils, "extract_attachments", wraps=utils.extract_attachments
+    ) as mock_extract_attachments:
+        for _ in range(2):
+            response = client.put(
+                f"/api/v1.0/documents/{document.id!s}/",
+                {"content": content},
+                format="json",
+            )
+            assert response.status_code == 200
+
+    mock_extract_attachments.assert_called_once_with(content)
+    document.refresh_from_db()
+    assert document.get_content_attachments() == [image_key]
+    assert cache.get(utils.get_attachments_cache_key(document.content_hash)) == [
+        image_key
+    ]
@@ -0,0 +1,56 @@
+"""
+Unit tests for the S3AuthorizationSigner utility.
+"""
+
+from unittest import mock
+
+from freezegun import freeze_time
+
+from core.api import utils
+from core.management.commands.benchmark_s3_authorization_headers import (
+    generate_presigned_authorization_headers,
+)
+
+
+@freeze_time("2025-06-01 12:00:00")
+def test_api_utils_s3_authorization_signer_same_as_presigned():
+    """The signer should produce the same request as presigning the url."""
+    signer = utils.S3AuthorizationSigner()
+
+    for key in ["my-document/attachments/image.png", "a b/c~d+é.jpg"]:
+        expected = generate_presigned_authorization_headers(key)
+        request = signer.sign(key)
+
+        assert request.url == expected.url
+        assert dict(request.headers) == dict(expected.headers)
+
+
+def test_api_utils_s3_authorization_signer_reused():
+    """The SigV4 signer should be built once while the credentials don't change."""
+    signer = utils.S3AuthorizationSigner()
+
+    with mock.patch(
+        "botocore.auth.S3SigV4Auth", wraps=utils.botocore.auth.S3SigV4Auth
+    ) as auth:
+        for _ in range(3):
+            signer.sign("my-document/attachments/image.png")
+
+    assert auth.call_count == 1
+
+
+def test_api_utils_s3_authorization_signer_credentials_rotated():
+    """The SigV4 signer should be rebuilt when the credentials rotate."""
+    signer = utils.S3AuthorizationSigner()
+    auth = signer.get_auth()
+    assert signer.get_auth() is auth
+
+    credentials = mock.Mock()
+    credentials.get_frozen_credentials.return_value = mock.Mock(
+        access_key="new", secret_key="new", token=None
+    )
+    s3_client = utils.default_storage.connection.meta.client
+    with mock.patch.object(s3_client._request_signer, "_credentials", credentials):
+        rotated_auth = signer.get_auth()
+
+    assert rotated_auth is not auth
+    assert rotated_auth.credentials.access_key == "new"
@@ -25,6 +25,16 @@ def test_models_document_accesses_str():
     assert str(access) == "david.bowman@example.com is reader in document admins"
 
 
+def test_models_document_accesses_document_path():
+    """The path of the document should be copied on the access when it is created."""
+    parent = factories.DocumentFactory()
+    document = factories.DocumentFactory(parent=parent)
+    access = factories.UserDocumentAccessFactory(document=document)
+
+    access.refresh_from_db()
+    assert access.document_path == document.path
+
+
 def test_models_document_accesses_unique_user():
     """Document accesses should be unique for a given couple of user and document."""
     access = factories.UserDocumentAccessFactory()
@@ -3,8 +3,10 @@ Unit tests for the Document model
 """
 # pylint: disable=too-many-lines
 
+import hashlib
 import random
 import smtplib
+from datetime import timedelta
 from logging import Logger
 from unittest import mock
 
@@ -13,12 +15,14 @@ from django.core import mail
 from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.files.storage import default_storage
+from django.db import connection, transaction
 from django.test.utils import override_settings
 from django.utils import timezone
 
 import pytest
 
 from core import factories, models
+from core.utils import document_content_cache
 
 pytestmark = pytest.mark.django_db
 
@@ -69,6 +73,229 @@ def test_models_documents_file_key():
     assert document.file_key == "9531a5f1-42b1-496c-b3f4-1c09ed139b3c/file"
 
 
+def test_models_documents_content_hash():
+    """The hash and size of the content written to object storage should be tracked."""
+    document = factories.DocumentFactory(content="my content")
+
+    assert document.content_hash == hashlib.md5(b"my content").hexdigest()
+    assert document.content_size == 10
+
+    document.refresh_from_db()
+    document.content = "my new content"
+    document.save(update_fields=["title"])
+
+    document.refresh_from_db()
+    assert document.content_hash == hashlib.md5(b"my new content").hexdigest()
+    assert document.content_size == 14
+    assert document.content == "my new content"
+
+
+def test_models_documents_content_unchanged():
+    """Saving unchanged content should not reach the object storage."""
+    document = factories.DocumentFactory(content="my content")
+    document.content = "my content"
+
+    s3_client = default_storage.connection.meta.client
+    with (
+        mock.patch.object(s3_client, "head_object") as mock_head_object,
+        mock.patch.object(default_storage, "save") as mock_save,
+    ):
+        document.save()
+
+    mock_head_object.assert_not_called()
+    mock_save.assert_not_called()
+
+
+def test_models_documents_content_written_on_commit(
+    django_capture_on_commit_callbacks,
+):
+    """Content should only be written to object storage once the transaction commits."""
+    with django_capture_on_commit_callbacks() as callbacks:
+        document = models.Document.add_root(
+            instance=models.Document(title="my document", content="my content")
+        )
+
+    assert document.content_hash is not None
+    with pytest.raises(FileNotFoundError):
+        default_storage.open(document.file_key).read()
+
+    assert len(callbacks) == 1
+    callbacks[0]()
+    assert default_storage.open(document.file_key).read() == b"my content"
+
+
+def test_models_documents_content_written_out_of_order(
+    django_capture_on_commit_callbacks,
+):
+    """
+    The content written to object storage should be the content of the last save even
+    if the callbacks of successive saves run in another order.
+    """
+    with django_capture_on_commit_callbacks() as callbacks:
+        document = factories.DocumentFactory(content="my content")
+        document.content = "my new content"
+        document.save()
+
+    assert len(callbacks) == 2
+    for callback in reversed(callbacks):
+        callback()
+
+    assert default_storage.open(document.file_key).read() == b"my new content"
+    document.refresh_from_db()
+    assert document.content_hash == hashlib.md5(b"my new content").hexdigest()
+
+
+def test_models_documents_content_write_failed(django_capture_on_commit_callbacks):
+    """The content hash should be forgotten if writing the content failed."""
+    document = factories.DocumentFactory(content="my content")
+    document.content = "my new content"
+
+    with (
+        mock.patch.object(default_storage, "save", side_effect=ConnectionError),
+        pytest.raises(ConnectionError),
+        django_capture_on_commit_callbacks(execute=True),
+    ):
+        document.save()
+
+    document.refresh_from_db()
+    assert document.content_hash is None
+    assert document.content_size is None
+
+    # The content is written again on next save
+    document.content = "my new content"
+    with django_capture_on_commit_callbacks(execute=True):
+        document.save()
+    document.refresh_from_db()
+    assert document.content == "my new content"
+
+
+def test_models_documents_content_cached(django_capture_on_commit_callbacks):
+    """Content should be served from the cache instead of object storage."""
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory(content="my content")
+    document = models.Document.objects.get(pk=document.pk)
+
+    s3_client = default_storage.connection.meta.client
+    with mock.patch.object(s3_client, "get_object") as mock_get_object:
+        assert document.content == "my content"
+
+    mock_get_object.assert_not_called()
+
+
+def test_models_documents_content_cache_read_through(
+    django_capture_on_commit_callbacks,
+):
+    """Content read from object storage should be cached if it matches its hash."""
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory(content="my content")
+    document_content_cache.clear()
+    cache.clear()
+
+    assert models.Document.objects.get(pk=document.pk).content == "my content"
+    assert (
+        document_content_cache.get(document.pk, document.content_hash) == "my content"
+    )
+
+
+def test_models_documents_content_cache_read_through_uploaded_in_parts(
+    django_capture_on_commit_callbacks,
+):
+    """
+    Content uploaded in parts, of which the ETag is not an MD5, should be cached if it
+    matches its hash.
+    """
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory(content="my content")
+    s3_client = default_storage.connection.meta.client
+    bucket = default_storage.bucket_name
+    upload_id = s3_client.create_multipart_upload(Bucket=bucket, Key=document.file_key)[
+        "UploadId"
+    ]
+    part = s3_client.upload_part(
+        Bucket=bucket,
+        Key=document.file_key,
+        UploadId=upload_id,
+        PartNumber=1,
+        Body=b"my content",
+    )
+    s3_client.complete_multipart_upload(
+        Bucket=bucket,
+        Key=document.file_key,
+        UploadId=upload_id,
+        MultipartUpload={"Parts": [{"ETag": part["ETag"], "PartNumber": 1}]},
+    )
+    document_content_cache.clear()
+    cache.clear()
+
+    assert models.Document.objects.get(pk=document.pk).content == "my content"
+    assert (
+        document_content_cache.get(document.pk, document.content_hash) == "my content"
+    )
+
+
+def test_models_documents_content_cache_invalidated_on_save(
+    django_capture_on_commit_callbacks,
+):
+    """Saving new content should replace the previous content in the cache."""
+    document = factories.DocumentFactory(content="my content")
+    previous_content_hash = document.content_hash
+
+    document.content = "my new content"
+    with django_capture_on_commit_callbacks(execute=True):
+        document.save()
+
+    assert document_content_cache.get(document.pk, previous_content_hash) is None
+    assert models.Document.objects.get(pk=document.pk).content == "my new content"
+
+
+def test_models_documents_get_content_attachments_cached():
+    """
+    The attachments referenced in a content should be extracted once and cached under
+    the hash of the content, for all the documents sharing it.
+    """
+    cache.clear()
+    document, other_document = factories.DocumentFactory.create_batch(2)
+    assert document.content_hash == other_document.content_hash
+
+    with mock.patch.object(
+        models, "extract_attachments", return_value=["a.png"]
+    ) as mock_extract_attachments:
+        assert document.get_content_attachments() == ["a.png"]
+        assert other_document.get_content_attachments() == ["a.png"]
+
+    mock_extract_attachments.assert_called_once_with(document.content)
+
+
+@override_settings(DOCUMENT_CONTENT_STORAGE_FORMAT="gzip")
+def test_models_documents_content_storage_format(django_capture_on_commit_callbacks):
+    """
+    Contents should be written in the configured format and read back in base64,
+    whatever the format they were written in.
+    """
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory()
+    document_content_cache.clear()
+    cache.clear()
+
+    response = default_storage.connection.meta.client.get_object(
+        Bucket=default_storage.bucket_name, Key=document.file_key
+    )
+    assert response["Body"].read().startswith(b"\x00yjs:gzip\n")
+
+    content = factories.YDOC_HELLO_WORLD_BASE64
+    assert models.Document.objects.get(pk=document.pk).content == content
+    assert document.get_content_response()["Body"].read().decode("utf-8") == content
+
+    with override_settings(DOCUMENT_CONTENT_STORAGE_FORMAT="base64"):
+        document.content = "bXkgY29udGVudA=="
+        with django_capture_on_commit_callbacks(execute=True):
+            document.save()
+
+    document_content_cache.clear()
+    cache.clear()
+    assert models.Document.objects.get(pk=document.pk).content == "bXkgY29udGVudA=="
+
+
 def test_models_documents_tree_alphabet():
     """Test the creation of documents with treebeard methods."""
     models.Document.load_bulk(
@@ -607,7 +834,9 @@ def test_models_document_get_abilities_ai_access_public(is_authenticated, reach)
     assert abilities["ai_translate"] == is_authenticated
 
 
-def test_models_documents_get_versions_slice_pagination(settings):
+def test_models_documents_get_versions_slice_pagination(
+    settings, django_capture_on_commit_callbacks
+):
     """
     The "get_versions_slice" method should allow navigating all versions of
     the document with pagination.
@@ -615,10 +844,12 @@ def test_models_documents_get_versions_slice_pagination(settings):
     settings.DOCUMENT_VERSIONS_PAGE_SIZE = 4
 
     # Create a document with 7 versions
-    document = factories.DocumentFactory()
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory()
     for i in range(6):
         document.content = f"bar{i:d}"
-        document.save()
+        with django_capture_on_commit_callbacks(execute=True):
+            document.save()
 
     # Add a document version not related to the first document
     factories.DocumentFactory()
@@ -648,7 +879,9 @@ def test_models_documents_get_versions_slice_pagination(settings):
     assert response["next_version_id_marker"] != ""
 
 
-def test_models_documents_get_versions_slice_min_datetime():
+def test_models_documents_get_versions_slice_min_datetime(
+    django_capture_on_commit_callbacks,
+):
     """
     The "get_versions_slice" method should filter out versions anterior to
     the from_datetime passed in argument and the current version.
@@ -658,7 +891,8 @@ def test_models_documents_get_versions_slice_min_datetime():
     for i in range(6):
         from_dt.append(timezone.now())
         document.content = f"bar{i:d}"
-        document.save()
+        with django_capture_on_commit_callbacks(execute=True):
+            document.save()
 
     response = document.get_versions_slice(min_datetime=from_dt[2])
 
@@ -672,9 +906,10 @@ def test_models_documents_get_versions_slice_min_datetime():
     assert response["versions"][0]["last_modified"] > from_dt[4]
 
 
-def test_models_documents_version_duplicate():
+def test_models_documents_version_duplicate(django_capture_on_commit_callbacks):
     """A new version should be created in object storage only if the content has changed."""
-    document = factories.DocumentFactory()
+    with django_capture_on_commit_callbacks(execute=True):
+        document = factories.DocumentFactory()
 
     file_key = str(document.pk)
     response = default_storage.connection.meta.client.list_object_versions(
@@ -692,7 +927,8 @@ def test_models_documents_version_duplicate():
 
     # Save modified content
     document.content = "new content"
-    document.save()
+    with django_capture_on_commit_callbacks(execute=True):
+        document.save()
 
     response = default_storage.connection.meta.client.list_object_versions(
         Bucket=default_storage.bucket_name, Prefix=file_key
@@ -842,7 +1078,6 @@ def test_models_documents_nb_accesses_cache_is_set_and_retrieved_ancestors(
     """Test that nb_accesses is cached when calling nb_accesses_ancestors."""
     parent = factories.DocumentFactory()
     document = factories.DocumentFactory(parent=parent)
-    key = f"document_{document.id!s}_nb_accesses"
     nb_accesses_parent = random.randint(1, 4)
     factories.UserDocumentAccessFactory.create_batch(
         nb_accesses_parent, document=parent
@@ -854,7 +1089,7 @@ def test_models_documents_nb_accesses_cache_is_set_and_retrieved_ancestors(
     factories.UserDocumentAccessFactory()  # An unrelated access should not be counted
 
     # Initially, the nb_accesses should not be cached
-    assert cache.get(key) is None
+    assert cache.get(document.get_nb_accesses_cache_key()) is None
 
     # Compute the nb_accesses for the first time (this should set the cache)
     nb_accesses_ancestors = nb_accesses_parent + nb_accesses_direct
@@ -864,16 +1099,24 @@ def test_models_documents_nb_accesses_cache_is_set_and_retrieved_ancestors(
     # Ensure that the nb_accesses is now cached
     with django_assert_num_queries(0):
         assert document.nb_accesses_ancestors == nb_accesses_ancestors
-    assert cache.get(key) == (nb_accesses_direct, nb_accesses_ancestors)
+    assert cache.get(document.get_nb_accesses_cache_key()) == (
+        nb_accesses_direct,
+        nb_accesses_ancestors,
+    )
 
     # The cache value should be invalidated when a document access is created
     models.DocumentAccess.objects.create(
         document=document, user=factories.UserFactory(), role="reader"
     )
-    assert cache.get(key) is None  # Cache should be invalidated
+    assert (
+        cache.get(document.get_nb_accesses_cache_key()) is None
+    )  # Cache should be invalidated
     with django_assert_num_queries(2):
         assert document.nb_accesses_ancestors == nb_accesses_ancestors + 1
-    assert cache.get(key) == (nb_accesses_direct + 1, nb_accesses_ancestors + 1)
+    assert cache.get(document.get_nb_accesses_cache_key()) == (
+        nb_accesses_direct + 1,
+        nb_accesses_ancestors + 1,
+    )
 
 
 def test_models_documents_nb_accesses_cache_is_set_and_retrieved_direct(
@@ -882,7 +1125,6 @@ def test_models_documents_nb_accesses_cache_is_set_and_retrieved_direct(
     """Test that nb_accesses is cached when calling nb_accesses_direct."""
     parent = factories.DocumentFactory()
     document = factories.DocumentFactory(parent=parent)
-    key = f"document_{document.id!s}_nb_accesses"
     nb_accesses_parent = random.randint(1, 4)
     factories.UserDocumentAccessFactory.create_batch(
         nb_accesses_parent, document=parent
@@ -894,7 +1136,7 @@ def test_models_documents_nb_accesses_cache_is_set_and_retrieved_direct(
     factories.UserDocumentAccessFactory()  # An unrelated access should not be counted
 
     # Initially, the nb_accesses should not be cached
-    assert cache.get(key) is None
+    assert cache.get(document.get_nb_accesses_cache_key()) is None
 
     # Compute the nb_accesses for the first time (this should set the cache)
     nb_accesses_ancestors = nb_accesses_parent + nb_accesses_direct
@@ -904,16 +1146,24 @@ def test_models_documents_nb_accesses_cache_is_set_and_retrieved_direct(
     # Ensure that the nb_accesses is now cached
     with django_assert_num_queries(0):
         assert document.nb_accesses_direct == nb_accesses_direct
-    assert cache.get(key) == (nb_accesses_direct, nb_accesses_ancestors)
+    assert cache.get(document.get_nb_accesses_cache_key()) == (
+        nb_accesses_direct,
+        nb_accesses_ancestors,
+    )
 
     # The cache value should be invalidated when a document access is created
     models.DocumentAccess.objects.create(
         document=document, user=factories.UserFactory(), role="reader"
     )
-    assert cache.get(key) is None  # Cache should be invalidated
+    assert (
+        cache.get(document.get_nb_accesses_cache_key()) is None
+    )  # Cache should be invalidated
     with django_assert_num_queries(2):
         assert document.nb_accesses_direct == nb_accesses_direct + 1
-    assert cache.get(key) == (nb_accesses_direct + 1, nb_accesses_ancestors + 1)
+    assert cache.get(document.get_nb_accesses_cache_key()) == (
+        nb_accesses_direct + 1,
+        nb_accesses_ancestors + 1,
+    )
 
 
 @pytest.mark.parametrize("field", ["nb_accesses_ancestors", "nb_accesses_direct"])
@@ -923,22 +1173,26 @@ def test_models_documents_nb_accesses_cache_is_invalidated_on_access_removal(
 ):
     """Test that the cache is invalidated when a document access is deleted."""
     document = factories.DocumentFactory()
-    key = f"document_{document.id!s}_nb_accesses"
     access = factories.UserDocumentAccessFactory(document=document)
 
     # Initially, the nb_accesses should be cached
     assert getattr(document, field) == 1
-    assert cache.get(key) == (1, 1)
+    assert cache.get(document.get_nb_accesses_cache_key()) == (1, 1)
 
     # Remove the access and check if cache is invalidated
     access.delete()
-    assert cache.get(key) is None  # Cache should be invalidated
+    assert (
+        cache.get(document.get_nb_accesses_cache_key()) is None
+    )  # Cache should be invalidated
 
     # Recompute the nb_accesses (this should trigger a cache set)
     with django_assert_num_queries(2):
         new_nb_accesses = getattr(document, field)
     assert new_nb_accesses == 0
-    assert cache.get(key) == (0, 0)  # Cache should now contain the new value
+    assert cache.get(document.get_nb_accesses_cache_key()) == (
+        0,
+        0,
+    )  # Cache should now contain the new value
 
 
 @pytest.mark.parametrize("field", ["nb_accesses_ancestors", "nb_accesses_direct"])
@@ -948,22 +1202,26 @@ def test_models_documents_nb_accesses_cache_is_invalidated_on_document_soft_dele
 ):
     """Test that the cache is invalidated when a document access is deleted."""
     document = factories.DocumentFactory()
-    key = f"document_{document.id!s}_nb_accesses"
     factories.UserDocumentAccessFactory(document=document)
 
     # Initially, the nb_accesses should be cached
     assert getattr(document, field) == 1
-    assert cache.get(key) == (1, 1)
+    assert cache.get(document.get_nb_accesses_cache_key()) == (1, 1)
 
     # Soft delete the document and check if cache is invalidated
     document.soft_delete()
-    assert cache.get(key) is None  # Cache should be invalidated
+    assert (
+        cache.get(document.get_nb_accesses_cache_key()) is None
+    )  # Cache should be invalidated
 
     # Recompute the nb_accesses (this should trigger a cache set)
     with django_assert_num_queries(2):
         new_nb_accesses = getattr(document, field)
     assert new_nb_accesses == (1 if field == "nb_accesses_direct" else 0)
-    assert cache.get(key) == (1, 0)  # Cache should now contain the new value
+    assert cache.get(document.get_nb_accesses_cache_key()) == (
+        1,
+        0,
+    )  # Cache should now contain the new value
 
     document.restore()
 
@@ -971,7 +1229,123 @@ def test_models_documents_nb_accesses_cache_is_invalidated_on_document_soft_dele
     with django_assert_num_queries(2):
         new_nb_accesses = getattr(document, field)
     assert new_nb_accesses == 1
-    assert cache.get(key) == (1, 1)  # Cache should now contain the new value
+    assert cache.get(document.get_nb_accesses_cache_key()) == (
+        1,
+        1,
+    )  # Cache should now contain the new value
+
+
+@pytest.mark.parametrize("shape", ["wide", "deep"])
+def test_models_documents_nb_accesses_cache_invalidate_subtree(
+    shape, django_assert_num_queries
+):
+    """
+    Invalidating the number of accesses of a document should invalidate it on all
+    its descendants in constant time, whatever the shape of the tree.
+    """
+    root = factories.DocumentFactory()
+    descendants = []
+    parent = root
+    for _i in range(30):
+        document = factories.DocumentFactory(parent=parent)
+        descendants.append(document)
+        if shape == "deep":
+            parent = document
+
+    models.Document.prefetch_nb_accesses(descendants)
+    assert all(
+        cache.get(document.get_nb_accesses_cache_key()) == (0, 0)
+        for document in descendants
+    )
+
+    # Bypass the access model's signals to measure invalidation on its own
+    models.DocumentAccess.objects.bulk_create(
+        [
+            models.DocumentAccess(
+                document=root, document_path=root.path, user=factories.UserFactory()
+            )
+        ]
+    )
+    with (
+        django_assert_num_queries(0),
+        mock.patch.object(cache, "delete") as mock_delete,
+        mock.patch.object(cache, "set", wraps=cache.set) as mock_set,
+    ):
+        root.invalidate_nb_accesses_cache()
+
+    mock_delete.assert_not_called()
+    assert mock_set.call_count == 1
+
+    for document in descendants:
+        assert cache.get(document.get_nb_accesses_cache_key()) is None
+        assert models.Document.objects.get(pk=document.pk).get_nb_accesses() == (0, 1)
+
+
+def test_models_documents_nb_accesses_cache_invalidate_unrelated():
+    """Invalidating a document should not invalidate its ancestors or siblings."""
+    parent = factories.DocumentFactory()
+    document, sibling = factories.DocumentFactory.create_batch(2, parent=parent)
+    models.Document.prefetch_nb_accesses([parent, document, sibling])
+
+    document.invalidate_nb_accesses_cache()
+
+    assert cache.get(document.get_nb_accesses_cache_key()) is None
+    assert cache.get(parent.get_nb_accesses_cache_key()) == (0, 0)
+    assert cache.get(sibling.get_nb_accesses_cache_key()) == (0, 0)
+
+
+@pytest.mark.parametrize("is_authenticated", [True, False])
+def test_models_documents_prefetch_abilities(
+    is_authenticated, django_assert_num_queries, mock_user_teams
+):
+    """
+    Prefetching abilities should give the same abilities as computing them document
+    by document, with only one query for all documents.
+    """
+    user = factories.UserFactory() if is_authenticated else AnonymousUser()
+    mock_user_teams.return_value = ["team1"]
+
+    root = factories.DocumentFactory(link_reach="restricted")
+    documents = []
+    for reach in ["restricted", "authenticated", "public"]:
+        parent = factories.DocumentFactory(parent=root, link_reach=reach)
+        for role in ["reader", "editor"]:
+            child = factories.DocumentFactory(
+                parent=parent, link_reach="restricted", link_role=role
+            )
+            documents.extend(
+                [child, factories.DocumentFactory(parent=child, link_reach=reach)]
+            )
+        documents.append(parent)
+    if is_authenticated:
+        factories.UserDocumentAccessFactory(document=documents[0], user=user)
+        factories.TeamDocumentAccessFactory(
+            document=documents[5], team="team1", role="editor"
+        )
+    deleted_document = factories.DocumentFactory(parent=documents[2])
+    deleted_document.soft_delete()
+    documents.append(deleted_document)
+
+    expected_abilities = [
+        models.Document.objects.get(pk=document.pk).get_abilities(user)
+        for document in documents
+    ]
+    expected_roles = [
+        set(models.Document.objects.get(pk=document.pk).get_roles(user))
+        for document in documents
+    ]
+
+    documents = [models.Document.objects.get(pk=document.pk) for document in documents]
+    with django_assert_num_queries(1):
+        models.Document.prefetch_abilities(documents, user)
+
+    with django_assert_num_queries(0):
+        assert [document.get_abilities(user) for document in documents] == (
+            expected_abilities
+        )
+        assert [set(document.get_roles(user)) for document in documents] == (
+            expected_roles
+        )
 
 
 def test_models_documents_numchild_deleted_from_instance():
@@ -1056,7 +1430,7 @@ def test_models_documents_restore(django_assert_num_queries):
     assert document.deleted_at is not None
     assert document.ancestors_deleted_at == document.deleted_at
 
-    with django_assert_num_queries(8):
+    with django_assert_num_queries(2):
         document.restore()
     document.refresh_from_db()
     assert document.deleted_at is None
@@ -1099,7 +1473,7 @@ def test_models_documents_restore_complex(django_assert_num_queries):
     assert child2.ancestors_deleted_at == document.deleted_at
 
     # Restore the item
-    with django_assert_num_queries(11):
+    with django_assert_num_queries(2):
         document.restore()
     document.refresh_from_db()
     child1.refresh_from_db()
@@ -1149,7 +1523,7 @@ def test_models_documents_restore_complex_bis(django_assert_num_queries):
 
     # Restoring the grand parent should not restore the document
     # as it was deleted before the grand parent
-    with django_assert_num_queries(9):
+    with django_assert_num_queries(2):
         grand_parent.restore()
 
     grand_parent.refresh_from_db()
@@ -1167,6 +1541,80 @@ def test_models_documents_restore_complex_bis(django_assert_num_queries):
     assert child2.ancestors_deleted_at == document.deleted_at
 
 
+def test_models_documents_soft_delete_num_queries(django_assert_num_queries):
+    """Soft deleting a document should mark its whole subtree in one query."""
+    parent = factories.DocumentFactory()
+    document = factories.DocumentFactory(parent=parent)
+    children = factories.DocumentFactory.create_batch(3, parent=document)
+    factories.DocumentFactory(parent=children[0])
+
+    with django_assert_num_queries(1):
+        document.soft_delete()
+
+    parent.refresh_from_db()
+    assert parent.numchild == 0
+    descendants = models.Document.objects.filter(
+        path__startswith=document.path, depth__gt=document.depth
+    )
+    assert descendants.count() == 4
+    for descendant in descendants:
+        assert descendant.deleted_at is None
+        assert descendant.ancestors_deleted_at == document.deleted_at
+
+
+def test_models_documents_soft_delete_restore_documents():
+    """
+    Several documents, nested or not, should be soft deleted and restored at once
+    with the number of children of their parents kept up to date. Documents already
+    deleted or permanently deleted should be ignored, as well as documents with an
+    ancestor among them: they are deleted and restored with this ancestor.
+    """
+    parent = factories.DocumentFactory()
+    first, second, third = factories.DocumentFactory.create_batch(3, parent=parent)
+    nested = factories.DocumentFactory(parent=first)
+    grand_child = factories.DocumentFactory(parent=nested)
+    third.soft_delete()
+
+    deleted_at = timezone.now()
+    paths = models.Document.soft_delete_documents(
+        [first.pk, nested.pk, second.pk, third.pk], deleted_at=deleted_at
+    )
+
+    assert paths == {
+        first.pk: first.path,
+        second.pk: second.path,
+    }
+    for document in [parent, first, second, nested, grand_child]:
+        document.refresh_from_db()
+    assert (parent.numchild, first.numchild) == (0, 1)
+    for document in [first, second]:
+        assert document.deleted_at == document.ancestors_deleted_at == deleted_at
+    for document in [nested, grand_child]:
+        assert document.deleted_at is None
+        assert document.ancestors_deleted_at == deleted_at
+
+    # Documents deleted before the trashbin cutoff cannot be restored
+    expired_at = models.get_trashbin_cutoff() - timedelta(days=1)
+    models.Document.objects.filter(pk=second.pk).update(
+        deleted_at=expired_at, ancestors_deleted_at=expired_at
+    )
+    paths = models.Document.restore_documents(
+        [first.pk, nested.pk, second.pk, third.pk, parent.pk]
+    )
+
+    assert paths == {
+        first.pk: first.path,
+        third.pk: third.path,
+    }
+    for document in [parent, first, second, third, nested, grand_child]:
+        document.refresh_from_db()
+    assert (parent.numchild, first.numchild) == (2, 1)
+    for document in [first, third, nested, grand_child]:
+        assert document.deleted_at is None
+        assert document.ancestors_deleted_at is None
+    assert second.deleted_at is not None
+
+
 @pytest.mark.parametrize(
     "ancestors_links, select_options",
     [
@@ -1349,3 +1797,316 @@ def test_models_documents_compute_ancestors_links_highest_readable(
         assert child3.compute_ancestors_links(user=other_user) == [
             {"link_reach": child2.link_reach, "link_role": child2.link_role},
         ]
+
+
+def test_models_documents_get_ancestors_paths():
+    """Ancestors paths should be computed from the path, from the root down."""
+    assert models.Document.get_ancestors_paths("000000100000020000003") == [
+        "0000001",
+        "00000010000002",
+        "000000100000020000003",
+    ]
+
+
+def test_models_documents_readable_attachments(django_assert_num_queries):
+    """
+    Attachments should be readable by users having access to the document declaring
+    them or to one of its ancestors.
+    """
+    user = factories.UserFactory()
+    root = factories.DocumentFactory(link_reach="restricted", users=[user])
+    child = factories.DocumentFactory(
+        parent=root, link_reach="restricted", attachments=["a", "b"]
+    )
+    factories.DocumentFactory(parent=child, link_reach="restricted", attachments=["c"])
+    factories.DocumentFactory(link_reach="restricted", attachments=["d"])
+    factories.DocumentFactory(link_reach="public", attachments=["e"])
+
+    with django_assert_num_queries(2):
+        assert models.Document.objects.readable_attachments(
+            user, ["a", "c", "d", "e", "unknown"]
+        ) == {"a", "c", "e"}
+
+    with django_assert_num_queries(0):
+        assert models.Document.objects.readable_attachments(user, []) == set()
+
+
+def test_models_documents_readable_attachments_num_queries(django_assert_num_queries):
+    """
+    The number of queries to look for readable attachments should not depend on the
+    number of documents the user can read.
+    """
+    user = factories.UserFactory()
+    factories.DocumentFactory.create_batch(20, users=[user])
+    document = factories.DocumentFactory(attachments=["a"], link_reach="restricted")
+
+    with django_assert_num_queries(2):
+        assert models.Document.objects.readable_attachments(user, ["a"]) == set()
+
+    factories.UserDocumentAccessFactory(document=document, user=user)
+
+    with django_assert_num_queries(2):
+        assert models.Document.objects.readable_attachments(user, ["a"]) == {"a"}
+
+
+def test_models_documents_link_definitions_add_child():
+    """Documents added to the tree should inherit the link definitions of their ancestors."""
+    root = factories.DocumentFactory(link_reach="authenticated", link_role="editor")
+    parent = root.add_child(link_reach="public", link_role="reader")
+    document = factories.DocumentFactory(parent=parent, link_reach="restricted")
+    sibling = document.add_sibling("right", link_reach="restricted")
+
+    for instance in [parent, document, sibling]:
+        instance.refresh_from_db()
+
+    assert root.ancestors_link_definitions == []
+    assert parent.ancestors_link_definitions == [
+        {"link_reach": "authenticated", "link_role": "editor"}
+    ]
+    for instance in [document, sibling]:
+        assert instance.ancestors_link_definitions == [
+            {"link_reach": "authenticated", "link_role": "editor"},
+            {"link_reach": "public", "link_role": "reader"},
+        ]
+
+
+def test_models_documents_link_definitions_link_change():
+    """Changing the link of a document should update the definitions of its descendants."""
+    root = factories.DocumentFactory(link_reach="restricted", link_role="reader")
+    parent = factories.DocumentFactory(
+        parent=root, link_reach="restricted", link_role="reader"
+    )
+    document = factories.DocumentFactory(
+        parent=parent, link_reach="restricted", link_role="reader"
+    )
+    other_document = factories.DocumentFactory(
+        parent=root, link_reach="restricted", link_role="reader"
+    )
+
+    parent.link_reach = "public"
+    parent.link_role = "editor"
+    parent.save()
+
+    for instance in [parent, document, other_document]:
+        instance.refresh_from_db()
+    assert parent.ancestors_link_definitions == [
+        {"link_reach": "restricted", "link_role": "reader"},
+    ]
+    assert document.ancestors_link_definitions == [
+        {"link_reach": "restricted", "link_role": "reader"},
+        {"link_reach": "public", "link_role": "editor"},
+    ]
+    assert other_document.ancestors_link_definitions == [
+        {"link_reach": "restricted", "link_role": "reader"},
+    ]
+
+
+def test_models_documents_link_definitions_move():
+    """Moving a document should update the definitions of the moved subtree."""
+    public_root = factories.DocumentFactory(link_reach="public", link_role="reader")
+    restricted_root = factories.DocumentFactory(
+        link_reach="restricted", link_role="reader"
+    )
+    parent = factories.DocumentFactory(
+        parent=restricted_root, link_reach="restricted", link_role="reader"
+    )
+    document = factories.DocumentFactory(
+        parent=parent, link_reach="restricted", link_role="reader"
+    )
+
+    parent.move(public_root, pos="first-child")
+
+    document.refresh_from_db()
+    assert document.ancestors_link_definitions == [
+        {"link_reach": "public", "link_role": "reader"},
+        {"link_reach": "restricted", "link_role": "reader"},
+    ]
+
+
+def test_models_documents_add_root_sequence():
+    """
+    Root documents should be added at positions taken from a sequence, skipping the
+    positions taken by roots that treebeard added itself.
+    """
+    root = factories.DocumentFactory()
+    sibling = root.add_sibling("last-sibling", title="sibling")
+
+    document = models.Document.add_root(title="root")
+
+    assert document.depth == 1
+    assert document.path > sibling.path > root.path
+    assert models.Document.objects.filter(depth=1).count() == 3
+
+
+def test_models_documents_add_root_position_taken_concurrently():
+    """
+    A position taken by another root between the uniqueness check and the insert
+    should be skipped without aborting the transaction.
+    """
+    root = factories.DocumentFactory()
+    get_path = models.Document._get_path
+    paths = iter([root.path])
+
+    with (
+        mock.patch.object(
+            models.Document,
+            "_get_path",
+            side_effect=lambda *args: next(paths, None) or get_path(*args),
+        ),
+        # Skip the uniqueness check as if the position was taken after it
+        mock.patch.object(models.Document, "full_clean"),
+    ):
+        document = models.Document.add_root(title="root")
+
+    assert document.depth == 1
+    assert document.path > root.path
+    assert models.Document.objects.filter(depth=1).count() == 2
+
+
+def assert_accesses_paths_in_sync():
+    """The path copied on each access should be the path of its document."""
+    for access in models.DocumentAccess.objects.select_related("document"):
+        assert access.document_path == access.document.path
+
+
+def test_models_documents_accesses_paths_move():
+    """
+    Moving a document should update the path copied on the accesses of the moved
+    subtree and of the siblings shifted to make room for it.
+    """
+    root = factories.DocumentFactory(users=factories.UserFactory.create_batch(2))
+    first_child, second_child = factories.DocumentFactory.create_batch(
+        2, parent=root, users=[factories.UserFactory()]
+    )
+    factories.DocumentFactory(parent=second_child, teams=["lasuite"])
+    other_root = factories.DocumentFactory()
+    document = factories.DocumentFactory(parent=other_root, teams=["unknown"])
+    factories.DocumentFactory(parent=document, users=[factories.UserFactory()])
+
+    document.move(first_child, pos="left")
+
+    assert document.path.startswith(root.path)
+    assert_accesses_paths_in_sync()
+
+
+def test_models_documents_accesses_paths_add_sibling():
+    """
+    Adding a sibling should update the path copied on the accesses of the siblings
+    shifted to make room for it.
+    """
+    root = factories.DocumentFactory()
+    first_child, second_child = factories.DocumentFactory.create_batch(
+        2, parent=root, users=[factories.UserFactory()]
+    )
+    factories.DocumentFactory(parent=second_child, teams=["lasuite"])
+    path = second_child.path
+
+    first_child.add_sibling("right", title="sibling")
+
+    second_child.refresh_from_db()
+    assert second_child.path != path
+    assert_accesses_paths_in_sync()
+
+
+@pytest.mark.parametrize("is_authenticated", [True, False])
+def test_models_documents_get_ancestors_links(is_authenticated):
+    """
+    Ancestors links computed from the stored link definitions should be the same as
+    the ancestors links computed from the tree.
+    """
+    user = factories.UserFactory() if is_authenticated else AnonymousUser()
+    documents = []
+    for _i in range(5):
+        parent = random.choice([*documents, None]) if documents else None
+        document = factories.DocumentFactory(
+            parent=parent,
+            link_reach=random.choice(models.LinkReachChoices.values),
+            link_role=random.choice(models.LinkRoleChoices.values),
+            users=[user] if is_authenticated and random.random() < 0.3 else [],
+        )
+        documents.append(document)
+
+    for document in models.Document.objects.filter(
+        pk__in=[document.pk for document in documents]
+    ):
+        assert document.get_ancestors_links(user) == (
+            document.compute_ancestors_links(user)
+        )
+
+
+def test_models_documents_get_ancestors_links_num_queries(django_assert_num_queries):
+    """Ancestors links should be computed without querying the ancestors."""
+    user = factories.UserFactory()
+    root = factories.DocumentFactory(link_reach="authenticated", link_role="reader")
+    parent = factories.DocumentFactory(
+        parent=root, link_reach="public", link_role="reader"
+    )
+    document = models.Document.objects.get(
+        pk=factories.DocumentFactory(parent=parent, users=[user]).pk
+    )
+
+    with django_assert_num_queries(0):
+        assert document.get_ancestors_links(user) == [
+            {"link_reach": "authenticated", "link_role": "reader"},
+            {"link_reach": "public", "link_role": "reader"},
+        ]
+        assert document.get_ancestors_links(AnonymousUser()) == [
+            {"link_reach": "public", "link_role": "reader"},
+        ]
+
+    # The accesses of the user are needed when a restricted ancestor offers the
+    # editor role above the highest ancestor readable through its link
+    root.link_reach = "restricted"
+    root.link_role = "editor"
+    root.save()
+    document.refresh_from_db()
+
+    with django_assert_num_queries(2):
+        assert document.get_ancestors_links(user) == [
+            {"link_reach": "public", "link_role": "reader"},
+        ]
+
+
+def test_models_documents_highest_ancestors(django_assert_num_queries):
+    """Only documents of which no ancestor is in the queryset should be kept."""
+    root1 = factories.DocumentFactory()
+    child1 = factories.DocumentFactory(parent=root1)
+    grand_child1 = factories.DocumentFactory(parent=child1)
+    root2 = factories.DocumentFactory()
+    child2 = factories.DocumentFactory(parent=root2)
+    grand_child2 = factories.DocumentFactory(parent=child2)
+    factories.DocumentFactory(parent=grand_child2)
+
+    queryset = models.Document.objects.filter(
+        pk__in=[root1.pk, child1.pk, grand_child1.pk, grand_child2.pk]
+    )
+
+    with django_assert_num_queries(1):
+        assert list(queryset.highest_ancestors()) == [root1, grand_child2]
+
+    assert list(models.Document.objects.highest_ancestors()) == [root1, root2]
+
+
+def test_models_documents_get_roles_index_scan():
+    """
+    The roles of a user on a document and its ancestors should be looked up on the
+    indexes of the document path and of the document accesses.
+    """
+    user = factories.UserFactory()
+    root = factories.DocumentFactory(users=[(user, "editor")])
+    parent = factories.DocumentFactory(parent=root)
+    document = factories.DocumentFactory(parent=parent, users=[(user, "reader")])
+    factories.DocumentFactory(parent=document, users=[(user, "owner")])
+    factories.UserDocumentAccessFactory.create_batch(5)
+
+    roles = document.get_roles(user)
+    assert sorted(roles) == ["editor", "reader"]
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Tables are too small for the planner to prefer indexes on its own
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = roles.explain()
+
+    assert "Seq Scan on impress_document_access" not in plan
+    # Paths are copied on accesses so documents are not joined
+    assert "on impress_document " not in plan
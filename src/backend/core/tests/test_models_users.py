@@ -8,7 +8,7 @@ from django.core.exceptions import ValidationError
 
 import pytest
 
-from core import factories
+from core import factories, models
 
 pytestmark = pytest.mark.django_db
 
@@ -44,3 +44,60 @@ def test_models_users_send_mail_main_missing():
         user.email_user("my subject", "my message")
 
     assert str(excinfo.value) == "User has no email address."
+
+
+def test_models_users_get_documents_ids_cached(django_assert_num_queries):
+    """The ids of documents accessible to a user should be cached."""
+    user = factories.UserFactory()
+    document = factories.DocumentFactory(users=[user])
+    traced_document = factories.DocumentFactory(link_traces=[user])
+    factories.DocumentFactory(users=[factories.UserFactory()])
+
+    with django_assert_num_queries(2):
+        assert user.get_documents_ids() == ([document.id], [traced_document.id])
+
+    with django_assert_num_queries(0):
+        assert user.get_documents_ids() == ([document.id], [traced_document.id])
+
+
+def test_models_users_get_documents_ids_invalidated_by_accesses(mock_user_teams):
+    """Creating or deleting an access of a user or of its teams should renew the cache."""
+    mock_user_teams.return_value = ["lasuite"]
+    user = factories.UserFactory()
+    other_user = factories.UserFactory()
+    assert user.get_documents_ids() == ([], [])
+    assert other_user.get_documents_ids() == ([], [])
+
+    access = factories.UserDocumentAccessFactory(user=user)
+    assert user.get_documents_ids() == ([access.document_id], [])
+
+    team_access = factories.TeamDocumentAccessFactory(team="lasuite")
+    assert set(user.get_documents_ids()[0]) == {
+        access.document_id,
+        team_access.document_id,
+    }
+
+    access.delete()
+    team_access.delete()
+    assert user.get_documents_ids() == ([], [])
+
+    # Only the generation of the user of the access is renewed
+    with mock.patch.object(
+        models.User, "invalidate_documents_ids_cache"
+    ) as mock_invalidate:
+        factories.UserDocumentAccessFactory(user=user)
+    mock_invalidate.assert_called_once_with(user_ids=[user.id], teams=[""])
+
+
+def test_models_users_get_documents_ids_invalidated_by_link_traces():
+    """Creating or deleting a link trace of a user should renew the cache."""
+    user = factories.UserFactory()
+    assert user.get_documents_ids() == ([], [])
+
+    link_trace = models.LinkTrace.objects.create(
+        document=factories.DocumentFactory(), user=user
+    )
+    assert user.get_documents_ids() == ([], [link_trace.document_id])
+
+    link_trace.delete()
+    assert user.get_documents_ids() == ([], [])
@@ -0,0 +1,155 @@
+"""
+Unit tests for the tasks purging the trashbin
+"""
+
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test.utils import override_settings
+from django.utils import timezone
+
+import pytest
+
+from core import factories, models
+from core.tasks import TRASHBIN_PURGE_PROGRESS_CACHE_KEY, purge_trashbin
+from core.utils import get_attachment_status_cache_key
+
+pytestmark = pytest.mark.django_db
+
+
+def save_attachment(document):
+    """Save an attachment under the key base of a document and return its key."""
+    return default_storage.save(
+        f"{document.key_base:s}/attachments/image.png", ContentFile(b"image")
+    )
+
+
+def soft_delete_expired(documents):
+    """Soft delete documents before the cutoff of the trashbin."""
+    models.Document.soft_delete_documents(
+        [document.id for document in documents],
+        deleted_at=models.get_trashbin_cutoff() - timedelta(days=1),
+    )
+
+
+def test_tasks_purge_trashbin():
+    """
+    Documents deleted before the cutoff should be purged with their descendants, their
+    accesses and their files. Other documents should be left untouched.
+    """
+    user = factories.UserFactory()
+    root = factories.DocumentFactory(users=[(user, "owner")])
+    root_key = save_attachment(root)
+    expired = factories.DocumentFactory(parent=root, users=[(user, "owner")])
+    expired_child = factories.DocumentFactory(parent=expired)
+    key = save_attachment(expired_child)
+    recently_deleted = factories.DocumentFactory(parent=root)
+    soft_delete_expired([expired])
+    recently_deleted.soft_delete()
+    for attachment_key in [key, root_key]:
+        cache.set(get_attachment_status_cache_key(attachment_key), "ready", None)
+
+    purge_trashbin()
+
+    assert set(models.Document.objects.values_list("id", flat=True)) == {
+        root.id,
+        recently_deleted.id,
+    }
+    assert list(
+        models.DocumentAccess.objects.values_list("document_id", flat=True)
+    ) == [root.id]
+    assert default_storage.exists(key) is False
+    assert default_storage.exists(root_key) is True
+    assert cache.get(get_attachment_status_cache_key(key)) is None
+    assert cache.get(get_attachment_status_cache_key(root_key)) == "ready"
+    assert cache.get(TRASHBIN_PURGE_PROGRESS_CACHE_KEY) is None
+
+    root.refresh_from_db()
+    assert root.numchild == 0
+
+
+def test_tasks_purge_trashbin_shared_attachments():
+    """Attachments still referenced by documents that are not purged should be kept."""
+    expired = factories.DocumentFactory()
+    key = save_attachment(expired)
+    unused_key = default_storage.save(
+        f"{expired.key_base:s}/attachments/unused.png", ContentFile(b"image")
+    )
+    models.Document.objects.filter(id=expired.id).update(attachments=[key, unused_key])
+    duplicate = factories.DocumentFactory(attachments=[key])
+    soft_delete_expired([expired])
+
+    purge_trashbin()
+
+    assert list(models.Document.objects.values_list("id", flat=True)) == [duplicate.id]
+    assert default_storage.exists(key) is True
+    assert default_storage.exists(unused_key) is False
+
+
+@override_settings(TRASHBIN_PURGE_BATCH_SIZE=2)
+def test_tasks_purge_trashbin_batches():
+    """Expired documents should be purged in batches, descendants first."""
+    root = factories.DocumentFactory()
+    child = factories.DocumentFactory(parent=root)
+    grand_children = factories.DocumentFactory.create_batch(3, parent=child)
+    soft_delete_expired([root])
+
+    cutoff = models.get_trashbin_cutoff()
+    assert models.Document.purge_trashbin(cutoff, 2)[0] == 2
+    assert set(models.Document.objects.values_list("id", flat=True)) == {
+        root.id,
+        child.id,
+        grand_children[0].id,
+    }
+
+    purge_trashbin()
+
+    assert models.Document.objects.exists() is False
+
+
+def test_tasks_purge_trashbin_already_running():
+    """A purge should not be started while another purge is running."""
+    document = factories.DocumentFactory()
+    soft_delete_expired([document])
+    cache.set(
+        TRASHBIN_PURGE_PROGRESS_CACHE_KEY,
+        {
+            "cutoff": models.get_trashbin_cutoff(),
+            "documents": 0,
+            "objects": 0,
+            "heartbeat": timezone.now(),
+        },
+    )
+
+    purge_trashbin()
+
+    assert models.Document.objects.filter(id=document.id).exists() is True
+
+
+def test_tasks_purge_trashbin_resume():
+    """A purge that stopped without finishing should be resumed with its cutoff."""
+    expired = factories.DocumentFactory()
+    after_cutoff = factories.DocumentFactory()
+    soft_delete_expired([expired, after_cutoff])
+    cache.set(
+        TRASHBIN_PURGE_PROGRESS_CACHE_KEY,
+        {
+            "cutoff": models.get_trashbin_cutoff() - timedelta(days=2),
+            "documents": 10,
+            "objects": 20,
+            "heartbeat": timezone.now() - timedelta(days=1),
+        },
+    )
+    deleted_at = models.get_trashbin_cutoff() - timedelta(days=3)
+    models.Document.objects.filter(id=expired.id).update(
+        deleted_at=deleted_at, ancestors_deleted_at=deleted_at
+    )
+
+    purge_trashbin()
+
+    assert list(models.Document.objects.values_list("id", flat=True)) == [
+        after_cutoff.id
+    ]
+    assert cache.get(TRASHBIN_PURGE_PROGRESS_CACHE_KEY) is None
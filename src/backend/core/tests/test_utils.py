@@ -2,8 +2,13 @@
 
 import base64
 import uuid
+from unittest import mock
+
+from django.core.cache import cache
+from django.test.utils import override_settings
 
 import pycrdt
+import pytest
 
 from core import utils
 
@@ -75,3 +80,70 @@ def test_utils_extract_attachments():
     base64_string = base64.b64encode(update).decode("utf-8")
     # image_key2 is missing the "/media/" part and shouldn't get extracted
     assert utils.extract_attachments(base64_string) == [image_key1, image_key3]
+
+
+@pytest.mark.parametrize("prefix_length", range(3))
+def test_utils_extract_attachments_positions(prefix_length):
+    """
+    Attachment keys should be extracted wherever they start in the groups of 3 bytes
+    encoded by the base64 content, and whether the content is padded or not.
+    """
+    keys = [f"{uuid.uuid4()!s}/attachments/{uuid.uuid4()!s}.png" for _ in range(3)]
+    ydoc = pycrdt.Doc()
+    ydoc["document-store"] = pycrdt.XmlFragment(
+        [
+            pycrdt.XmlElement(
+                "p", {}, [pycrdt.XmlText(f"{'a' * prefix_length:s}/media/{key:s}")]
+            )
+            for key in keys
+        ]
+    )
+    content = base64.b64encode(ydoc.get_update()).decode("utf-8")
+
+    assert utils.extract_attachments(content) == keys
+    # Contents that are not strictly encoded are decoded in full
+    assert utils.extract_attachments(f"{content:s}\n") == keys
+
+
+def test_utils_get_content_attachments_cached():
+    """The attachment keys extracted from a content should be cached."""
+    cache.clear()
+    content = base64.b64encode(b"content").decode("utf-8")
+
+    with mock.patch.object(
+        utils, "extract_attachments", return_value=["a.png"]
+    ) as mock_extract_attachments:
+        assert utils.get_content_attachments(content) == ["a.png"]
+        assert utils.get_content_attachments(content) == ["a.png"]
+
+    mock_extract_attachments.assert_called_once_with(content)
+    assert utils.get_content_attachments("") == []
+
+
+@pytest.mark.parametrize("content_format", ["base64", "gzip"])
+def test_utils_encode_decode_content(content_format):
+    """Contents should be decoded to their base64 form whatever their format."""
+    data = utils.encode_content(TEST_BASE64_STRING, content_format)
+
+    assert utils.get_content_format(data) == content_format
+    assert utils.decode_content(data).decode("utf-8") == TEST_BASE64_STRING
+
+
+def test_utils_encode_content_gzip():
+    """The gzip format should store the compressed binary Yjs update behind a header."""
+    data = utils.encode_content(TEST_BASE64_STRING, "gzip")
+
+    assert data.startswith(b"\x00yjs:gzip\n")
+    assert len(data) < len(TEST_BASE64_STRING)
+    assert data == utils.encode_content(TEST_BASE64_STRING, "gzip")
+
+
+@override_settings(DOCUMENT_CONTENT_STORAGE_FORMAT="gzip")
+def test_utils_encode_content_setting():
+    """The format should default to the DOCUMENT_CONTENT_STORAGE_FORMAT setting."""
+    assert utils.get_content_format(utils.encode_content(TEST_BASE64_STRING)) == "gzip"
+
+
+def test_utils_encode_content_invalid_base64():
+    """Contents that are not valid base64 should be stored as is."""
+    assert utils.encode_content("not base64!", "gzip") == b"not base64!"
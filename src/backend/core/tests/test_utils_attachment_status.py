@@ -0,0 +1,84 @@
+"""
+Unit tests for the cached status of attachments.
+"""
+
+from io import BytesIO
+from unittest import mock
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.test.utils import override_settings
+
+import pytest
+
+from core import enums, utils
+
+
+@pytest.fixture(name="key")
+def fixture_key():
+    """Upload an attachment to object storage and return its key."""
+    key = f"{uuid4()!s}/attachments/{uuid4()!s}.jpg"
+    default_storage.connection.meta.client.put_object(
+        Bucket=default_storage.bucket_name,
+        Key=key,
+        Body=BytesIO(b"my prose"),
+        ContentType="text/plain",
+        ContentDisposition='inline; filename="my_prose.txt"',
+    )
+    return key
+
+
+def head_object_spy():
+    """Spy on the calls made to the object storage to read metadata."""
+    s3_client = default_storage.connection.meta.client
+    return mock.patch.object(s3_client, "head_object", wraps=s3_client.head_object)
+
+
+def test_utils_get_attachment_status_ready_cached(key):
+    """A ready attachment should only be looked up once in object storage."""
+    with (
+        head_object_spy() as head_object,
+        mock.patch.object(cache, "set", wraps=cache.set) as cache_set,
+    ):
+        for _ in range(3):
+            assert utils.get_attachment_status(key) == "ready"
+
+    assert head_object.call_count == 1
+    cache_set.assert_called_once_with(
+        utils.get_attachment_status_cache_key(key), "ready", None
+    )
+
+
+@override_settings(ATTACHMENT_PROCESSING_STATUS_CACHE_TIMEOUT=30)
+def test_utils_get_attachment_status_processing_cached_briefly(key):
+    """A processing attachment should only be cached for a short time."""
+    utils.update_attachment_status(key, enums.DocumentAttachmentStatus.PROCESSING)
+
+    with (
+        head_object_spy() as head_object,
+        mock.patch.object(cache, "set", wraps=cache.set) as cache_set,
+    ):
+        assert utils.get_attachment_status(key) == "processing"
+        assert utils.get_attachment_status(key) == "processing"
+
+    assert head_object.call_count == 1
+    cache_set.assert_called_once_with(
+        utils.get_attachment_status_cache_key(key), "processing", 30
+    )
+
+
+def test_utils_update_attachment_status_invalidates_cache(key):
+    """Updating the status of an attachment should invalidate its cached status."""
+    utils.update_attachment_status(key, enums.DocumentAttachmentStatus.PROCESSING)
+    assert utils.get_attachment_status(key) == "processing"
+
+    utils.update_attachment_status(key, enums.DocumentAttachmentStatus.READY)
+    assert utils.get_attachment_status(key) == "ready"
+
+    head_resp = default_storage.connection.meta.client.head_object(
+        Bucket=default_storage.bucket_name, Key=key
+    )
+    assert head_resp["Metadata"] == {"status": "ready"}
+    assert head_resp["ContentType"] == "text/plain"
+    assert head_resp["ContentDisposition"] == 'inline; filename="my_prose.txt"'
@@ -0,0 +1,60 @@
+"""
+Unit tests for the DocumentContentCache utility.
+"""
+
+from django.core.cache import cache
+from django.test.utils import override_settings
+
+from core.utils import DocumentContentCache
+
+
+def test_utils_document_content_cache_tiers():
+    """Contents should be cached in memory and in the shared cache."""
+    content_cache = DocumentContentCache()
+    content_cache.set("doc", "hash", "my content")
+
+    assert content_cache.get("doc", "hash") == "my content"
+    assert cache.get(content_cache.get_key("doc", "hash")) == "my content"
+
+    # Another process finds the content in the shared cache
+    other_content_cache = DocumentContentCache()
+    assert other_content_cache.get("doc", "hash") == "my content"
+    assert other_content_cache.size == 10
+
+    assert content_cache.get("doc", "other-hash") is None
+
+
+@override_settings(DOCUMENT_CONTENT_CACHE_MAX_ENTRY_SIZE=5)
+def test_utils_document_content_cache_max_entry_size():
+    """Contents bigger than the maximum entry size should not be cached."""
+    content_cache = DocumentContentCache()
+    content_cache.set("doc", "hash", "my content")
+
+    assert content_cache.get("doc", "hash") is None
+    assert content_cache.size == 0
+
+
+@override_settings(DOCUMENT_CONTENT_CACHE_SIZE=20)
+def test_utils_document_content_cache_lru_eviction():
+    """The least recently used contents should be evicted from memory when full."""
+    content_cache = DocumentContentCache()
+    content_cache.set("doc1", "hash", "0123456789")
+    content_cache.set("doc2", "hash", "0123456789")
+    content_cache.get("doc1", "hash")
+    content_cache.set("doc3", "hash", "0123456789")
+
+    assert content_cache.size == 20
+    assert list(content_cache._entries) == [
+        content_cache.get_key("doc1", "hash"),
+        content_cache.get_key("doc3", "hash"),
+    ]
+
+
+def test_utils_document_content_cache_delete():
+    """Deleting a content should remove it from both tiers."""
+    content_cache = DocumentContentCache()
+    content_cache.set("doc", "hash", "my content")
+    content_cache.delete("doc", "hash")
+
+    assert content_cache.get("doc", "hash") is None
+    assert content_cache.size == 0
@@ -1,7 +1,16 @@
 """Utils for the core app."""
 
 import base64
-import re
+import binascii
+import functools
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
 
 import pycrdt
 from bs4 import BeautifulSoup
@@ -67,10 +76,286 @@ def base64_yjs_to_text(base64_string):
     return soup.get_text(separator=" ", strip=True)
 
 
+# Header prefixed to document contents stored in a binary format, followed by the
+# name of the format and a line feed. It can't be confused with base64 text.
+CONTENT_FORMAT_HEADER = b"\x00yjs:"
+
+CONTENT_FORMAT_CODECS = {
+    # A fixed mtime keeps the output, and thus the content hash, deterministic
+    enums.DocumentContentFormat.GZIP: (
+        functools.partial(gzip.compress, mtime=0),
+        gzip.decompress,
+    ),
+}
+
+
+def encode_content(content, content_format=None):
+    """
+    Encode a base64 Yjs document content to the bytes stored in object storage, in the
+    format configured by DOCUMENT_CONTENT_STORAGE_FORMAT unless specified.
+
+    Binary formats store the raw Yjs update, compressed, behind a header naming the
+    format. Contents that are not valid base64 are stored as is.
+    """
+    content_format = enums.DocumentContentFormat(
+        content_format or settings.DOCUMENT_CONTENT_STORAGE_FORMAT
+    )
+    if content_format == enums.DocumentContentFormat.BASE64:
+        return content.encode("utf-8")
+
+    try:
+        yjs_update = base64.b64decode(content, validate=True)
+    except binascii.Error:
+        return content.encode("utf-8")
+
+    compress, _decompress = CONTENT_FORMAT_CODECS[content_format]
+    return (
+        CONTENT_FORMAT_HEADER
+        + content_format.encode("ascii")
+        + b"\n"
+        + compress(yjs_update)
+    )
+
+
+def get_content_format(data):
+    """Return the format in which a document content read from object storage is."""
+    if not data.startswith(CONTENT_FORMAT_HEADER):
+        return enums.DocumentContentFormat.BASE64
+
+    header_end = data.index(b"\n")
+    return enums.DocumentContentFormat(
+        data[len(CONTENT_FORMAT_HEADER) : header_end].decode("ascii")
+    )
+
+
+def decode_content(data):
+    """
+    Decode the bytes of a document content read from object storage, whatever its
+    format, to the bytes of its base64 Yjs representation.
+    """
+    content_format = get_content_format(data)
+    if content_format == enums.DocumentContentFormat.BASE64:
+        return data
+
+    _compress, decompress = CONTENT_FORMAT_CODECS[content_format]
+    yjs_update = decompress(data[data.index(b"\n") + 1 :])
+    return base64.b64encode(yjs_update)
+
+
+@functools.cache
+def get_base64_needles(literal):
+    """
+    Return the base64 encodings of a literal for each of the 3 positions it can have
+    in a group of 3 bytes of a stream, trimmed to the groups of 4 characters that only
+    depend on the literal, with the number of bytes preceding it in its first group.
+    """
+    needles = []
+    for offset in range(3):
+        encoded = base64.b64encode(b"\x00" * offset + literal).decode("ascii")
+        # The first group also depends on the bytes preceding the literal
+        first_group_end = 4 if offset else 0
+        needles.append(
+            (encoded[first_group_end : 4 * ((offset + len(literal)) // 3)], offset)
+        )
+    return needles
+
+
 def extract_attachments(content):
-    """Helper method to extract media paths from a document's content."""
+    """
+    Helper method to extract media paths from a document's content.
+
+    Rather than decoding the whole content and rendering its Yjs update to xml, the
+    base64 content is searched for the encodings of the media url prefix: media urls
+    are stored as UTF-8 strings in the update, from which the content of deleted nodes
+    is garbage collected. Only the few characters around each occurrence are decoded.
+    """
     if not content:
         return []
 
-    xml_content = base64_yjs_to_xml(content)
-    return re.findall(enums.MEDIA_STORAGE_URL_EXTRACT, xml_content)
+    needles = get_base64_needles(settings.MEDIA_URL.encode("utf-8"))
+    if len(content) % 4 or not all(needle for needle, _offset in needles):
+        # The groups of bytes can't be located in a content that is not strictly
+        # encoded and a media url too short can't be searched in all positions
+        yjs_update = base64.b64decode(content)
+        return [
+            match.decode("utf-8")
+            for match in enums.MEDIA_STORAGE_URL_EXTRACT_BYTES.findall(yjs_update)
+        ]
+
+    # Number of base64 characters to decode to read the longest media url
+    window = 4 * ((2 + enums.MEDIA_STORAGE_URL_EXTRACT_MAX_LENGTH) // 3 + 1)
+    starts = set()
+    for needle, offset in needles:
+        # Occurrences that are not aligned on a group are false positives
+        shift = 4 if offset else 0
+        index = content.find(needle, shift)
+        while index != -1:
+            if (index - shift) % 4 == 0:
+                starts.add((index - shift, offset))
+            index = content.find(needle, index + 1)
+
+    attachments = []
+    for start, offset in sorted(starts):
+        data = base64.b64decode(content[start : start + window])
+        if match := enums.MEDIA_STORAGE_URL_EXTRACT_BYTES.match(data, offset):
+            attachments.append(match.group(1).decode("utf-8"))
+    return attachments
+
+
+def get_attachments_cache_key(content_hash):
+    """Return the cache key of the attachments referenced by a content."""
+    return f"content_{content_hash:s}_attachments"
+
+
+def get_content_attachments(content):
+    """
+    Return the media paths extracted from a content, memoized in the cache under the
+    MD5 hash of the content.
+    """
+    if not content:
+        return []
+
+    content_hash = hashlib.md5(content.encode("utf-8")).hexdigest()  # noqa: S324
+    cache_key = get_attachments_cache_key(content_hash)
+    attachments = cache.get(cache_key)
+    if attachments is None:
+        attachments = extract_attachments(content)
+        cache.set(cache_key, attachments, settings.DOCUMENT_CONTENT_CACHE_TIMEOUT)
+    return attachments
+
+
+def get_attachment_status_cache_key(key):
+    """Return the cache key under which the status of an attachment is stored."""
+    return f"attachment_{key:s}_status"
+
+
+def get_attachment_status(key):
+    """
+    Return the status of an attachment as declared in its object storage metadata.
+
+    Attachments only go from "processing" to "ready" once so a "ready" status is cached
+    forever while other statuses are only cached for a short time to notice the change.
+    """
+    cache_key = get_attachment_status_cache_key(key)
+    status = cache.get(cache_key)
+    if status is not None:
+        return status
+
+    s3_client = default_storage.connection.meta.client
+    head_resp = s3_client.head_object(Bucket=default_storage.bucket_name, Key=key)
+    status = head_resp.get("Metadata", {}).get(
+        "status", enums.DocumentAttachmentStatus.READY
+    )
+
+    timeout = (
+        None
+        if status == enums.DocumentAttachmentStatus.READY
+        else settings.ATTACHMENT_PROCESSING_STATUS_CACHE_TIMEOUT
+    )
+    cache.set(cache_key, status, timeout)
+    return status
+
+
+def update_attachment_status(key, status):
+    """
+    Set the status of an attachment in its object storage metadata and invalidate
+    the cached status.
+    """
+    s3_client = default_storage.connection.meta.client
+    bucket_name = default_storage.bucket_name
+    head_resp = s3_client.head_object(Bucket=bucket_name, Key=key)
+
+    # Replacing the metadata also replaces the headers so we must carry them over
+    extra_args = {
+        header: head_resp[header]
+        for header in ["ContentType", "ContentDisposition"]
+        if header in head_resp
+    }
+    s3_client.copy_object(
+        Bucket=bucket_name,
+        CopySource={"Bucket": bucket_name, "Key": key},
+        Key=key,
+        Metadata={**head_resp.get("Metadata", {}), "status": status},
+        MetadataDirective="REPLACE",
+        **extra_args,
+    )
+    cache.delete(get_attachment_status_cache_key(key))
+
+
+class DocumentContentCache:
+    """
+    Two-tier cache of document contents: a per-process LRU bounded in bytes in front of
+    the shared Django cache.
+
+    Contents are indexed by document id and hash of the content, so an entry never
+    goes stale: saving new content changes the hash under which it is looked up.
+    Contents bigger than DOCUMENT_CONTENT_CACHE_MAX_ENTRY_SIZE bytes are not cached.
+    """
+
+    def __init__(self):
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(document_id, content_hash):
+        """Return the key under which a content is cached."""
+        return f"document_{document_id!s}_content_{content_hash:s}"
+
+    def get(self, document_id, content_hash):
+        """Return the cached content or None, looking in memory first."""
+        key = self.get_key(document_id, content_hash)
+        with self._lock:
+            content = self._entries.get(key)
+            if content is not None:
+                self._entries.move_to_end(key)
+                return content
+
+        content = cache.get(key)
+        if content is not None:
+            self._set_local(key, content)
+        return content
+
+    def set(self, document_id, content_hash, content):
+        """Cache a content in memory and in the shared cache if it is small enough."""
+        if len(content) > settings.DOCUMENT_CONTENT_CACHE_MAX_ENTRY_SIZE:
+            return
+
+        key = self.get_key(document_id, content_hash)
+        cache.set(key, content, settings.DOCUMENT_CONTENT_CACHE_TIMEOUT)
+        self._set_local(key, content)
+
+    def delete(self, document_id, content_hash):
+        """Remove a content from both tiers of the cache."""
+        key = self.get_key(document_id, content_hash)
+        cache.delete(key)
+        with self._lock:
+            content = self._entries.pop(key, None)
+            if content is not None:
+                self.size -= len(content)
+
+    def clear(self):
+        """Empty the per-process tier of the cache."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _set_local(self, key, content):
+        """Cache a content in memory, evicting the least recently used contents."""
+        maxsize = settings.DOCUMENT_CONTENT_CACHE_SIZE
+        if len(content) > maxsize:
+            return
+
+        with self._lock:
+            previous_content = self._entries.pop(key, None)
+            if previous_content is not None:
+                self.size -= len(previous_content)
+
+            self._entries[key] = content
+            self.size += len(content)
+            while self.size > maxsize:
+                _key, evicted_content = self._entries.popitem(last=False)
+                self.size -= len(evicted_content)
+
+
+document_content_cache = DocumentContentCache()
@@ -1,3 +1,12 @@
+import functools
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError, TokenBackendError
@@ -9,6 +18,8 @@ from django.utils.timezone import now
 from core.models import User
 import jwt
 
+logger = logging.getLogger(__name__)
+
 UserModel = get_user_model()
 
 
@@ -18,13 +29,91 @@ def blacklist_user_tokens(user):
         blacklist_models.BlacklistedToken.objects.get_or_create(token=token)
 
 
+class ValidatedTokenCache:
+    """
+    Bounded per-process LRU cache of validated tokens indexed by a hash of the raw
+    token. Entries expire when their token does (`exp` claim), so a cached token is
+    never considered valid for longer than verifying its signature again would allow.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(raw_token):
+        """Hash the raw token so that tokens are not kept in memory as is."""
+        if isinstance(raw_token, str):
+            raw_token = raw_token.encode("utf-8")
+        return hashlib.sha256(raw_token).hexdigest()
+
+    def get(self, raw_token):
+        """Return the validated token cached for this raw token or None."""
+        key = self.get_key(raw_token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() >= entry[1]:
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, raw_token, validated_token):
+        """Cache a validated token until it expires, evicting the least recently used."""
+        expires_at = validated_token.get("exp")
+        if not self.maxsize or not expires_at:
+            return
+
+        key = self.get_key(raw_token)
+        with self._lock:
+            self._entries[key] = (validated_token, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Empty the cache and reset its counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def get_stats(self):
+        """Return hit/miss counters and the current size of the cache."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+
+validated_token_cache = ValidatedTokenCache(
+    maxsize=settings.JWT_VALIDATED_TOKEN_CACHE_SIZE
+)
+
+
 class CustomJWTAuthentication(JWTStatelessUserAuthentication):
     create_unknown_user = True
 
     def get_user(self, validated_token):
         """
-        Returns a stateless user object which is backed by the given validated
-        token.
+        Returns the user backed by the given validated token.
+
+        Users are cached for JWT_USER_CACHE_TIMEOUT seconds under the id claim of the
+        token, which is synchronized on their username, along with a fingerprint of the
+        claims they were resolved from, so that subsequent requests carrying the same
+        claims don't hit the database. The database is only written when the claims
+        synchronized on the user (timezone, organization...) changed.
         """
 
         user_id = validated_token.get(api_settings.USER_ID_CLAIM, None)
@@ -35,6 +124,17 @@ class CustomJWTAuthentication(JWTStatelessUserAuthentication):
         if not user_id or not email:
             raise InvalidToken(_("Token contained no recognizable user identification"))
 
+        cache_key = User.get_auth_cache_key(user_id)
+        fingerprint = hashlib.sha256(
+            f"{user_id}|{email}|{timeZone}|{organizationId}".encode()
+        ).hexdigest()
+
+        if settings.JWT_USER_CACHE_TIMEOUT:
+            cached = cache.get(cache_key)
+            if cached is not None and cached[0] == fingerprint:
+                user = cached[1]
+                return user if self.user_can_authenticate(user) else None
+
         if self.create_unknown_user:
             user, created = User.objects.get_or_create(
                 defaults={
@@ -49,7 +149,13 @@ class CustomJWTAuthentication(JWTStatelessUserAuthentication):
             user.username = user_id
             user.timezone = timeZone
             user.organization_id = organizationId
-            user.save()
+            if dirty_fields := user.get_dirty_fields():
+                user.save(update_fields=list(dirty_fields))
+
+            if settings.JWT_USER_CACHE_TIMEOUT:
+                cache.set(
+                    cache_key, (fingerprint, user), settings.JWT_USER_CACHE_TIMEOUT
+                )
 
             if created:
                 return user
@@ -57,13 +163,138 @@ class CustomJWTAuthentication(JWTStatelessUserAuthentication):
             try:
                 user = User.objects.get_by_natural_key(user_id)
             except UserModel.DoesNotExist:
-                pass
+                user = None
 
         return user if self.user_can_authenticate(user) else None
 
     def user_can_authenticate(self, user):
         return user is not None and user.is_active
 
+    def get_validated_token(self, raw_token):
+        """
+        Validates the given raw token, reusing the result of a previous validation
+        of the same token while it has not expired.
+        """
+        validated_token = validated_token_cache.get(raw_token)
+        if validated_token is None:
+            validated_token = self.validate_token(raw_token)
+            validated_token_cache.set(raw_token, validated_token)
+        return validated_token
+
+    def validate_token(self, raw_token):
+        """Verify the signature and claims of the raw token."""
+        return super().get_validated_token(raw_token)
+
+
+class JWKSKeyCache:
+    """
+    Process-wide, thread-safe cache of the issuer's signing keys indexed by `kid`.
+
+    - keys are kept for `ttl` seconds and refreshed in a background thread once they
+      are within `refresh_margin` seconds of expiring, so requests never wait on the
+      issuer while a valid key set is available,
+    - an unknown `kid` triggers one synchronous refetch (at most once every
+      `unknown_kid_interval` seconds) to pick up rotated keys,
+    - if the issuer cannot be reached, the last good keys keep being served.
+    """
+
+    def __init__(self, uri, ttl=300, refresh_margin=30, unknown_kid_interval=10):
+        self.uri = uri
+        self.ttl = ttl
+        self.refresh_margin = min(refresh_margin, ttl)
+        self.unknown_kid_interval = unknown_kid_interval
+        self._client = jwt.PyJWKClient(uri, cache_jwk_set=False)
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._expires_at = 0.0
+        self._last_fetch_attempt = None
+        self._refreshing = False
+
+    def fetch_keys(self):
+        """Fetch the JWKS document and return the signing keys indexed by `kid`."""
+        jwk_set = self._client.get_jwk_set()
+        return {
+            key.key_id: key
+            for key in jwk_set.keys
+            if key.public_key_use in ["sig", None]
+        }
+
+    def refresh(self):
+        """
+        Refetch the signing keys. On failure, keep the current keys and return False.
+        """
+        self._last_fetch_attempt = time.monotonic()
+        try:
+            keys = self.fetch_keys()
+        except jwt.PyJWKClientError as excpt:
+            logger.warning("Could not refresh JWKS from %s: %s", self.uri, excpt)
+            return False
+
+        with self._lock:
+            self._keys = keys
+            self._expires_at = time.monotonic() + self.ttl
+        return True
+
+    def _background_refresh(self):
+        """Refresh keys then release the flag preventing concurrent refreshes."""
+        try:
+            self.refresh()
+        finally:
+            self._refreshing = False
+
+    def _schedule_refresh(self):
+        """Start a background refresh unless one is already running."""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(
+            target=self._background_refresh, name="jwks-refresh", daemon=True
+        ).start()
+
+    def get_signing_key(self, kid):
+        """Return the signing key matching `kid`, fetching the key set if needed."""
+        now = time.monotonic()
+        if not self._keys:
+            self.refresh()
+        elif now >= self._expires_at - self.refresh_margin:
+            self._schedule_refresh()
+
+        signing_key = self._keys.get(kid)
+        if signing_key is None and (
+            self._last_fetch_attempt is None
+            or now - self._last_fetch_attempt >= self.unknown_kid_interval
+        ):
+            # The issuer may have rotated its keys: refetch once
+            self.refresh()
+            signing_key = self._keys.get(kid)
+
+        if signing_key is None:
+            raise jwt.PyJWKClientError(
+                f'Unable to find a signing key that matches: "{kid}"'
+            )
+        return signing_key
+
+    def get_signing_key_from_jwt(self, token):
+        """Return the signing key matching the `kid` found in the token header."""
+        header = jwt.get_unverified_header(token)
+        return self.get_signing_key(header.get("kid"))
+
+
+@functools.lru_cache(maxsize=None)
+def _get_jwks_key_cache(uri):
+    """Build a single key cache per JWKS endpoint."""
+    return JWKSKeyCache(
+        uri,
+        ttl=settings.JWKS_CACHE_TTL,
+        refresh_margin=settings.JWKS_CACHE_REFRESH_MARGIN,
+    )
+
+
+def get_jwks_key_cache():
+    """Return the JWKS key cache shared by all the threads of the process."""
+    return _get_jwks_key_cache(api_settings.JWK_URL)
+
 
 class JWKSAuthToken(Token):
     token_type = 'jwks'
@@ -95,6 +326,8 @@ class JWKSAuthToken(Token):
                 )
             except jwt.ExpiredSignatureError:
                 raise TokenError(_("Token is expired"))
+            except jwt.PyJWKClientError as e:
+                raise TokenError(_(f"Token is invalid: {str(e)}")) from e
             except jwt.InvalidTokenError as e:
                 raise TokenError(_(f"Token is invalid: {str(e)}"))
             
@@ -109,7 +342,7 @@ class JWKSAuthToken(Token):
         raise NotImplementedError('Access tokens must be issued by Auth issuer.')
 
     def get_jwks_client(self):
-        return jwt.PyJWKClient(api_settings.JWK_URL)
+        return get_jwks_key_cache()
 
     def set_jti(self):
         self.payload['jti'] = self.payload.get('jti') or self.payload.get(api_settings.USER_ID_CLAIM, None)
@@ -157,7 +390,7 @@ class CookieJWTAuthentication(CustomJWTAuthentication):
         token = request.COOKIES.get('token')
         return token.encode('utf-8') if token else None
 
-    def get_validated_token(self, raw_token):
+    def validate_token(self, raw_token):
         """
         Validates the given raw token using JWKSAuthToken.
         """
@@ -132,6 +132,68 @@ class Base(Configuration):
         environ_prefix=None,
     )
 
+    # Status of attachments still being processed is cached for this many seconds
+    # before checking the object storage again, "ready" attachments are cached forever
+    ATTACHMENT_PROCESSING_STATUS_CACHE_TIMEOUT = values.PositiveIntegerValue(
+        30,
+        environ_name="ATTACHMENT_PROCESSING_STATUS_CACHE_TIMEOUT",
+        environ_prefix=None,
+    )
+
+    # Format in which document contents are written to object storage: "base64" text
+    # or "gzip" to store the compressed binary Yjs update. Both are always readable.
+    DOCUMENT_CONTENT_STORAGE_FORMAT = values.Value(
+        "base64",
+        environ_name="DOCUMENT_CONTENT_STORAGE_FORMAT",
+        environ_prefix=None,
+    )
+
+    # Document contents are cached in the memory of each process, up to a total of
+    # DOCUMENT_CONTENT_CACHE_SIZE bytes, and in the shared cache for
+    # DOCUMENT_CONTENT_CACHE_TIMEOUT seconds. Bigger contents are never cached.
+    DOCUMENT_CONTENT_CACHE_SIZE = values.PositiveIntegerValue(
+        64 * (2**20),  # 64MB
+        environ_name="DOCUMENT_CONTENT_CACHE_SIZE",
+        environ_prefix=None,
+    )
+    DOCUMENT_CONTENT_CACHE_MAX_ENTRY_SIZE = values.PositiveIntegerValue(
+        2**20,  # 1MB
+        environ_name="DOCUMENT_CONTENT_CACHE_MAX_ENTRY_SIZE",
+        environ_prefix=None,
+    )
+    DOCUMENT_CONTENT_CACHE_TIMEOUT = values.PositiveIntegerValue(
+        60 * 60 * 24,  # 1 day
+        environ_name="DOCUMENT_CONTENT_CACHE_TIMEOUT",
+        environ_prefix=None,
+    )
+
+    # Ids of the documents accessible to each user are cached for this many seconds
+    # to list documents. They are invalidated when accesses or link traces change.
+    USER_DOCUMENTS_IDS_CACHE_TIMEOUT = values.PositiveIntegerValue(
+        60 * 60,  # 1 hour
+        environ_name="USER_DOCUMENTS_IDS_CACHE_TIMEOUT",
+        environ_prefix=None,
+    )
+
+    # Maximum number of children created at once by the children batch endpoint
+    DOCUMENT_CHILDREN_BATCH_MAX_SIZE = values.PositiveIntegerValue(
+        500,
+        environ_name="DOCUMENT_CHILDREN_BATCH_MAX_SIZE",
+        environ_prefix=None,
+    )
+    # Maximum number of documents deleted or restored at once by the bulk endpoints
+    DOCUMENT_BULK_ACTION_MAX_SIZE = values.PositiveIntegerValue(
+        500,
+        environ_name="DOCUMENT_BULK_ACTION_MAX_SIZE",
+        environ_prefix=None,
+    )
+    # Number of threads copying contents in object storage when duplicating documents
+    DOCUMENT_DUPLICATION_MAX_WORKERS = values.PositiveIntegerValue(
+        10,
+        environ_name="DOCUMENT_DUPLICATION_MAX_WORKERS",
+        environ_prefix=None,
+    )
+
     # Document images
     DOCUMENT_IMAGE_MAX_SIZE = values.Value(
         10 * (2**20),  # 10MB
@@ -297,6 +359,27 @@ class Base(Configuration):
         'ISSUER':os.environ.get('JWT_ISSUER', ""),
     }
 
+    # Signing keys fetched from JWK_URL are cached per process and refreshed in
+    # the background REFRESH_MARGIN seconds before the TTL expires
+    JWKS_CACHE_TTL = values.PositiveIntegerValue(
+        300, environ_name="JWKS_CACHE_TTL", environ_prefix=None
+    )
+    JWKS_CACHE_REFRESH_MARGIN = values.PositiveIntegerValue(
+        30, environ_name="JWKS_CACHE_REFRESH_MARGIN", environ_prefix=None
+    )
+
+    # Users authenticated from a token are cached to avoid hitting the database on
+    # each request. Set to 0 to disable.
+    JWT_USER_CACHE_TIMEOUT = values.PositiveIntegerValue(
+        60, environ_name="JWT_USER_CACHE_TIMEOUT", environ_prefix=None
+    )
+
+    # Number of validated tokens kept in memory by each process to avoid verifying
+    # the signature of the same token on each request. Set to 0 to disable.
+    JWT_VALIDATED_TOKEN_CACHE_SIZE = values.PositiveIntegerValue(
+        1024, environ_name="JWT_VALIDATED_TOKEN_CACHE_SIZE", environ_prefix=None
+    )
+
     AUTHENTICATION_BACKENDS = [
         'django.contrib.auth.backends.ModelBackend',
         'django.contrib.auth.backends.RemoteUserBackend',
@@ -408,6 +491,18 @@ class Base(Configuration):
     TRASHBIN_CUTOFF_DAYS = values.Value(
         30, environ_name="TRASHBIN_CUTOFF_DAYS", environ_prefix=None
     )
+    # Number of expired documents permanently deleted by each purge task
+    TRASHBIN_PURGE_BATCH_SIZE = values.PositiveIntegerValue(
+        100, environ_name="TRASHBIN_PURGE_BATCH_SIZE", environ_prefix=None
+    )
+    # Celery rate limit of the purge tasks, e.g. "10/m" (None for no limit)
+    TRASHBIN_PURGE_RATE_LIMIT = values.Value(
+        "10/m", environ_name="TRASHBIN_PURGE_RATE_LIMIT", environ_prefix=None
+    )
+    # Interval in seconds between two purges of the trashbin
+    TRASHBIN_PURGE_INTERVAL = values.PositiveIntegerValue(
+        60 * 60, environ_name="TRASHBIN_PURGE_INTERVAL", environ_prefix=None
+    )
 
     # Mail
     EMAIL_BACKEND = values.Value("django.core.mail.backends.smtp.EmailBackend")
@@ -488,6 +583,17 @@ class Base(Configuration):
     CELERY_BROKER_URL = values.Value("redis://redis:6379/0")
     CELERY_BROKER_TRANSPORT_OPTIONS = values.DictValue({})
 
+    # pylint: disable=invalid-name
+    @property
+    def CELERY_BEAT_SCHEDULE(self):
+        """Periodic tasks run by celery beat."""
+        return {
+            "purge-trashbin": {
+                "task": "core.tasks.purge_trashbin",
+                "schedule": self.TRASHBIN_PURGE_INTERVAL,
+            },
+        }
+
     # Session
     SESSION_ENGINE = "django.contrib.sessions.backends.cache"
     SESSION_CACHE_ALIAS = "default"